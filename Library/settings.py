@@ -26,9 +26,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-38)xsr5f90cdy%@vu_jwu106+5$ho81&fdd@d14%t(rs%0gy5u'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Production deployments set DEBUG=0 and list their host names in ALLOWED_HOSTS.
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -39,28 +40,50 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'biblioteka',
 ]
 
 MIDDLEWARE = [
+    'biblioteka.metrics.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'biblioteka.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'biblioteka.querybudget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'Library.urls'
 
+# Keep compiled templates in memory, per process, instead of reading and parsing
+# them on every render. Only worth turning off (TEMPLATE_CACHE=0) to debug a loader;
+# the development server reloads edited templates either way.
+TEMPLATE_CACHE = os.environ.get('TEMPLATE_CACHE', '1') == '1'
+
+# Record the source position of every template node for the debug error page.
+# Follows DEBUG unless TEMPLATE_DEBUG is set.
+TEMPLATE_DEBUG = os.environ.get('TEMPLATE_DEBUG', '1' if DEBUG else '0') == '1'
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates']
-        ,
-        'APP_DIRS': True,
+        # The Django backend, timing renders for `biblioteka.metrics`.
+        'BACKEND': 'biblioteka.metrics.TimedDjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
         'OPTIONS': {
+            'debug': TEMPLATE_DEBUG,
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)] if TEMPLATE_CACHE
+                else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -77,6 +100,38 @@ WSGI_APPLICATION = 'Library.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+#
+# Connections are managed in one of two ways, chosen with `DB_POOL`:
+#
+#   - `DB_POOL=1`: each worker process keeps a psycopg 3 connection pool (needs
+#     `psycopg[pool]`) sized with the `DB_POOL_*` variables, and every request borrows
+#     a connection from it. Use `/metrics/db/` to see how busy the pool is.
+#   - Otherwise, each thread keeps its connection open for `DB_CONN_MAX_AGE` seconds
+#     and reuses it across requests.
+#
+# Either way, a connection is checked before it is reused (`DB_CONN_HEALTH_CHECKS`),
+# and statements running longer than `DB_STATEMENT_TIMEOUT` milliseconds are aborted.
+# Run long maintenance commands such as `migrate` with `DB_STATEMENT_TIMEOUT=0`.
+
+DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+
+DB_OPTIONS = {
+    'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+    'options': f"-c statement_timeout={int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))}",
+}
+
+if DB_POOL:
+    DB_OPTIONS['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a request waits for a free connection before failing.
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Seconds after which idle connections above `min_size` are closed.
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+        # Seconds after which connections are replaced, whether idle or not.
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+    }
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -84,9 +139,70 @@ DATABASES = {
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'OPTIONS': DB_OPTIONS,
     }
 }
 
+# Read replicas, as a comma-separated list of `host[:port]` in `DB_REPLICA_HOSTS`.
+# Each gets a `replicaN` alias with the primary's credentials and options, and
+# `biblioteka.replicas` sends the catalogue reads of GET requests to one of them.
+# After a POST, the client reads from the primary for `READ_YOUR_WRITES_SECONDS`,
+# which should exceed the usual replication lag.
+
+DATABASE_REPLICAS = []
+
+for number, address in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port,
+        'OPTIONS': dict(DB_OPTIONS),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['biblioteka.replicas.ReplicaRouter']
+
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 10))
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+#
+# `PAGE_CACHE_BACKEND` selects where rendered pages are cached: 'locmem' (per process),
+# 'file' (shared by the workers of one host) or 'redis' (shared by every host).
+
+PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'locmem')
+
+PAGE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'biblioteka-pages',
+        # Detail pages and title list rows share the cache; Django's default of 300
+        # entries would not even hold the rows of a few list pages.
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 20000))},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PAGE_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'pages')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('PAGE_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': PAGE_CACHE_BACKENDS[PAGE_CACHE_BACKEND],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,3 +244,100 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Library application settings
+
+# Number of titles shown per page of the title list.
+TITLE_LIST_PAGE_SIZE = int(os.environ.get('TITLE_LIST_PAGE_SIZE', 50))
+
+# Maximum number of full-text search results returned at once.
+SEARCH_RESULTS_LIMIT = int(os.environ.get('SEARCH_RESULTS_LIMIT', 50))
+
+# Maximum number of suggestions returned by the author autocomplete.
+AUTHOR_AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTHOR_AUTOCOMPLETE_LIMIT', 10))
+
+# Number of author names cached per process when resolving authors.
+AUTHOR_CACHE_SIZE = int(os.environ.get('AUTHOR_CACHE_SIZE', 1024))
+
+# Lifetime of a cached title detail page, in seconds.
+DETAIL_PAGE_CACHE_TIMEOUT = int(os.environ.get('DETAIL_PAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Lifetime of a cached row of the title list, in seconds.
+TITLE_ROW_CACHE_TIMEOUT = int(os.environ.get('TITLE_ROW_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Number of rows fetched at a time from the server-side cursor during exports.
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Number of titles per page of the JSON API title list, unless `?limit=` asks for fewer.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+
+# Maximum number of titles returned by one JSON API request, as a page or a batch.
+API_MAX_BATCH_SIZE = int(os.environ.get('API_MAX_BATCH_SIZE', 500))
+
+# Age after which change log entries superseded by a later change to the same title
+# are deleted by `prune_title_changes`, in days.
+CHANGE_LOG_COMPACT_AFTER_DAYS = int(os.environ.get('CHANGE_LOG_COMPACT_AFTER_DAYS', 1))
+
+# Age after which change log entries are deleted by `prune_title_changes`, in days.
+# Sync clients that fall further behind must resynchronize from a full export.
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30))
+
+# Largest number of titles one bulk delete or bulk edit may change, unless the
+# caller raises the limit explicitly (see `biblioteka.bulk_edit`).
+BULK_EDIT_LIMIT = int(os.environ.get('BULK_EDIT_LIMIT', 10000))
+
+# Number of similar titles stored per title by the similar titles index and shown
+# on its detail page (see `biblioteka.similar`).
+SIMILAR_TITLES_COUNT = int(os.environ.get('SIMILAR_TITLES_COUNT', 10))
+
+# Size of each candidate pool scored when the similar titles of an edited title are
+# recomputed; larger pools come closer to a full rebuild but make edits slower.
+SIMILAR_TITLES_CANDIDATES = int(os.environ.get('SIMILAR_TITLES_CANDIDATES', 200))
+
+# Memory-mapped catalogue snapshot shared by the worker processes of one host (see
+# `biblioteka.snapshot`), written by `build_catalogue_snapshot`. Empty to turn it off.
+CATALOGUE_SNAPSHOT_PATH = os.environ.get('CATALOGUE_SNAPSHOT_PATH', '')
+
+# How often each process checks that its catalogue snapshot is still current, in
+# seconds. Changes reach the processes still using a snapshot within this delay.
+CATALOGUE_SNAPSHOT_CHECK_INTERVAL = float(os.environ.get('CATALOGUE_SNAPSHOT_CHECK_INTERVAL', 5))
+
+# Serve the read-only views with their async variants from `biblioteka.async_views`.
+# Only worthwhile under an ASGI server (`Library.asgi`); under WSGI every async view
+# runs in its own event loop.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+# Access to the `/metrics/` and `/metrics/db/` endpoints, closed unless configured:
+# clients sending `Authorization: Bearer <METRICS_TOKEN>`, and clients connecting
+# from the comma-separated `METRICS_ALLOWED_IPS`. Behind a reverse proxy every client
+# has the proxy's address, so do not list it (nor loopback on the same host); use the token.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+# Raise instead of logging when a view exceeds its declared query budget.
+QUERY_BUDGET_STRICT = DEBUG
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+#
+# `biblioteka.metrics` writes one JSON line per request at INFO level. Set
+# `PERF_LOG_LEVEL=WARNING` to silence it while keeping the `/metrics/` histograms.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'biblioteka.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERF_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
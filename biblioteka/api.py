@@ -0,0 +1,172 @@
+"""
+Serialization helpers for the read-only JSON API of the library application.
+
+API responses are built from `values()` queries, which return plain dictionaries
+straight from the database cursor, instead of model instances that would only be
+turned back into dictionaries. Author and genre names are fetched by the same query,
+the genres through a correlated `ARRAY` subquery, so a page or batch of any size
+costs a single round trip.
+
+Clients can ask for a subset of the fields with `?fields=id,name,author`. Only the
+requested columns are selected, so leaving out `description` or `genres` also makes
+the query cheaper.
+
+Responses are encoded with `orjson` when it is installed, and with the standard
+library `json` module otherwise.
+
+Constants:
+    - `FIELDS`: The fields a title can be serialized with, mapped to their lookups or expressions.
+    - `DEFAULT_FIELDS`: The fields returned when `?fields=` is not given.
+
+Functions:
+    - `parse_fields`: Reads the sparse fieldset requested by a client.
+    - `parse_limit`: Reads the number of results requested by a client.
+    - `title_values`: Turns a title queryset into a `values()` queryset of API fields.
+    - `serialize_titles`: Turns `title_values` rows into API dictionaries.
+    - `dumps`: Encodes data as JSON bytes.
+    - `json_response`: Returns data as a JSON `HttpResponse`.
+"""
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.exceptions import BadRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef
+from django.http import HttpResponse
+
+from .models import Genre
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'author': 'author__name',
+    'author_id': 'author_id',
+    'genres': ArraySubquery(
+        Genre.objects.filter(titles=OuterRef('pk')).order_by('name').values('name')
+    ),
+    'updated_at': 'updated_at',
+}
+
+DEFAULT_FIELDS = ['id', 'name', 'description', 'author', 'genres']
+
+
+def parse_fields(request):
+    """
+    Returns the fields requested with the `fields` query parameter.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        list: The requested field names, in the order given, or `DEFAULT_FIELDS`.
+
+    Raises:
+        BadRequest: If an unknown field is requested.
+    """
+    value = request.GET.get('fields')
+    if not value:
+        return DEFAULT_FIELDS
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown or not fields:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(request, default, maximum):
+    """
+    Returns the number of results requested with the `limit` query parameter.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        default (int): The limit when none is given.
+        maximum (int): The largest allowed limit.
+
+    Returns:
+        int: The requested limit.
+
+    Raises:
+        BadRequest: If the limit is not an integer between 1 and `maximum`.
+    """
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise BadRequest("Invalid limit")
+    if not 1 <= limit <= maximum:
+        raise BadRequest(f"limit must be between 1 and {maximum}")
+    return limit
+
+
+def _column(field):
+    lookup = FIELDS[field]
+    return lookup if isinstance(lookup, str) else field
+
+
+def title_values(queryset, fields, extra=()):
+    """
+    Selects the columns behind the given API fields of titles.
+
+    Args:
+        queryset (QuerySet): The titles to serialize.
+        fields (list): The API field names to select.
+        extra (iterable, optional): Fields the caller needs in addition to `fields`,
+            such as the pagination key.
+
+    Returns:
+        QuerySet: A `values()` queryset yielding one dictionary per title, to be
+            passed to `serialize_titles`.
+    """
+    selected = dict.fromkeys([*fields, *extra])
+    lookups = [FIELDS[field] for field in selected if isinstance(FIELDS[field], str)]
+    expressions = {field: FIELDS[field] for field in selected if not isinstance(FIELDS[field], str)}
+    return queryset.values(*lookups, **expressions)
+
+
+def serialize_titles(rows, fields):
+    """
+    Turns rows of `title_values` into API dictionaries holding exactly `fields`.
+
+    Args:
+        rows (iterable): Dictionaries produced by a `title_values` queryset.
+        fields (list): The API field names, in output order.
+
+    Returns:
+        list: One dictionary per row.
+    """
+    columns = [(field, _column(field)) for field in fields]
+    return [{field: row[column] for field, column in columns} for row in rows]
+
+
+def dumps(data):
+    """
+    Encodes data as JSON.
+
+    Args:
+        data: Dictionaries, lists and scalars, including datetimes.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    """
+    Returns data as a JSON response encoded with `dumps`.
+
+    Args:
+        data: The response payload.
+        status (int, optional): The HTTP status code.
+
+    Returns:
+        HttpResponse: The JSON response.
+    """
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
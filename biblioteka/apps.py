@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BibliotekaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'biblioteka'
+
+    def ready(self):
+        """
+        Connects the application's signal handlers.
+        """
+        from . import signals  # noqa: F401
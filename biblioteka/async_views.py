@@ -0,0 +1,259 @@
+"""
+Async variants of the read-only views of the library application.
+
+Under an ASGI server, a synchronous view is run in a worker thread for every
+request. These views are coroutines instead: they read the database with the async
+ORM (`aget`, `afirst`, `async for`) and render their responses on the event loop,
+so a worker can keep many requests in flight while they wait on the database.
+
+Each class extends its synchronous counterpart in `views.py` and only replaces
+`get`, so querysets, entity tags, query budgets and response formats stay shared.
+`urls.py` routes to these classes instead of the synchronous ones when the
+`ASYNC_VIEWS` setting is on.
+
+Classes:
+    - `AsyncTitleListView`: Async variant of `TitleListView`.
+    - `AsyncTitleSearchView`: Async variant of `TitleSearchView`.
+    - `AsyncTitleDetailView`: Async variant of `TitleDetailView`.
+    - `AsyncTitleApiListView`: Async variant of `TitleApiListView`.
+    - `AsyncTitleApiDetailView`: Async variant of `TitleApiDetailView`.
+    - `AsyncTitleApiBatchView`: Async variant of `TitleApiBatchView`.
+"""
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import aget_object_or_404, render
+from django.template.loader import get_template, render_to_string
+
+from .api import json_response, parse_fields, serialize_titles, title_values
+from .facets import GenreFilter, aget_genre_facets
+from .fragments import ROW_TEMPLATE, arender_title_rows
+from .models import Title
+from .pagecache import detail_page_cache
+from .pagination import KeysetPaginator
+from .search import search_titles
+from .similar import similar_titles
+from .versions import aget_catalogue_version, conditional_response, set_validators
+from .views import (
+    TitleListView, TitleSearchView, TitleDetailView, TitleApiListView, TitleApiDetailView,
+    TitleApiBatchView,
+)
+
+
+class AsyncTitleListView(TitleListView):
+    """
+    Handles the display of a paginated list of titles with the async ORM.
+
+    Methods:
+        get(request): Retrieves one page of Title objects and renders the title list template.
+    """
+
+    async def get(self, request):
+        """
+        Retrieves a page of titles and renders the title list view.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry an `after` or
+                `before` cursor, a `q` search query and `genre` and `match` filters
+                in its query string.
+
+        Returns:
+            HttpResponse: The rendered template with the page of titles, or a 304
+                response if the client's copy is current.
+
+        Raises:
+            BadRequest: If the cursor or the genre filter is malformed (rendered as
+                a 400 response).
+        """
+        version, updated_at = await aget_catalogue_version()
+        etag = self.get_etag(request, version)
+        response = conditional_response(request, etag, updated_at)
+        if response is not None:
+            return response
+
+        genre_filter = GenreFilter.from_request(request)
+        titles = genre_filter.apply(self.get_queryset())
+        query = request.GET.get('q', '').strip()
+        if query:
+            results = search_titles(query, titles)[:settings.SEARCH_RESULTS_LIMIT]
+            context = {'titles': [title async for title in results], 'query': query}
+        else:
+            paginator = KeysetPaginator(titles, settings.TITLE_LIST_PAGE_SIZE)
+            page = await paginator.apage(after=request.GET.get('after'), before=request.GET.get('before'))
+            context = {'titles': page, 'page': page}
+        # Rendered here with the async cache API rather than by the `title_rows` tag,
+        # whose blocking cache reads would stall the event loop.
+        context['rows'] = await arender_title_rows(get_template(ROW_TEMPLATE).template, context['titles'], query)
+        counts = await aget_genre_facets(version, genre_filter, query)
+        context.update(self.get_facet_context(request, counts, genre_filter))
+        return set_validators(render(request, self.template_name, context), etag, updated_at)
+
+
+class AsyncTitleSearchView(TitleSearchView):
+    """
+    Handles full-text search requests returning JSON with the async ORM.
+
+    Methods:
+        get(request): Searches titles for the `q` query parameter and returns ranked results.
+    """
+
+    async def get(self, request):
+        """
+        Searches the catalogue and returns the best matches as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object with the search text in `q`.
+
+        Returns:
+            JsonResponse: An object with a `results` list, as returned by `TitleSearchView`.
+        """
+        query = request.GET.get('q', '').strip()
+        results = []
+        if query:
+            titles = search_titles(query, self.get_queryset())[:settings.SEARCH_RESULTS_LIMIT]
+            results = [self.serialize(title) async for title in titles]
+        return JsonResponse({'results': results})
+
+
+class AsyncTitleDetailView(TitleDetailView):
+    """
+    Handles the display of a title's details with the async ORM and cache API.
+
+    Methods:
+        get(request, pk): Returns the cached or freshly rendered detail page of a title.
+        arender_page(request, pk): Retrieves a single Title object by primary key and renders it.
+    """
+
+    async def get(self, request, pk):
+        """
+        Returns the detail page of a specific title, from the cache when possible.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            pk (int): The primary key of the Title to retrieve.
+
+        Returns:
+            HttpResponse: The page with the title details, or a 304 response if the
+                client's copy is current.
+
+        Raises:
+            Http404: If no Title with the given primary key exists.
+        """
+        state = await self.get_state_queryset(pk).afirst()
+        if state is None:
+            raise Http404("No Title matches the given query.")
+        etag, last_modified = self.get_validators(pk, *state)
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        content = await detail_page_cache.aget_or_render(pk, lambda: self.arender_page(request, pk))
+        return set_validators(HttpResponse(content), etag, last_modified)
+
+    async def arender_page(self, request, pk):
+        """
+        Retrieves a specific title and renders the detail template.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            pk (int): The primary key of the Title to retrieve.
+
+        Returns:
+            str: The rendered template with the title details.
+
+        Raises:
+            Http404: If no Title with the given primary key exists.
+        """
+        title = await aget_object_or_404(self.get_queryset(), pk=pk)
+        similar = [row async for row in similar_titles(pk)]
+        return render_to_string(self.template_name, {'title': title, 'similar_titles': similar}, request)
+
+
+class AsyncTitleApiListView(TitleApiListView):
+    """
+    Handles the JSON API list of titles with the async ORM.
+
+    Methods:
+        get(request): Returns one page of titles as JSON.
+    """
+
+    async def get(self, request):
+        """
+        Returns a page of titles as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object, as for `TitleApiListView`.
+
+        Returns:
+            HttpResponse: An object with a `results` list and `next`/`previous` cursors.
+
+        Raises:
+            BadRequest: If the cursor, the limit or a field is invalid.
+        """
+        fields = parse_fields(request)
+        paginator = self.get_paginator(request, fields)
+        page = await paginator.apage(after=request.GET.get('after'), before=request.GET.get('before'))
+        return json_response({
+            'results': serialize_titles(page, fields),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+
+class AsyncTitleApiDetailView(TitleApiDetailView):
+    """
+    Handles the JSON API representation of a single title with the async ORM.
+
+    Methods:
+        get(request, pk): Returns one title as JSON.
+    """
+
+    async def get(self, request, pk):
+        """
+        Returns a specific title as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry a `fields` list.
+            pk (int): The primary key of the Title to retrieve.
+
+        Returns:
+            HttpResponse: The title object.
+
+        Raises:
+            Http404: If no Title with the given primary key exists.
+            BadRequest: If an unknown field is requested.
+        """
+        fields = parse_fields(request)
+        row = await title_values(Title.objects.filter(pk=pk), fields).afirst()
+        if row is None:
+            raise Http404("No Title matches the given query.")
+        return json_response(serialize_titles([row], fields)[0])
+
+
+class AsyncTitleApiBatchView(TitleApiBatchView):
+    """
+    Handles fetching many titles by id in one JSON API request with the async ORM.
+
+    Methods:
+        get(request): Returns the titles listed in the `ids` query parameter.
+    """
+
+    async def get(self, request):
+        """
+        Returns the requested titles as JSON, in the order of their ids.
+
+        Args:
+            request (HttpRequest): The HTTP request object, as for `TitleApiBatchView`.
+
+        Returns:
+            HttpResponse: An object with `results` and `missing` lists.
+
+        Raises:
+            BadRequest: If the ids are malformed or too many, or a field is unknown.
+        """
+        fields = parse_fields(request)
+        ids = self.get_ids(request)
+        rows = []
+        if ids:
+            rows = [row async for row in title_values(Title.objects.filter(pk__in=ids), fields, ['id'])]
+        return self.build_response(ids, rows, fields)
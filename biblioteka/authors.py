@@ -0,0 +1,182 @@
+"""
+Author name resolution for the library application.
+
+Titles are entered with a free-text author name, which has to be turned into an
+`Author` row. Names are normalized (surrounding whitespace stripped, inner runs of
+whitespace collapsed) and matched case-insensitively against a unique index on
+`LOWER(name)`, so "j.k.  rowling" and "J.K. Rowling" resolve to the same author.
+
+A new name is inserted with `INSERT ... ON CONFLICT DO NOTHING RETURNING`, which
+is safe under concurrent submissions of the same new name. When the name already
+exists, nothing is written: the insert returns no row, and the author is read (and
+locked) with a `SELECT` on `LOWER(name)`, so resolving an existing author takes two
+round trips. Authors in the current catalogue snapshot (see `biblioteka.snapshot`)
+and hot authors kept in a small per-process LRU cache take one: the cached id is
+only checked with a `SELECT ... FOR KEY SHARE` by primary key. That check is kept
+on purpose. Another process may have deleted or renamed the author since the id
+was cached, and invalidation only reaches the cache of the process that made the
+change, so an id that no longer has the cached name is dropped from the cache and
+the name resolved again. The lock also keeps the author from being deleted until
+the transaction storing the title ends; the title's foreign key would only catch
+a deleted author at commit, after the form has been accepted.
+
+Every path locks the author it returns, so a title referencing it can always be
+stored.
+
+Classes:
+    - `LRUCache`: A thread-safe, size-bounded mapping with least-recently-used eviction.
+
+Functions:
+    - `normalize_author_name`: Normalizes whitespace in an author name.
+    - `resolve_author`: Returns the `Author` for a name, creating it if needed.
+
+Attributes:
+    - `author_cache`: The per-process cache of normalized name to `(id, name)`.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .metrics import record_cache
+from .models import Author
+from .snapshot import get_snapshot
+
+INSERT_AUTHOR = "INSERT INTO biblioteka_author (name) VALUES (%s) ON CONFLICT (LOWER(name)) DO NOTHING RETURNING id, name"
+
+FIND_AUTHOR = "SELECT id, name FROM biblioteka_author WHERE LOWER(name) = LOWER(%s) FOR KEY SHARE"
+
+LOCK_AUTHOR = "SELECT name FROM biblioteka_author WHERE id = %s FOR KEY SHARE"
+
+
+class LRUCache:
+    """
+    A thread-safe mapping that evicts the least recently used entry when full.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for a key and marks it as recently used.
+
+        Args:
+            key (hashable): The key to look up.
+            default (object, optional): The value returned when the key is missing.
+
+        Returns:
+            object: The stored value, or `default`.
+        """
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (hashable): The key to store the value under.
+            value (object): The value to store.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Removes the entry of a key, if any.
+
+        Args:
+            key (hashable): The key to remove.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._data.clear()
+
+
+author_cache = LRUCache(settings.AUTHOR_CACHE_SIZE)
+
+
+def normalize_author_name(name):
+    """
+    Normalizes the whitespace of an author name.
+
+    Args:
+        name (str): The name as entered.
+
+    Returns:
+        str: The name with surrounding whitespace removed and inner whitespace
+            collapsed to single spaces.
+    """
+    return ' '.join(name.split())
+
+
+def resolve_author(name):
+    """
+    Returns the author with the given name, creating it if it does not exist.
+
+    Names are compared case-insensitively after normalization. The returned
+    instance carries the name as stored, which may differ in case from the input.
+    An author is only added to `author_cache` once the enclosing transaction has
+    committed, so a rolled-back insert never leaves a dangling id in the cache.
+
+    Call it inside the transaction that stores the reference to the author: an
+    author found in the snapshot or the cache is locked against deletion until
+    that transaction ends.
+
+    Args:
+        name (str): The author's name as entered.
+
+    Returns:
+        Author: The existing or newly created author.
+    """
+    name = normalize_author_name(name)
+    key = name.lower()
+    snapshot = get_snapshot()
+    cached = snapshot.find_author(name) if snapshot is not None else None
+    if cached is None:
+        cached = author_cache.get(key)
+    with connection.cursor() as cursor:
+        if cached is not None:
+            cursor.execute(LOCK_AUTHOR, [cached[0]])
+            row = cursor.fetchone()
+            if row is not None and row[0].lower() == key:
+                record_cache(True)
+                return Author.from_db(connection.alias, ['id', 'name'], [cached[0], row[0]])
+            author_cache.delete(key)
+        record_cache(False)
+        row = None
+        while row is None:
+            cursor.execute(INSERT_AUTHOR, [name])
+            row = cursor.fetchone()
+            if row is None:
+                # The name exists. Should the author be deleted before it is read,
+                # the insert is tried again.
+                cursor.execute(FIND_AUTHOR, [name])
+                row = cursor.fetchone()
+        pk, stored_name = row
+    transaction.on_commit(lambda: author_cache.set(key, (pk, stored_name)))
+    return Author.from_db(connection.alias, ['id', 'name'], [pk, stored_name])
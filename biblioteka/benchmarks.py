@@ -0,0 +1,119 @@
+"""
+Requests benchmarked against the library application views.
+
+Each URL of `biblioteka/urls.py` has an entry in `REQUESTS`, used by the
+`benchmark_catalogue` command to measure the views and by `biblioteka.queryplans`
+to explain their queries. The parameters of the requests, such as the title ids
+and search words, are drawn from the current catalogue by a `Sample`.
+
+Classes:
+    - `Sample`: Request parameters drawn from the current catalogue.
+
+Constants:
+    - `REQUESTS`: The requests to benchmark for each URL name.
+    - `SINGLE_RUN`: The URL names whose requests are run only once per scale.
+    - `SEARCH_WORDS`: The search queries of the search requests.
+    - `AUTHOR_PREFIXES`: The name prefixes of the author autocomplete requests.
+"""
+
+from django.urls import reverse
+
+from .models import Title
+from .pagination import encode_cursor
+
+# For each URL name, the requests to benchmark as `(label, build)` pairs. `build`
+# receives a `Sample` and an iteration number and returns the path to request.
+REQUESTS = {
+    'title_list': [
+        ('title_list', lambda sample, i: reverse('title_list')),
+        ('title_list:deep', lambda sample, i: f"{reverse('title_list')}?after={sample.cursor}"),
+        ('title_list:search', lambda sample, i: f"{reverse('title_list')}?q={sample.word(i)}"),
+        ('title_list:genres', lambda sample, i: f"{reverse('title_list')}?genre={i % 5 + 1}&genre={i % 7 + 6}"),
+    ],
+    'title_detail': [('title_detail', lambda sample, i: reverse('title_detail', args=[sample.pk(i)]))],
+    'add_title': [('add_title', lambda sample, i: reverse('add_title'))],
+    'edit_title': [('edit_title', lambda sample, i: reverse('edit_title', args=[sample.pk(i)]))],
+    'delete_title': [('delete_title', lambda sample, i: reverse('delete_title', args=[sample.pk(i)]))],
+    'bulk_edit_titles': [
+        ('bulk_edit_titles', lambda sample, i: (
+            f"{reverse('bulk_edit_titles')}?operation=add_genre&target={i % 5 + 1}&ids={sample.ids(i, 100)}"
+        )),
+        ('bulk_edit_titles:filter', lambda sample, i: (
+            f"{reverse('bulk_edit_titles')}?operation=delete&genre={i % 5 + 1}&genre={i % 7 + 6}"
+        )),
+    ],
+    'title_search': [('title_search', lambda sample, i: f"{reverse('title_search')}?q={sample.word(i)}")],
+    'author_autocomplete': [
+        ('author_autocomplete', lambda sample, i: f"{reverse('author_autocomplete')}?q={sample.prefix(i)}"),
+    ],
+    'title_export': [('title_export', lambda sample, i: f"{reverse('title_export')}?format=jsonl")],
+    'api_title_list': [
+        ('api_title_list', lambda sample, i: f"{reverse('api_title_list')}?limit=100"),
+        ('api_title_list:deep', lambda sample, i: f"{reverse('api_title_list')}?limit=100&after={sample.cursor}"),
+    ],
+    'api_title_detail': [('api_title_detail', lambda sample, i: reverse('api_title_detail', args=[sample.pk(i)]))],
+    'api_title_similar': [
+        ('api_title_similar', lambda sample, i: reverse('api_title_similar', args=[sample.pk(i)])),
+    ],
+    'api_title_batch': [
+        ('api_title_batch:500', lambda sample, i: f"{reverse('api_title_batch')}?ids={sample.ids(i, 500)}"),
+    ],
+    'api_title_changes': [
+        ('api_title_changes', lambda sample, i: f"{reverse('api_title_changes')}?limit=100"),
+        ('api_title_changes:head', lambda sample, i: f"{reverse('api_title_changes')}?head"),
+    ],
+    'api_catalogue_stats': [('api_catalogue_stats', lambda sample, i: reverse('api_catalogue_stats'))],
+    'metrics': [('metrics', lambda sample, i: reverse('metrics'))],
+    'database_stats': [('database_stats', lambda sample, i: reverse('database_stats'))],
+}
+
+# Requests slow enough to be run only once per scale.
+SINGLE_RUN = {'title_export'}
+
+SEARCH_WORDS = ['smok', 'krol', 'tajemnica', 'miasto', 'zloty', 'noc zamek']
+
+AUTHOR_PREFIXES = ['Ann', 'Kow', 'Jan', 'Zofia N', 'Mar', 'Pio']
+
+
+class Sample:
+    """
+    Request parameters drawn from the current catalogue.
+
+    Attributes:
+        pks (list): Primary keys of randomly chosen titles.
+        cursor (str): A list cursor pointing to the middle of the catalogue.
+    """
+
+    def __init__(self, rng, size):
+        low, high = Title.objects.order_by('pk').values_list('pk', flat=True).first(), \
+            Title.objects.order_by('-pk').values_list('pk', flat=True).first()
+        candidates = [rng.randint(low, high) for _ in range(size * 2)]
+        self.pks = list(Title.objects.filter(pk__in=candidates).values_list('pk', flat=True))[:size]
+        rng.shuffle(self.pks)
+        middle = Title.objects.order_by('name', 'pk').values_list('name', 'pk')[Title.objects.count() // 2]
+        self.cursor = encode_cursor(*middle)
+
+    def pk(self, iteration):
+        """
+        Returns a title id for the given iteration.
+        """
+        return self.pks[iteration % len(self.pks)]
+
+    def ids(self, iteration, count):
+        """
+        Returns a comma-separated list of title ids for a batch request.
+        """
+        start = iteration * count
+        return ','.join(str(self.pk(start + offset)) for offset in range(count))
+
+    def word(self, iteration):
+        """
+        Returns a search query for the given iteration.
+        """
+        return SEARCH_WORDS[iteration % len(SEARCH_WORDS)].replace(' ', '+')
+
+    def prefix(self, iteration):
+        """
+        Returns an author name prefix for the given iteration.
+        """
+        return AUTHOR_PREFIXES[iteration % len(AUTHOR_PREFIXES)].replace(' ', '+')
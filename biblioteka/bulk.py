@@ -0,0 +1,236 @@
+"""
+Set-based bulk loading helpers for the library application.
+
+Loading titles one ORM call at a time costs several round trips per row. These
+helpers instead resolve whole batches of authors and genres with a couple of
+statements each, and stream title and title-genre rows into PostgreSQL with `COPY`.
+`load_titles` combines them into the whole sequence of loading a batch of titles,
+used by the `import_titles` management command and the synthetic catalogue
+generator (`biblioteka.synthetic`).
+
+`COPY` needs psycopg 3, which Django's PostgreSQL backend uses when it is installed.
+
+Functions:
+    - `upsert_authors`: Resolves author names to ids, creating missing authors.
+    - `upsert_genres`: Resolves genre names to ids, creating missing genres.
+    - `reserve_ids`: Reserves primary keys from a model's id sequence.
+    - `copy_rows`: Streams rows into a table with `COPY ... FROM STDIN`.
+    - `load_titles`: Creates a batch of titles with their authors, genres and derived data.
+    - `drop_secondary_indexes`: Drops non-unique indexes of tables and returns their definitions.
+    - `restore_indexes`: Recreates indexes from their definitions.
+"""
+
+from django.db import connection
+from django.utils import timezone
+
+from .changes import record_title_changes
+from .excerpts import make_excerpt
+from .genres import invalidate_genre_choices
+from .models import Genre, Title, TitleChange
+from .pagecache import detail_page_cache
+from .search import update_search_vectors
+from .stats import count_titles
+from .versions import bump_catalogue_version
+
+
+def upsert_authors(names):
+    """
+    Resolves author names to ids in two statements, creating missing authors.
+
+    Names are matched case-insensitively, as in `resolve_author`.
+
+    Args:
+        names (iterable): Normalized author names.
+
+    Returns:
+        dict: The author id for each given name.
+    """
+    names = sorted(set(names))
+    if not names:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO biblioteka_author (name) SELECT unnest(%s::text[]) "
+            "ON CONFLICT (LOWER(name)) DO NOTHING",
+            [names],
+        )
+        cursor.execute(
+            "SELECT n, a.id FROM unnest(%s::text[]) AS n "
+            "JOIN biblioteka_author a ON LOWER(a.name) = LOWER(n)",
+            [names],
+        )
+        return dict(cursor.fetchall())
+
+
+def upsert_genres(names):
+    """
+    Resolves genre names to ids in two statements, creating missing genres.
+
+    Genre names are matched exactly. Concurrent creation of the same new genre is
+    not guarded against, as genre names are not unique in the schema. The rows are
+    inserted without `post_save` signals, so the cached genre choices are dropped
+    here when a genre was created (see `biblioteka.genres`).
+
+    Args:
+        names (iterable): The genre names.
+
+    Returns:
+        dict: The genre id for each name.
+    """
+    names = sorted(set(names))
+    if not names:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO biblioteka_genre (name) SELECT n FROM unnest(%s::text[]) AS n "
+            "WHERE NOT EXISTS (SELECT 1 FROM biblioteka_genre g WHERE g.name = n)",
+            [names],
+        )
+        if cursor.rowcount:
+            invalidate_genre_choices()
+    return dict(Genre.objects.filter(name__in=names).order_by('-pk').values_list('name', 'pk'))
+
+
+def reserve_ids(model, count):
+    """
+    Reserves primary keys from the id sequence of a model in one statement.
+
+    The ids are unique but not necessarily contiguous.
+
+    Args:
+        model (type): The model whose table has a serial or identity primary key.
+        count (int): The number of ids to reserve.
+
+    Returns:
+        list: The reserved ids, in ascending order.
+    """
+    table = model._meta.db_table
+    column = model._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [table, column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def copy_rows(table, columns, rows):
+    """
+    Streams rows into a table with `COPY ... FROM STDIN`.
+
+    Args:
+        table (str): The table name.
+        columns (list): The column names, in the order of the row values.
+        rows (iterable): Tuples of column values. `None` is loaded as NULL.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    statement = "COPY {} ({}) FROM STDIN".format(
+        connection.ops.quote_name(table),
+        ", ".join(connection.ops.quote_name(column) for column in columns),
+    )
+    count = 0
+    with connection.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+    return count
+
+
+def load_titles(records, genre_ids):
+    """
+    Creates a batch of titles inside the caller's transaction.
+
+    Upserts the authors and the genres not resolved yet, reserves the title ids,
+    copies the titles and their genre links, then computes their search vectors,
+    counts them into the author and genre counters, logs them as created and bumps
+    the title collection version. The cached pages of the reserved ids are
+    invalidated too, as an id can be reused after the catalogue is cleared.
+
+    Args:
+        records (list): Titles with `name`, `description`, normalized `author` and
+            `genres` keys.
+        genre_ids (dict): Genre ids by name resolved by earlier batches. Updated in place.
+
+    Returns:
+        list: The ids of the created titles, in record order.
+    """
+    author_ids = upsert_authors(record['author'] for record in records)
+    missing = {genre for record in records for genre in record['genres']} - genre_ids.keys()
+    genre_ids.update(upsert_genres(missing))
+
+    ids = reserve_ids(Title, len(records))
+    now = timezone.now()
+    copy_rows(
+        Title._meta.db_table,
+        ['id', 'name', 'description', 'excerpt', 'author_id', 'updated_at'],
+        (
+            (
+                pk, record['name'], record['description'], make_excerpt(record['description']),
+                author_ids[record['author']], now,
+            )
+            for pk, record in zip(ids, records)
+        ),
+    )
+    copy_rows(
+        Title.genre.through._meta.db_table,
+        ['title_id', 'genre_id'],
+        (
+            (pk, genre_ids[genre])
+            for pk, record in zip(ids, records)
+            for genre in sorted(record['genres'])
+        ),
+    )
+    update_search_vectors(Title.objects.filter(pk__in=ids))
+    count_titles(ids)
+    record_title_changes(ids, TitleChange.CREATED)
+    bump_catalogue_version()
+    detail_page_cache.invalidate(ids)
+    return ids
+
+
+def drop_secondary_indexes(tables):
+    """
+    Drops the indexes of the given tables that do not enforce a constraint.
+
+    Primary key and unique indexes are kept, as they guard data integrity during
+    the load. The returned definitions can be passed to `restore_indexes`.
+
+    Args:
+        tables (list): The table names.
+
+    Returns:
+        list: The `CREATE INDEX` statements of the dropped indexes.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_indexdef(i.indexrelid) "
+            "FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_class t ON t.oid = i.indrelid "
+            "WHERE t.relname = ANY(%s) AND NOT i.indisprimary AND NOT i.indisunique "
+            "AND t.relnamespace = to_regnamespace(current_schema())::oid",
+            [list(tables)],
+        )
+        indexes = cursor.fetchall()
+        for name, definition in indexes:
+            cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(name)}")
+    return [definition for name, definition in indexes]
+
+
+def restore_indexes(definitions):
+    """
+    Recreates indexes from their `CREATE INDEX` statements, skipping existing ones.
+
+    Deferred foreign key checks are run first, since PostgreSQL refuses to build an
+    index on a table with pending trigger events in the same transaction.
+
+    Args:
+        definitions (list): The statements returned by `drop_secondary_indexes`.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        for definition in definitions:
+            cursor.execute(definition.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1))
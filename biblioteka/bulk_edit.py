@@ -0,0 +1,368 @@
+"""
+Set-based bulk deletion and editing of titles.
+
+The add, edit and delete views change one title per request, and the ORM deletes and
+edits many titles one row and one signal at a time. The operations here change a
+whole selection of titles with a handful of statements, in one transaction:
+
+    - `delete` removes the titles, their genre links and their rows in the
+      similar titles index;
+    - `reassign_author` moves the titles to another author;
+    - `add_genre` and `remove_genre` link the titles to a genre or unlink them.
+
+Titles are selected by id or with the filters of the title list (genres, search
+text) and by author, and the selected rows are locked first, so that concurrent
+edits cannot slip in between. Every operation can run as a dry run, which only
+counts the titles it would change, and refuses selections larger than a limit
+(`BULK_EDIT_LIMIT` by default) before changing anything.
+
+Since the statements bypass the model signals, the operations maintain what the
+signals would: the `title_count` counters (`biblioteka.stats`), the search vectors
+of moved titles, `updated_at` and the collection version (`biblioteka.versions`),
+the cached detail pages (`biblioteka.pagecache`) and the change log
+(`biblioteka.changes`). Only titles that actually change are touched and logged.
+The cached pages of titles listing a deleted or moved title as similar are
+invalidated as well, since they show its author. Moved titles and changed genres
+are not rescored in the similar titles index
+(`biblioteka.similar`); the next `rebuild_similar_titles` picks them up.
+
+Constants:
+    - `DELETE`, `REASSIGN_AUTHOR`, `ADD_GENRE`, `REMOVE_GENRE`: The operation names.
+    - `OPERATIONS`: The operation functions and the model of their target, by name.
+    - `TITLE_TABLE`, `LINK_TABLE`, `SIMILAR_TABLE`: The title, title-genre and similar titles tables.
+
+Classes:
+    - `BulkLimitExceeded`: Raised when a selection holds more titles than allowed.
+
+Functions:
+    - `select_titles`: Returns the titles selected by ids and filters.
+    - `select_titles_from_params`: Returns the titles selected by request parameters.
+    - `delete_titles`: Deletes the selected titles.
+    - `reassign_author`: Moves the selected titles to another author.
+    - `add_genre`: Adds a genre to the selected titles.
+    - `remove_genre`: Removes a genre from the selected titles.
+    - `run_bulk_operation`: Checks an operation and its target, then runs it.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .changes import record_title_changes
+from .facets import GenreFilter
+from .models import Author, Genre, SimilarTitle, Title, TitleChange
+from .pagecache import detail_page_cache
+from .search import match_titles, update_search_vectors
+from .stats import adjust_title_counts, count_titles
+from .versions import bump_catalogue_version
+
+DELETE = 'delete'
+REASSIGN_AUTHOR = 'reassign_author'
+ADD_GENRE = 'add_genre'
+REMOVE_GENRE = 'remove_genre'
+
+TITLE_TABLE = Title._meta.db_table
+LINK_TABLE = Title.genre.through._meta.db_table
+SIMILAR_TABLE = SimilarTitle._meta.db_table
+
+
+class BulkLimitExceeded(Exception):
+    """
+    Raised when a selection holds more titles than a bulk operation may change.
+
+    Attributes:
+        limit (int): The largest number of titles allowed.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        super().__init__(f"The selection holds more than {limit} titles; narrow it or raise the limit.")
+
+
+def select_titles(ids=None, genre_filter=None, query='', author_id=None):
+    """
+    Returns the titles selected by ids and filters, which must all match.
+
+    Args:
+        ids (list, optional): The primary keys of the titles.
+        genre_filter (GenreFilter, optional): The genres the titles must have.
+        query (str, optional): Search text the titles must match.
+        author_id (int, optional): The author of the titles.
+
+    Returns:
+        QuerySet: The selected titles.
+
+    Raises:
+        BadRequest: If nothing is selected, as an operation on the whole catalogue
+            is almost certainly a mistake.
+    """
+    if ids is None and not genre_filter and not query and author_id is None:
+        raise BadRequest("Select titles by id or by a filter")
+    titles = Title.objects.all()
+    if ids is not None:
+        titles = titles.filter(pk__in=ids)
+    if author_id is not None:
+        titles = titles.filter(author_id=author_id)
+    if genre_filter:
+        titles = genre_filter.apply(titles)
+    if query:
+        titles = match_titles(query, titles)
+    return titles
+
+
+def select_titles_from_params(params):
+    """
+    Returns the titles selected by the `ids`, `genre`, `match`, `q` and `author` parameters.
+
+    The filter parameters are those of the title list, so the titles shown by a
+    filtered list can be selected with the same query string.
+
+    Args:
+        params (QueryDict): The query string or form parameters.
+
+    Returns:
+        QuerySet: The selected titles.
+
+    Raises:
+        BadRequest: If a parameter is malformed or nothing is selected.
+    """
+    ids = author_id = None
+    try:
+        if 'ids' in params:
+            ids = list(dict.fromkeys(int(pk) for pk in params['ids'].split(',') if pk))
+        if params.get('author'):
+            author_id = int(params['author'])
+    except ValueError:
+        raise BadRequest("ids and author must be integers")
+    return select_titles(ids, GenreFilter.from_params(params), params.get('q', '').strip(), author_id)
+
+
+def _run(titles, dry_run, limit, count, apply):
+    limit = settings.BULK_EDIT_LIMIT if limit is None else limit
+    with transaction.atomic():
+        selected = titles.order_by('pk').values_list('pk', flat=True)
+        if not dry_run:
+            selected = selected.select_for_update()
+        ids = list(selected[:limit + 1])
+        if len(ids) > limit:
+            raise BulkLimitExceeded(limit)
+        changed = count(ids) if dry_run else apply(ids)
+    return {'matched': len(ids), 'changed': changed, 'dry_run': dry_run}
+
+
+def _titles_changed(pks, action):
+    if pks:
+        bump_catalogue_version()
+        detail_page_cache.invalidate(pks)
+        record_title_changes(pks, action)
+
+
+def _count(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+
+def delete_titles(titles, dry_run=False, limit=None):
+    """
+    Deletes the selected titles, their genre links and their similar titles rows.
+
+    Titles that list a deleted title as similar lose it, and their cached pages are
+    invalidated.
+
+    Args:
+        titles (QuerySet): The selected titles.
+        dry_run (bool, optional): Only count the titles that would be deleted.
+        limit (int, optional): The largest number of titles that may be selected.
+            Defaults to `BULK_EDIT_LIMIT`.
+
+    Returns:
+        dict: The number of `matched` and of deleted (`changed`) titles, and `dry_run`.
+
+    Raises:
+        BulkLimitExceeded: If more than `limit` titles are selected.
+    """
+    def apply(ids):
+        count_titles(ids, -1)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {LINK_TABLE} WHERE title_id = ANY(%s)", [ids])
+            cursor.execute(
+                f"DELETE FROM {SIMILAR_TABLE} WHERE title_id = ANY(%s) OR similar_id = ANY(%s) RETURNING title_id",
+                [ids, ids],
+            )
+            detail_page_cache.invalidate({title_id for title_id, in cursor.fetchall()})
+            cursor.execute(f"DELETE FROM {TITLE_TABLE} WHERE id = ANY(%s)", [ids])
+            deleted = cursor.rowcount
+        _titles_changed(ids, TitleChange.DELETED)
+        return deleted
+
+    return _run(titles, dry_run, limit, len, apply)
+
+
+def reassign_author(titles, author_id, dry_run=False, limit=None):
+    """
+    Moves the selected titles to another author.
+
+    The cached pages of titles that list a moved title as similar are invalidated,
+    since they show its author.
+
+    Args:
+        titles (QuerySet): The selected titles.
+        author_id (int): The primary key of an existing author.
+        dry_run (bool, optional): Only count the titles that would be moved.
+        limit (int, optional): The largest number of titles that may be selected.
+            Defaults to `BULK_EDIT_LIMIT`.
+
+    Returns:
+        dict: The number of `matched` and of moved (`changed`) titles, and `dry_run`.
+
+    Raises:
+        BulkLimitExceeded: If more than `limit` titles are selected.
+    """
+    def count(ids):
+        return _count(f"SELECT count(*) FROM {TITLE_TABLE} WHERE id = ANY(%s) AND author_id <> %s", [ids, author_id])
+
+    def apply(ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {TITLE_TABLE} AS t SET author_id = %s, updated_at = %s FROM {TITLE_TABLE} AS o "
+                f"WHERE o.id = t.id AND t.id = ANY(%s) AND o.author_id <> %s RETURNING t.id, o.author_id",
+                [author_id, timezone.now(), ids, author_id],
+            )
+            moved = cursor.fetchall()
+            cursor.execute(
+                f"SELECT title_id FROM {SIMILAR_TABLE} WHERE similar_id = ANY(%s)", [[pk for pk, previous in moved]]
+            )
+            detail_page_cache.invalidate({title_id for title_id, in cursor.fetchall()})
+        deltas = Counter({author_id: len(moved)})
+        deltas.subtract(previous for pk, previous in moved)
+        adjust_title_counts(Author, deltas)
+        pks = [pk for pk, previous in moved]
+        if pks:
+            update_search_vectors(Title.objects.filter(pk__in=pks))
+        _titles_changed(pks, TitleChange.UPDATED)
+        return len(pks)
+
+    return _run(titles, dry_run, limit, count, apply)
+
+
+def add_genre(titles, genre_id, dry_run=False, limit=None):
+    """
+    Adds a genre to the selected titles that do not have it yet.
+
+    Args:
+        titles (QuerySet): The selected titles.
+        genre_id (int): The primary key of an existing genre.
+        dry_run (bool, optional): Only count the titles that would gain the genre.
+        limit (int, optional): The largest number of titles that may be selected.
+            Defaults to `BULK_EDIT_LIMIT`.
+
+    Returns:
+        dict: The number of `matched` and of changed titles, and `dry_run`.
+
+    Raises:
+        BulkLimitExceeded: If more than `limit` titles are selected.
+    """
+    def count(ids):
+        return len(ids) - _count(
+            f"SELECT count(*) FROM {LINK_TABLE} WHERE genre_id = %s AND title_id = ANY(%s)", [genre_id, ids]
+        )
+
+    def apply(ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {LINK_TABLE} (title_id, genre_id) SELECT unnest(%s::bigint[]), %s "
+                f"ON CONFLICT (title_id, genre_id) DO NOTHING RETURNING title_id",
+                [ids, genre_id],
+            )
+            added = [row[0] for row in cursor.fetchall()]
+        return _genre_links_changed(added, genre_id, 1)
+
+    return _run(titles, dry_run, limit, count, apply)
+
+
+def remove_genre(titles, genre_id, dry_run=False, limit=None):
+    """
+    Removes a genre from the selected titles that have it.
+
+    Args:
+        titles (QuerySet): The selected titles.
+        genre_id (int): The primary key of an existing genre.
+        dry_run (bool, optional): Only count the titles that would lose the genre.
+        limit (int, optional): The largest number of titles that may be selected.
+            Defaults to `BULK_EDIT_LIMIT`.
+
+    Returns:
+        dict: The number of `matched` and of changed titles, and `dry_run`.
+
+    Raises:
+        BulkLimitExceeded: If more than `limit` titles are selected.
+    """
+    def count(ids):
+        return _count(f"SELECT count(*) FROM {LINK_TABLE} WHERE genre_id = %s AND title_id = ANY(%s)", [genre_id, ids])
+
+    def apply(ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {LINK_TABLE} WHERE genre_id = %s AND title_id = ANY(%s) RETURNING title_id",
+                [genre_id, ids],
+            )
+            removed = [row[0] for row in cursor.fetchall()]
+        return _genre_links_changed(removed, genre_id, -1)
+
+    return _run(titles, dry_run, limit, count, apply)
+
+
+def _genre_links_changed(pks, genre_id, sign):
+    if pks:
+        adjust_title_counts(Genre, {genre_id: sign * len(pks)})
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {TITLE_TABLE} SET updated_at = %s WHERE id = ANY(%s)", [timezone.now(), pks])
+    _titles_changed(pks, TitleChange.UPDATED)
+    return len(pks)
+
+
+OPERATIONS = {
+    DELETE: (delete_titles, None),
+    REASSIGN_AUTHOR: (reassign_author, Author),
+    ADD_GENRE: (add_genre, Genre),
+    REMOVE_GENRE: (remove_genre, Genre),
+}
+
+
+def run_bulk_operation(operation, titles, target=None, dry_run=False, limit=None):
+    """
+    Runs a bulk operation by name after checking its target.
+
+    Args:
+        operation (str): One of the `OPERATIONS` names.
+        titles (QuerySet): The selected titles.
+        target (int, optional): The author or genre id the operation needs; none for `delete`.
+        dry_run (bool, optional): Only count the titles that would change.
+        limit (int, optional): The largest number of titles that may be selected.
+            Defaults to `BULK_EDIT_LIMIT`.
+
+    Returns:
+        dict: The `operation`, the number of `matched` and `changed` titles, and `dry_run`.
+
+    Raises:
+        BadRequest: If the operation is unknown or its target is missing or unknown.
+        BulkLimitExceeded: If more than `limit` titles are selected.
+    """
+    if operation not in OPERATIONS:
+        raise BadRequest(f"Unknown operation: {operation}")
+    function, model = OPERATIONS[operation]
+    if model is None:
+        if target is not None:
+            raise BadRequest(f"{operation} takes no target")
+        result = function(titles, dry_run=dry_run, limit=limit)
+    else:
+        if target is None:
+            raise BadRequest(f"{operation} needs a target {model._meta.model_name}")
+        if not model.objects.filter(pk=target).exists():
+            raise BadRequest(f"Unknown {model._meta.model_name}: {target}")
+        result = function(titles, target, dry_run=dry_run, limit=limit)
+    return {'operation': operation, **result}
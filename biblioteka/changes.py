@@ -0,0 +1,252 @@
+"""
+Change log of the catalogue, read by sync clients to transfer only deltas.
+
+Every creation, change and deletion of a title writes a `TitleChange` entry in the
+same transaction: `biblioteka.signals` records changes made through the ORM,
+including genre and author changes, and the bulk loaders record the titles they
+create. A sync client first copies the catalogue (for example with
+`export_titles`), remembers the head of the log taken before the copy, and from then
+on reads the entries after its cursor from the `api/changes/` feed or the
+`title_changes` command. `created` and `updated` entries carry the current state of
+the title and should be applied as upserts; `deleted` entries are tombstones.
+
+Entries are ordered by `(txid, id)` and a read only returns entries of transactions
+older than every transaction still in progress (`pg_snapshot_xmin`). An entry that
+commits later therefore always sorts after the cursor of a client that has read up
+to now, and is never skipped.
+
+The log is kept small by `prune_title_changes`:
+
+    - compaction deletes entries older than `CHANGE_LOG_COMPACT_AFTER_DAYS` that are
+      superseded by a later entry for the same title. Clients behind them still see
+      the later entry, which carries the current state, so nothing is lost;
+    - retention deletes every entry older than `CHANGE_LOG_RETENTION_DAYS`, and
+      records the last deleted transaction id. Cursors at or before it are expired,
+      as the tombstones they still needed are gone, and their clients must resync.
+
+Classes:
+    - `ChangeCursorExpired`: Raised for a cursor older than the retained log.
+
+Functions:
+    - `record_title_changes`: Writes change log entries for titles.
+    - `encode_change_cursor`: Turns a log position into an opaque token.
+    - `decode_change_cursor`: Turns an opaque token back into a log position.
+    - `read_changes`: Returns the entries after a cursor, with the state of their titles.
+    - `head_cursor`: Returns the cursor of the newest readable entry.
+    - `compact_changes`: Deletes entries superseded by a later entry for the same title.
+    - `purge_changes`: Deletes old entries and expires the cursors that pointed into them.
+    - `reset_change_log`: Deletes every entry and expires every cursor.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import BadRequest
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.db.models.expressions import RawSQL
+
+from .api import DEFAULT_FIELDS, serialize_titles, title_values
+from .models import CatalogueVersion, Title, TitleChange
+
+PURGED = 'title-changes-purged'
+
+SNAPSHOT_XMIN = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+
+class ChangeCursorExpired(Exception):
+    """
+    Raised when a cursor points to entries that were deleted by the retention policy.
+    """
+
+
+def record_title_changes(pks, action):
+    """
+    Writes one change log entry per title in a single statement.
+
+    Args:
+        pks (iterable): The primary keys of the changed titles.
+        action (str): `TitleChange.CREATED`, `UPDATED` or `DELETED`.
+    """
+    pks = list(pks)
+    if not pks:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {TitleChange._meta.db_table} (title_id, action) "
+            f"SELECT unnest(%s::bigint[]), %s",
+            [pks, action],
+        )
+
+
+def encode_change_cursor(txid, pk):
+    """
+    Encodes a change log position as an opaque cursor token.
+
+    Args:
+        txid (int): The transaction id of the entry.
+        pk (int): The primary key of the entry.
+
+    Returns:
+        str: A URL-safe token without padding.
+    """
+    raw = json.dumps([txid, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_change_cursor(token):
+    """
+    Decodes an opaque cursor token back into a change log position.
+
+    Args:
+        token (str): A token previously produced by `encode_change_cursor`.
+
+    Returns:
+        tuple: The `(txid, id)` pair stored in the token.
+
+    Raises:
+        BadRequest: If the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        txid, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise BadRequest("Invalid change cursor")
+    if not isinstance(txid, int) or not isinstance(pk, int):
+        raise BadRequest("Invalid change cursor")
+    return txid, pk
+
+
+def _readable():
+    return TitleChange.objects.filter(txid__lt=RawSQL(SNAPSHOT_XMIN, []))
+
+
+def read_changes(after=None, limit=100, fields=DEFAULT_FIELDS):
+    """
+    Returns the change log entries after a cursor, oldest first.
+
+    Args:
+        after (str, optional): The cursor returned by the previous read. Without it,
+            reading starts at the oldest retained entry.
+        limit (int, optional): The maximum number of entries.
+        fields (list, optional): The API fields of the title state included with
+            `created` and `updated` entries.
+
+    Returns:
+        tuple: A list of entries, each a dictionary with the entry `id`, the
+            `title_id`, the `action`, `changed_at` and the current `title` state
+            (None for titles that no longer exist), the cursor to continue from,
+            and whether more entries are readable now.
+
+    Raises:
+        BadRequest: If the cursor is malformed.
+        ChangeCursorExpired: If the cursor is older than the retained log.
+    """
+    entries = _readable()
+    position = None
+    if after:
+        position = decode_change_cursor(after)
+        txid, pk = position
+        purged = CatalogueVersion.objects.filter(name=PURGED).values_list('version', flat=True).first()
+        if purged is not None and txid <= purged:
+            raise ChangeCursorExpired(after)
+        entries = entries.filter(Q(txid__gt=txid) | Q(txid=txid, id__gt=pk))
+    rows = list(
+        entries.order_by('txid', 'id').values('id', 'txid', 'title_id', 'action', 'changed_at')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    live = {row['title_id'] for row in rows if row['action'] != TitleChange.DELETED}
+    states = {}
+    if live:
+        titles = list(title_values(Title.objects.filter(pk__in=live), fields, ['id']))
+        states = dict(zip((title['id'] for title in titles), serialize_titles(titles, fields)))
+    if rows:
+        position = rows[-1]['txid'], rows[-1]['id']
+    results = [
+        {
+            'id': row['id'],
+            'title_id': row['title_id'],
+            'action': row['action'],
+            'changed_at': row['changed_at'],
+            'title': states.get(row['title_id']) if row['action'] != TitleChange.DELETED else None,
+        }
+        for row in rows
+    ]
+    return results, encode_change_cursor(*position) if position else after, has_more
+
+
+def head_cursor():
+    """
+    Returns the cursor of the newest change log entry that can be read now.
+
+    A client that copies the catalogue after taking this cursor and then reads the
+    feed from it misses no change.
+
+    Returns:
+        str or None: The cursor, or None if the log is empty.
+    """
+    head = _readable().order_by('-txid', '-id').values_list('txid', 'id').first()
+    return encode_change_cursor(*head) if head else None
+
+
+def compact_changes(before):
+    """
+    Deletes entries older than `before` that are superseded by a later entry for the same title.
+
+    Args:
+        before (datetime): Only entries made before this moment are deleted.
+
+    Returns:
+        int: The number of deleted entries.
+    """
+    table = TitleChange._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} AS c WHERE c.changed_at < %s AND EXISTS ("
+            f"SELECT 1 FROM {table} AS l WHERE l.title_id = c.title_id AND (l.txid, l.id) > (c.txid, c.id))",
+            [before],
+        )
+        return cursor.rowcount
+
+
+def purge_changes(before):
+    """
+    Deletes the entries older than `before` and expires the cursors pointing into them.
+
+    Whole transactions are deleted, up to the newest transaction with an entry made
+    before `before`, so that no cursor is left halfway through a transaction.
+
+    Args:
+        before (datetime): Entries made before this moment are deleted.
+
+    Returns:
+        int: The number of deleted entries.
+    """
+    with transaction.atomic():
+        horizon = TitleChange.objects.filter(changed_at__lt=before).aggregate(txid=Max('txid'))['txid']
+        if horizon is None:
+            return 0
+        _expire_cursors(horizon)
+        deleted, _ = TitleChange.objects.filter(txid__lte=horizon).delete()
+    return deleted
+
+
+def reset_change_log():
+    """
+    Deletes every change log entry and expires every cursor.
+
+    Used when the catalogue is emptied behind the application's back, so that sync
+    clients resynchronize instead of keeping titles that no longer exist.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {TitleChange._meta.db_table}")
+        cursor.execute("SELECT pg_current_xact_id()::text::bigint")
+        _expire_cursors(cursor.fetchone()[0])
+
+
+def _expire_cursors(txid):
+    updated = CatalogueVersion.objects.filter(name=PURGED, version__lt=txid).update(version=txid)
+    if not updated:
+        CatalogueVersion.objects.get_or_create(name=PURGED, defaults={'version': txid})
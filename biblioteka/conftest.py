@@ -7,6 +7,9 @@ The fixtures are used to set up reusable and consistent test data for unit tests
 Fixtures:
     - `setup_books`: Creates an author, two genres, and two titles with genre associations.
     - `setup_genres`: Creates two genres.
+    - `author_cache`: Provides an empty per-process author cache.
+    - `reset_caches`: Empties the shared and process-local caches around every test.
+    - `async_views`: Routes requests to the async view variants.
 
 Modules Imported:
     - `pytest`: Provides the fixture decorator and testing utilities.
@@ -16,6 +19,9 @@ Modules Imported:
 Django Setup:
     - The environment variable `DJANGO_SETTINGS_MODULE` is set to point to the `Library.settings` module.
     - `django.setup()` initializes the Django application for standalone script usage.
+    - A `test_replica` database alias mirrors the test database, standing in for a read
+      replica in the tests that list it in their `databases`. It is not added to
+      `DATABASE_REPLICAS`, so reads stay on the primary unless a test routes them there.
 
 Fixtures:
     1. `setup_books`:
@@ -30,17 +36,54 @@ Fixtures:
         - Creates two genres: `Adventure` and `Fantasy`.
         - Returns: A list of the two created `Genre` objects.
 
+    3. `author_cache`:
+        - Empties the per-process author cache before and after the test, so that ids
+          cached from rolled-back test transactions never leak into other tests.
+        - Returns: The `LRUCache` instance used by `resolve_author`.
+
+    4. `reset_caches` (autouse):
+        - Clears Django's caches, the cached genre choices and the mapped catalogue snapshot
+          before and after every test, since cached rows outlive the rolled-back test
+          transactions that created them.
+
+    5. `async_views`:
+        - Turns the `ASYNC_VIEWS` setting on and reloads the app's URLconf, so that requests
+          are routed to the async view variants. The app and root URLconfs are reloaded
+          again afterwards.
+
 Usage:
     Include these fixtures in test cases that require pre-populated `Author`, `Genre`, or `Title` instances.
 """
 
+import importlib
 import pytest
 import os
 import django
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import clear_url_caches
+from .authors import author_cache as _author_cache
+from .genres import invalidate_genre_choices
 from .models import Title, Author, Genre
+from .snapshot import forget_snapshot
+from . import urls
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Library.settings")
 django.setup()
+settings.DATABASES['test_replica'] = {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    for cache in caches.all():
+        cache.clear()
+    invalidate_genre_choices()
+    forget_snapshot()
+    yield
+    for cache in caches.all():
+        cache.clear()
+    invalidate_genre_choices()
+    forget_snapshot()
 
 @pytest.fixture
 def setup_books(db):
@@ -57,4 +100,22 @@ def setup_books(db):
 def setup_genres(db):
     genre1 = Genre.objects.create(name='Adventure')
     genre2 = Genre.objects.create(name='Fantasy')
-    return [genre1, genre2]
\ No newline at end of file
+    return [genre1, genre2]
+
+@pytest.fixture
+def author_cache():
+    _author_cache.clear()
+    yield _author_cache
+    _author_cache.clear()
+
+def _reload_urlconf():
+    importlib.reload(urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+@pytest.fixture
+def async_views():
+    with override_settings(ASYNC_VIEWS=True):
+        _reload_urlconf()
+        yield
+    _reload_urlconf()
@@ -0,0 +1,88 @@
+"""
+Database connection helpers for the library application.
+
+`Library/settings.py` configures either a psycopg 3 connection pool per worker
+process or persistent per-thread connections, with health checks and a statement
+timeout in both cases. This module reports how those connections are used, so that
+pool sizes can be tuned per worker, and lets long-running maintenance work lift
+the statement timeout.
+
+Functions:
+    - `connection_stats`: Returns the connection settings and pool usage of this process.
+    - `without_statement_timeout`: Context manager disabling the statement timeout.
+"""
+
+import os
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def connection_stats(alias=DEFAULT_DB_ALIAS):
+    """
+    Returns the connection settings and, when pooling is on, the pool usage of this process.
+
+    Pool counters are cumulative since the pool was opened. Each worker process has
+    its own pool, so the figures describe the process that answers the call.
+
+    Args:
+        alias (str, optional): The database alias.
+
+    Returns:
+        dict: The `alias`, the process `pid`, whether the connection is `pooled`, and
+            either the pool figures (`min_size`, `max_size`, `size`, `in_use`,
+            `available`, `waiting`, `requests`, `queued`, `wait_ms_total`,
+            `wait_ms_avg`, `timeouts`, `connection_errors`) or, without a pool,
+            `conn_max_age` and whether the thread is `connected`.
+    """
+    connection = connections[alias]
+    stats = {
+        'alias': alias,
+        'pid': os.getpid(),
+        'pooled': connection.pool is not None,
+        'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+    }
+    if connection.pool is None:
+        stats['conn_max_age'] = connection.settings_dict['CONN_MAX_AGE']
+        stats['connected'] = connection.connection is not None
+        return stats
+
+    pool = connection.pool
+    raw = pool.get_stats()
+    queued = raw.get('requests_queued', 0)
+    wait_ms = raw.get('requests_wait_ms', 0)
+    stats.update({
+        'min_size': pool.min_size,
+        'max_size': pool.max_size,
+        'size': raw.get('pool_size', 0),
+        'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+        'available': raw.get('pool_available', 0),
+        'waiting': raw.get('requests_waiting', 0),
+        'requests': raw.get('requests_num', 0),
+        'queued': queued,
+        'wait_ms_total': wait_ms,
+        'wait_ms_avg': round(wait_ms / queued, 2) if queued else 0.0,
+        'timeouts': raw.get('requests_errors', 0),
+        'connection_errors': raw.get('connections_errors', 0),
+    })
+    return stats
+
+
+@contextmanager
+def without_statement_timeout(alias=DEFAULT_DB_ALIAS):
+    """
+    Disables the statement timeout of a connection for the duration of the block.
+
+    The timeout configured with `DB_STATEMENT_TIMEOUT` protects web requests; bulk
+    loads and index builds legitimately run longer.
+
+    Args:
+        alias (str, optional): The database alias.
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SET statement_timeout = 0")
+    try:
+        yield
+    finally:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("RESET statement_timeout")
@@ -0,0 +1,82 @@
+"""
+Stored description excerpts for the title list.
+
+The title list shows the first `EXCERPT_WORDS` words of each description. Rather
+than loading every description and truncating it while rendering, each title
+stores its excerpt in `Title.excerpt`, and the list loads only that column.
+
+Excerpts are computed in Python, with the same truncation as the `truncatewords`
+template filter, wherever descriptions are written: `biblioteka.signals` sets the
+excerpt of every saved title, and the `import_titles` and `seed_catalogue` loaders
+compute the excerpts of the rows they copy. The `backfill_excerpts` command fills
+in the excerpts of titles written before the column existed, or, with `--all`,
+repairs excerpts left stale by changes made behind the application's back.
+
+Constants:
+    - `EXCERPT_WORDS`: The number of words kept in an excerpt.
+
+Functions:
+    - `make_excerpt`: Returns the excerpt of a description.
+    - `backfill_excerpts`: Computes and stores the excerpts of one batch of titles.
+"""
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .models import Title
+
+EXCERPT_WORDS = 20
+
+
+def make_excerpt(description):
+    """
+    Returns the first `EXCERPT_WORDS` words of a description.
+
+    Args:
+        description (str or None): The description.
+
+    Returns:
+        str: The excerpt, ending with an ellipsis if words were cut; empty for no description.
+    """
+    if not description:
+        return ''
+    return Truncator(description).words(EXCERPT_WORDS, truncate=' …')
+
+
+def backfill_excerpts(after=0, batch_size=2000, recompute=False):
+    """
+    Computes and stores the excerpts of the next batch of titles in primary key order.
+
+    Only excerpts that differ from the stored value are written, with one statement,
+    and their titles' `updated_at` is bumped so that cached list rows are replaced.
+
+    Args:
+        after (int, optional): The primary key the batch starts after.
+        batch_size (int, optional): The number of titles read.
+        recompute (bool, optional): Check every title, not only the titles that have
+            a description but no excerpt.
+
+    Returns:
+        tuple: The primary key of the last title read (None when no title is left)
+            and the number of excerpts written.
+    """
+    titles = Title.objects.filter(pk__gt=after).order_by('pk')
+    if not recompute:
+        titles = titles.filter(excerpt='').exclude(description=None).exclude(description='')
+    rows = list(titles.values_list('pk', 'description', 'excerpt')[:batch_size])
+    if not rows:
+        return None, 0
+    changed = {}
+    for pk, description, excerpt in rows:
+        value = make_excerpt(description)
+        if value != excerpt:
+            changed[pk] = value
+    if changed:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Title._meta.db_table} AS t SET excerpt = d.excerpt, updated_at = %s "
+                f"FROM unnest(%s::bigint[], %s::text[]) AS d (id, excerpt) WHERE t.id = d.id",
+                [timezone.now(), list(changed), list(changed.values())],
+            )
+    return rows[-1][0], len(changed)
@@ -0,0 +1,340 @@
+"""
+Genre filtering and genre facet counts for the title list.
+
+The title list accepts one or more `genre` query parameters holding genre ids. By
+default a title must have every selected genre (`match=all`); with `match=any`
+one of them is enough. The filter is applied with `EXISTS` subqueries on the
+title-genre link table, which its `(title_id, genre_id)` and `(genre_id, title_id)`
+indexes answer without touching the titles, so it combines with the keyset
+pagination and the full-text search of the list.
+
+Next to the list, a facet sidebar shows how many titles of the current result set
+have each genre. The counts come from one grouped query over the link table,
+restricted to the current result set; without a search, the result set itself is
+read from the link table, so the titles are not touched at all. Counts that do not
+depend on a search are the same for every visitor and are cached per catalogue
+version. The counts of the whole catalogue, shown on the unfiltered list, are read
+from the `title_count` counters of the genres (see `biblioteka.stats`).
+
+Constants:
+    - `MATCH_ALL`: Match mode requiring every selected genre.
+    - `MATCH_ANY`: Match mode requiring at least one selected genre.
+    - `CACHE_TIMEOUT`: How long counts without a search are cached, in seconds.
+
+Classes:
+    - `GenreFilter`: The genres selected in a request and how they combine.
+
+Functions:
+    - `facet_counts`: Returns the grouped genre counts query for a set of titles.
+    - `catalogue_counts`: Returns the genre counts of the whole catalogue from the counters.
+    - `facet_titles`: Returns the ids of the titles in the current result set.
+    - `get_genre_facets`: Returns the genre counts of the current result set.
+    - `aget_genre_facets`: Async version of `get_genre_facets`.
+    - `facet_links`: Returns the facets to display, with the links toggling each genre.
+    - `filter_url`: Returns the query string of a request with another genre filter.
+    - `filter_query`: Returns the query string of a request without its pagination cursors.
+"""
+
+from django.core.cache import cache
+from django.core.exceptions import BadRequest
+from django.db.models import Count, Exists, OuterRef
+
+from .metrics import record_cache
+from .models import Genre, Title
+from .search import match_titles
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+
+CACHE_TIMEOUT = 60 * 60
+
+PAGINATION_PARAMETERS = ('after', 'before')
+
+
+class GenreFilter:
+    """
+    The genres selected in a request and how they combine.
+
+    Attributes:
+        genre_ids (tuple): The selected genre ids, sorted and without duplicates.
+        match (str): `MATCH_ALL` or `MATCH_ANY`.
+    """
+
+    def __init__(self, genre_ids=(), match=MATCH_ALL):
+        self.genre_ids = tuple(sorted(set(genre_ids)))
+        self.match = match
+
+    @classmethod
+    def from_request(cls, request):
+        """
+        Reads the filter from the `genre` and `match` query parameters.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            GenreFilter: The selected genres; empty when no `genre` is given.
+
+        Raises:
+            BadRequest: If a genre id is not an integer or `match` is unknown.
+        """
+        return cls.from_params(request.GET)
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Reads the filter from the `genre` and `match` values of a query dictionary.
+
+        Args:
+            params (QueryDict): The query string or form parameters.
+
+        Returns:
+            GenreFilter: The selected genres; empty when no `genre` is given.
+
+        Raises:
+            BadRequest: If a genre id is not an integer or `match` is unknown.
+        """
+        try:
+            genre_ids = [int(value) for value in params.getlist('genre')]
+        except ValueError:
+            raise BadRequest("Invalid genre filter")
+        match = params.get('match', MATCH_ALL)
+        if match not in (MATCH_ALL, MATCH_ANY):
+            raise BadRequest("Invalid genre match mode")
+        return cls(genre_ids, match)
+
+    def __bool__(self):
+        return bool(self.genre_ids)
+
+    def apply(self, queryset):
+        """
+        Restricts a title queryset to the titles matching the filter.
+
+        Args:
+            queryset (QuerySet): The titles to filter.
+
+        Returns:
+            QuerySet: The matching titles; `queryset` itself when nothing is selected.
+        """
+        if not self.genre_ids:
+            return queryset
+        links = Title.genre.through.objects.filter(title_id=OuterRef('pk'))
+        if self.match == MATCH_ANY:
+            return queryset.filter(Exists(links.filter(genre_id__in=self.genre_ids)))
+        for genre_id in self.genre_ids:
+            queryset = queryset.filter(Exists(links.filter(genre_id=genre_id)))
+        return queryset
+
+    def title_ids(self):
+        """
+        Returns the ids of the titles matching the filter, read from the link table only.
+
+        Returns:
+            QuerySet: A `title_id` values query answered from the `(genre_id, title_id)`
+                index, for use as a subquery.
+        """
+        links = Title.genre.through.objects.filter(genre_id__in=self.genre_ids)
+        if self.match == MATCH_ANY or len(self.genre_ids) == 1:
+            return links.values('title_id')
+        return (
+            links
+            .values('title_id')
+            .annotate(genres=Count('genre_id'))
+            .filter(genres=len(self.genre_ids))
+            .values('title_id')
+        )
+
+    def toggled(self, genre_id):
+        """
+        Returns a copy of the filter with a genre selected or deselected.
+
+        Args:
+            genre_id (int): The genre to toggle.
+
+        Returns:
+            GenreFilter: The new filter, with the same match mode.
+        """
+        genre_ids = set(self.genre_ids) ^ {genre_id}
+        return GenreFilter(genre_ids, self.match)
+
+
+def facet_counts(title_ids=None):
+    """
+    Returns the query counting, in one grouped pass, the titles of each genre.
+
+    Args:
+        title_ids (QuerySet, optional): A values query of the ids of the titles to
+            count. Defaults to the whole catalogue.
+
+    Returns:
+        QuerySet: `(genre id, genre name, count)` tuples, largest count first, for
+            the genres that have at least one of the titles.
+    """
+    links = Title.genre.through.objects.all()
+    if title_ids is not None:
+        links = links.filter(title_id__in=title_ids)
+    return (
+        links
+        .values('genre_id', 'genre__name')
+        .annotate(count=Count('title_id'))
+        .order_by('-count', 'genre__name')
+        .values_list('genre_id', 'genre__name', 'count')
+    )
+
+
+def catalogue_counts():
+    """
+    Returns the query reading the genre counts of the whole catalogue from the genre counters.
+
+    Returns:
+        QuerySet: `(genre id, genre name, count)` tuples, largest count first, for
+            the genres that have titles.
+    """
+    return (
+        Genre.objects
+        .filter(title_count__gt=0)
+        .order_by('-title_count', 'name')
+        .values_list('pk', 'name', 'title_count')
+    )
+
+
+def facet_titles(genre_filter, query=''):
+    """
+    Returns the result set whose genre counts the sidebar shows.
+
+    Args:
+        genre_filter (GenreFilter): The selected genres.
+        query (str, optional): The search text.
+
+    Returns:
+        QuerySet or None: The ids of every title matching the search and the genre
+            filter, not only the current page, or None when neither is active.
+    """
+    if query:
+        return genre_filter.apply(match_titles(query)).values('pk')
+    if genre_filter:
+        return genre_filter.title_ids()
+    return None
+
+
+def _cache_key(version, genre_filter):
+    genre_ids = ','.join(str(genre_id) for genre_id in genre_filter.genre_ids)
+    return f'biblioteka:genre-facets:{version}:{genre_filter.match}:{genre_ids}'
+
+
+def get_genre_facets(version, genre_filter, query=''):
+    """
+    Returns the genre counts of the current result set.
+
+    The counts of the unfiltered catalogue are read from the genre counters.
+    Without a search, the counts depend only on the genre filter and are cached
+    per catalogue version, as there are few distinct filters.
+
+    Args:
+        version (int): The current version of the title collection.
+        genre_filter (GenreFilter): The selected genres.
+        query (str, optional): The search text.
+
+    Returns:
+        list: `(genre id, genre name, count)` tuples, largest count first.
+    """
+    if query:
+        return list(facet_counts(facet_titles(genre_filter, query)))
+    if not genre_filter:
+        return list(catalogue_counts())
+    key = _cache_key(version, genre_filter)
+    counts = cache.get(key)
+    record_cache(counts is not None)
+    if counts is None:
+        counts = list(facet_counts(facet_titles(genre_filter)))
+        cache.set(key, counts, CACHE_TIMEOUT)
+    return counts
+
+
+async def aget_genre_facets(version, genre_filter, query=''):
+    """
+    Async version of `get_genre_facets`, using the async ORM and cache API.
+
+    Args:
+        version (int): The current version of the title collection.
+        genre_filter (GenreFilter): The selected genres.
+        query (str, optional): The search text.
+
+    Returns:
+        list: `(genre id, genre name, count)` tuples, largest count first.
+    """
+    if query:
+        return [row async for row in facet_counts(facet_titles(genre_filter, query))]
+    if not genre_filter:
+        return [row async for row in catalogue_counts()]
+    key = _cache_key(version, genre_filter)
+    counts = await cache.aget(key)
+    record_cache(counts is not None)
+    if counts is None:
+        counts = [row async for row in facet_counts(facet_titles(genre_filter))]
+        await cache.aset(key, counts, CACHE_TIMEOUT)
+    return counts
+
+
+def facet_links(request, counts, genre_filter):
+    """
+    Returns the facets to display, each with the link selecting or deselecting it.
+
+    The links keep the other query parameters, such as the search text, and drop
+    the pagination cursors, since the result set changes.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        counts (list): The `(genre id, genre name, count)` tuples to display.
+        genre_filter (GenreFilter): The current filter.
+
+    Returns:
+        list: Dictionaries with the genre's `id`, `name`, `count`, whether it is
+            `selected`, and the query string `url` toggling it.
+    """
+    facets = []
+    for genre_id, name, count in counts:
+        facets.append({
+            'id': genre_id,
+            'name': name,
+            'count': count,
+            'selected': genre_id in genre_filter.genre_ids,
+            'url': filter_url(request, genre_filter.toggled(genre_id)),
+        })
+    return facets
+
+
+def filter_url(request, genre_filter):
+    """
+    Returns the query string of the current request with another genre filter.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        genre_filter (GenreFilter): The filter to put in the query string.
+
+    Returns:
+        str: The query string, starting with `?`.
+    """
+    params = request.GET.copy()
+    for name in PAGINATION_PARAMETERS + ('genre', 'match'):
+        params.pop(name, None)
+    params.setlist('genre', [str(genre_id) for genre_id in genre_filter.genre_ids])
+    if genre_filter.genre_ids and genre_filter.match != MATCH_ALL:
+        params['match'] = genre_filter.match
+    return f'?{params.urlencode()}'
+
+
+def filter_query(request):
+    """
+    Returns the filter and search parameters of a request, for pagination links.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        str: The query string without the pagination cursors and without `?`.
+    """
+    params = request.GET.copy()
+    for name in PAGINATION_PARAMETERS:
+        params.pop(name, None)
+    return params.urlencode()
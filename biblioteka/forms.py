@@ -1,5 +1,64 @@
 from django import forms
-from .models import Title, Author, Genre
+from .authors import resolve_author
+from .genres import get_genre_choices
+from .models import Title
+
+
+class GenreMultipleChoiceField(forms.MultipleChoiceField):
+    """
+    A multiple choice field over genres backed by the cached genre choices.
+
+    Unlike `ModelMultipleChoiceField`, rendering and validating this field does not
+    query the genre table: the choices come from `get_genre_choices` and the cleaned
+    value is a list of genre ids, which is all `Title.genre.set()` needs.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=get_genre_choices, **kwargs)
+
+    def to_python(self, value):
+        """
+        Converts the submitted values to a list of genre ids.
+
+        Args:
+            value (list): The submitted values.
+
+        Returns:
+            list: The genre ids as integers.
+
+        Raises:
+            forms.ValidationError: If a value is not an integer.
+        """
+        try:
+            return [int(item) for item in super().to_python(value)]
+        except ValueError:
+            raise forms.ValidationError(self.error_messages['invalid_list'], code='invalid_list')
+
+    def valid_value(self, value):
+        """
+        Checks whether a genre id is among the cached choices.
+
+        Args:
+            value (int): A genre id.
+
+        Returns:
+            bool: True if the genre exists.
+        """
+        return any(value == pk for pk, name in self.choices)
+
+    def prepare_value(self, value):
+        """
+        Converts initial `Genre` instances to their ids for rendering.
+
+        Args:
+            value (list): Genre instances or ids.
+
+        Returns:
+            list: The genre ids.
+        """
+        if value is None:
+            return value
+        return [getattr(item, 'pk', item) for item in value]
 
 
 class TitleForm(forms.ModelForm):
@@ -11,18 +70,19 @@ class TitleForm(forms.ModelForm):
     and supports multiple genre selection.
 
     Attributes:
+        field_order (list): The order in which the fields are rendered.
         author (forms.CharField): A text input for entering the author's name.
             It is rendered with a custom ID attribute.
-        genre (forms.ModelMultipleChoiceField): A field allowing multiple genre
-            selection via checkboxes.
+        genre (GenreMultipleChoiceField): A field allowing multiple genre
+            selection via checkboxes, served from the cached genre choices.
     """
+    field_order = ['name', 'description', 'author', 'genre']
     author = forms.CharField(
         max_length=100,
         label="Author",
         widget=forms.TextInput(attrs={'id': 'id_author'})
     )
-    genre = forms.ModelMultipleChoiceField(
-        queryset=Genre.objects.all(),
+    genre = GenreMultipleChoiceField(
         widget=forms.CheckboxSelectMultiple(),
         label="Genre"
     )
@@ -32,11 +92,13 @@ class TitleForm(forms.ModelForm):
 
         Attributes:
             model (Title): The model associated with this form.
-            fields (list): The fields to include in the form.
+            fields (list): The model fields to include in the form. `author` is left out
+                because it is resolved by `clean_author` and assigned by the views, which
+                also spares the redundant foreign key existence check on validation.
             widgets (dict): Custom widgets for specific fields.
         """
         model = Title
-        fields = ['name', 'description', 'author', 'genre']
+        fields = ['name', 'description', 'genre']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
         }
@@ -56,8 +118,9 @@ class TitleForm(forms.ModelForm):
         """
         Cleans and validates the `author` field.
 
-        Ensures that the provided author name is a string. If the author does not already
-        exist in the database, a new `Author` instance is created.
+        Ensures that the provided author name is a string and resolves it to an `Author`
+        with `resolve_author`, which matches names case-insensitively and creates the
+        author in the same round trip if it does not already exist.
 
         Returns:
             Author: The existing or newly created Author instance.
@@ -68,5 +131,4 @@ class TitleForm(forms.ModelForm):
         data = self.cleaned_data['author']
         if not isinstance(data, str):
             raise forms.ValidationError("Must be a text value")
-        author, created = Author.objects.get_or_create(name=data)
-        return author
\ No newline at end of file
+        return resolve_author(data)
\ No newline at end of file
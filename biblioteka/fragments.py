@@ -0,0 +1,138 @@
+"""
+Cached rendering of the rows of the title list.
+
+Rendering a list page used to evaluate the row markup of every title in full,
+reversing the detail URL and truncating the description once per row. Rows are now
+rendered by `render_title_rows`:
+
+    - the row template (`ROW_TEMPLATE`) is compiled once and rendered for each
+      title with one shared context;
+    - the detail URL is reversed once per render and completed with each title id;
+    - rendered rows are cached in the `pages` cache under the title id and its
+      `updated_at`, which `biblioteka.signals` bumps on every change that shows in a
+      row (name, excerpt, author name). The rows of a page are read with a single
+      `get_many`, and only missing rows are rendered and stored.
+
+The `title_rows` template tag renders the rows with the blocking cache API. The
+async title list view renders them beforehand with `arender_title_rows`, which
+uses `aget_many` and `aset_many` instead, and passes them to the template as `rows`,
+so that the event loop never waits on the cache.
+
+Rows of search results carry a query-dependent snippet and are not cached.
+
+Constants:
+    - `ROW_TEMPLATE`: The template of one row of the title list.
+    - `ROW_VERSION`: Part of every cache key; change it when the row template changes.
+    - `URL_SENTINEL`: The id reversed in place of title ids by `detail_url_builder`.
+
+Functions:
+    - `detail_url_builder`: Returns a function building title detail URLs.
+    - `row_key`: Returns the cache key of the row of a title.
+    - `render_title_rows`: Renders the rows of a list of titles.
+    - `arender_title_rows`: Async variant of `render_title_rows`.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template import Context
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from .metrics import record_cache
+
+ROW_TEMPLATE = 'biblioteka/title_row.html'
+
+ROW_VERSION = 1
+
+URL_SENTINEL = 9876543210
+
+
+def detail_url_builder():
+    """
+    Reverses the title detail URL once and returns a function completing it with an id.
+
+    Returns:
+        callable: Takes a title id and returns the path of its detail page.
+    """
+    prefix, _, suffix = reverse('title_detail', args=[URL_SENTINEL]).rpartition(str(URL_SENTINEL))
+    return lambda pk: f'{prefix}{pk}{suffix}'
+
+
+def row_key(title):
+    """
+    Returns the cache key of the rendered row of a title.
+
+    Args:
+        title (Title): The title, with `updated_at` loaded.
+
+    Returns:
+        str: A key that changes whenever the title changes.
+    """
+    return f'biblioteka:title-row:{ROW_VERSION}:{title.pk}:{title.updated_at.timestamp()}'
+
+
+def render_title_rows(template, titles, query='', cache=None):
+    """
+    Renders the rows of a list of titles, from the fragment cache when possible.
+
+    Args:
+        template (Template): The compiled `ROW_TEMPLATE`, from the engine rendering the page.
+        titles (iterable): The titles, with their `name`, `excerpt`, `updated_at` and
+            author loaded, and a `snippet` for search results.
+        query (str, optional): The search text; rows of search results are not cached.
+        cache (BaseCache, optional): The fragment cache. Defaults to the `pages` cache.
+
+    Returns:
+        SafeString: The rows, in the order of `titles`.
+    """
+    cache = caches['pages'] if cache is None else cache
+    titles = list(titles)
+    keys = _row_keys(titles, query)
+    rows, missing = _render_rows(template, titles, query, keys, cache.get_many(keys.values()) if keys else {})
+    if missing:
+        cache.set_many(missing, settings.TITLE_ROW_CACHE_TIMEOUT)
+    return rows
+
+
+async def arender_title_rows(template, titles, query='', cache=None):
+    """
+    Renders the rows of a list of titles like `render_title_rows`, with the async cache API.
+
+    Args:
+        template (Template): The compiled `ROW_TEMPLATE`.
+        titles (iterable): The titles, loaded as for `render_title_rows`.
+        query (str, optional): The search text; rows of search results are not cached.
+        cache (BaseCache, optional): The fragment cache. Defaults to the `pages` cache.
+
+    Returns:
+        SafeString: The rows, in the order of `titles`.
+    """
+    cache = caches['pages'] if cache is None else cache
+    titles = list(titles)
+    keys = _row_keys(titles, query)
+    rows, missing = _render_rows(template, titles, query, keys, await cache.aget_many(keys.values()) if keys else {})
+    if missing:
+        await cache.aset_many(missing, settings.TITLE_ROW_CACHE_TIMEOUT)
+    return rows
+
+
+def _row_keys(titles, query):
+    return {} if query else {title.pk: row_key(title) for title in titles}
+
+
+def _render_rows(template, titles, query, keys, cached):
+    detail_url = detail_url_builder()
+    context = Context({'query': query}, autoescape=template.engine.autoescape)
+    rows, missing = [], {}
+    for title in titles:
+        key = keys.get(title.pk)
+        row = cached.get(key) if key else None
+        if key:
+            record_cache(row is not None)
+        if row is None:
+            with context.push(title=title, url=detail_url(title.pk)):
+                row = template.render(context)
+            if key:
+                missing[key] = row
+        rows.append(row)
+    return mark_safe(''.join(rows)), missing
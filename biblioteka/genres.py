@@ -0,0 +1,92 @@
+"""
+Cached genre choices for the library application.
+
+`TitleForm` needs the full list of genres both to render its checkboxes and to
+validate submitted ids. Genres almost never change, so the list is read from the
+catalogue snapshot when one is current (see `biblioteka.snapshot`), and otherwise
+cached on two levels instead of being read from the database on every request:
+
+    1. A process-local copy, trusted for `LOCAL_TTL` seconds.
+    2. A copy in Django's default cache, keyed by the title collection version
+       (see `biblioteka.versions`). With a shared cache backend every worker
+       process reads the same copy; with the default per-process `LocMemCache`
+       each process keeps its own.
+
+Every genre save or delete bumps the title collection version (see
+`biblioteka.signals`), so once the local copy expires, a process looks the
+choices up under the new version and never reuses a list from before the change,
+whichever cache backend is configured. The change is visible immediately in the
+process that made it, where `invalidate_genre_choices` drops the local copy, and
+within `LOCAL_TTL` seconds in every other process.
+
+Constants:
+    - `CACHE_KEY`: The prefix of the cache keys holding the genre choices.
+    - `CACHE_TIMEOUT`: How long a cached copy lives, in seconds.
+    - `LOCAL_TTL`: How long the process-local copy is trusted, in seconds.
+
+Functions:
+    - `get_genre_choices`: Returns the `(id, name)` pairs of all genres.
+    - `invalidate_genre_choices`: Drops both cached copies.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .metrics import record_cache
+from .models import Genre
+from .snapshot import get_snapshot
+from .versions import get_catalogue_version
+
+CACHE_KEY = 'biblioteka:genre-choices'
+CACHE_TIMEOUT = 60 * 60
+LOCAL_TTL = 5
+
+_local = {'choices': None, 'expires': 0.0}
+
+
+def get_genre_choices():
+    """
+    Returns the `(id, name)` pairs of all genres, ordered by id.
+
+    Returns:
+        list: The genre choices, read from the fastest cache level that has them.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        record_cache(True)
+        return snapshot.genre_choices()
+    now = time.monotonic()
+    if _local['choices'] is not None and _local['expires'] > now:
+        record_cache(True)
+        return _local['choices']
+    # Read from the primary, so that a lagging replica cannot pair the current
+    # version with the choices from before a change.
+    version, _ = get_catalogue_version(using=DEFAULT_DB_ALIAS)
+    key = f'{CACHE_KEY}:{version}'
+    choices = cache.get(key)
+    record_cache(choices is not None)
+    if choices is None:
+        choices = list(Genre.objects.using(DEFAULT_DB_ALIAS).order_by('pk').values_list('pk', 'name'))
+        cache.set(key, choices, CACHE_TIMEOUT)
+    _local['choices'] = choices
+    _local['expires'] = now + LOCAL_TTL
+    return choices
+
+
+def _drop_cached_choices():
+    _local['choices'] = None
+
+
+def invalidate_genre_choices():
+    """
+    Drops the process-local genre choices now and, inside a transaction, again once it commits.
+
+    The second drop discards a copy that another request of this process may have
+    read before the change was committed. Copies in the default cache need no
+    invalidation: they are keyed by the version the change bumps.
+    """
+    _drop_cached_choices()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_drop_cached_choices)
@@ -0,0 +1,72 @@
+"""
+Management command filling in the stored description excerpts of titles.
+
+Usage:
+    python manage.py backfill_excerpts
+    python manage.py backfill_excerpts --batch-size 5000
+    python manage.py backfill_excerpts --all
+
+Titles are processed in primary key order, one batch per transaction, so the
+command can run on a live catalogue and be interrupted and restarted at any time.
+Without options only titles with a description but no excerpt are filled in, which
+is what is needed once after adding the excerpt column. With `--all` every excerpt
+is recomputed and the wrong ones rewritten, for example after descriptions were
+changed with manual SQL.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...excerpts import backfill_excerpts
+from ...versions import bump_catalogue_version
+
+
+class Command(BaseCommand):
+    """
+    Computes and stores the missing, or all, description excerpts.
+    """
+    help = "Fills in the stored description excerpts of titles, in batches."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help="Titles processed per transaction (default: 2000).",
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Recompute every excerpt, not only the missing ones.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the backfill.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If the batch size is not positive.
+        """
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        started = time.monotonic()
+        after, written = 0, 0
+        while after is not None:
+            with transaction.atomic():
+                after, count = backfill_excerpts(after, options['batch_size'], options['all'])
+            written += count
+            if after is not None and options['verbosity'] > 1:
+                self.stdout.write(f"Up to title {after}: {written} excerpts written.")
+        if written:
+            bump_catalogue_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} excerpts in {elapsed:.1f}s."))
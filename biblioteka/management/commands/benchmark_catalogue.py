@@ -0,0 +1,253 @@
+"""
+Management command benchmarking every view of the library application at several catalogue sizes.
+
+Usage:
+    python manage.py benchmark_catalogue --noinput
+    python manage.py benchmark_catalogue --scales 1000,100000,1000000 --output before.json --noinput
+    python manage.py benchmark_catalogue --scales 1000,100000 --compare before.json --noinput
+
+The command empties the catalogue, then grows it to each requested size with the
+synthetic generator of `seed_catalogue` (the same seed always gives the same data)
+and requests every URL of `biblioteka/urls.py` through Django's test client,
+recording latency percentiles and the number of queries per request. Each URL needs
+an entry in `biblioteka.benchmarks.REQUESTS`; the command refuses to run if a view has none, so new views
+are benchmarked from the start.
+
+Results are written as JSON, together with the software versions and the settings
+that shape the responses. `--compare` prints how the median latencies of this run
+relate to an earlier results file.
+
+Run it against a dedicated database: the catalogue is deleted.
+"""
+
+import json
+import logging
+import platform
+import random
+import statistics
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ... import urls
+from ...benchmarks import REQUESTS, SINGLE_RUN, Sample
+from ...database import without_statement_timeout
+from ...models import Author, Genre, Title
+from ...similar import rebuild_similar_titles, similarity_available
+from ...synthetic import CatalogueGenerator, clear_catalogue
+
+
+class Command(BaseCommand):
+    """
+    Measures the latency and query count of every view at several catalogue sizes.
+    """
+    help = "Benchmarks every view at several synthetic catalogue sizes and stores the results as JSON."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument(
+            '--scales', default='1000,100000,1000000',
+            help="Comma-separated catalogue sizes (default: 1000,100000,1000000).",
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help="Requests per benchmarked URL and scale (default: 20).",
+        )
+        parser.add_argument('--authors', type=int, default=10000, help="Distinct authors (default: 10000).")
+        parser.add_argument('--genres', type=int, default=30, help="Distinct genres (default: 30).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument(
+            '--skip', action='append', default=[],
+            help="URL name not to benchmark, such as title_export. May be repeated.",
+        )
+        parser.add_argument(
+            '--output',
+            help="Results file. Defaults to benchmarks/results-<timestamp>.json in the project.",
+        )
+        parser.add_argument('--compare', help="Earlier results file to compare this run with.")
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help="Do not ask for confirmation before deleting the catalogue.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmark.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If a view has no benchmark request, an option is invalid,
+                the run is not confirmed or a request fails.
+        """
+        names = [pattern.name for pattern in urls.urlpatterns if pattern.name not in options['skip']]
+        missing = [name for name in names if name not in REQUESTS]
+        if missing:
+            raise CommandError(f"No benchmark request defined for: {', '.join(missing)}.")
+        try:
+            scales = sorted(int(scale) for scale in options['scales'].split(','))
+        except ValueError:
+            raise CommandError("--scales must be comma-separated integers.")
+        if not scales or scales[0] < 1 or options['iterations'] < 1:
+            raise CommandError("--scales and --iterations must be positive.")
+        if options['interactive'] and input(
+            f"This deletes the catalogue in database {connection.settings_dict['NAME']!r}. "
+            f"Type 'yes' to continue: "
+        ) != 'yes':
+            raise CommandError("Benchmark cancelled.")
+
+        results = {
+            'created': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'postgresql': connection.pg_version if connection.vendor == 'postgresql' else None,
+                'async_views': settings.ASYNC_VIEWS,
+                'title_list_page_size': settings.TITLE_LIST_PAGE_SIZE,
+                'search_results_limit': settings.SEARCH_RESULTS_LIMIT,
+            },
+            'options': {key: options[key] for key in ('iterations', 'authors', 'genres', 'seed')},
+            'scales': {},
+        }
+        generator = CatalogueGenerator(options['authors'], options['genres'], seed=options['seed'])
+        metrics_logger = logging.getLogger('biblioteka.metrics')
+        level = metrics_logger.level
+        metrics_logger.setLevel(logging.WARNING)
+        try:
+            with without_statement_timeout(), override_settings(
+                ALLOWED_HOSTS=['*'], METRICS_ALLOWED_IPS=['127.0.0.1'],
+            ):
+                clear_catalogue()
+                for scale in scales:
+                    results['scales'][str(scale)] = self.run_scale(generator, scale, names, options)
+        finally:
+            metrics_logger.setLevel(level)
+
+        output = Path(options['output'] or settings.BASE_DIR / 'benchmarks' /
+                      f"results-{timezone.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}."))
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), results)
+
+    def run_scale(self, generator, scale, names, options):
+        """
+        Grows the catalogue to `scale` titles and benchmarks every URL.
+
+        Args:
+            generator (CatalogueGenerator): The synthetic catalogue generator.
+            scale (int): The number of titles to benchmark at.
+            names (list): The URL names to benchmark.
+            options (dict): The parsed command line options.
+
+        Returns:
+            dict: The catalogue size and the figures of every benchmarked request.
+        """
+        current = Title.objects.count()
+        if current < scale:
+            self.stdout.write(f"Seeding {scale - current} titles...")
+            generator.load(current, scale - current)
+            if similarity_available():
+                self.stdout.write("Rebuilding the similar titles index...")
+                rebuild_similar_titles()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        sample = Sample(random.Random(options['seed']), max(options['iterations'] * 500, 1000))
+        client = Client()
+        requests = {}
+        self.stdout.write(f"{scale} titles:")
+        for name in names:
+            iterations = 1 if name in SINGLE_RUN else options['iterations']
+            for label, build in REQUESTS[name]:
+                requests[label] = self.measure(client, label, build, sample, iterations)
+                self.stdout.write(
+                    f"  {label:<24}{requests[label]['p50_ms']:>10.2f} ms p50"
+                    f"{requests[label]['p95_ms']:>10.2f} ms p95{requests[label]['queries']:>5} queries"
+                )
+        return {
+            'catalogue': {
+                'titles': scale,
+                'authors': Author.objects.count(),
+                'genres': Genre.objects.count(),
+            },
+            'requests': requests,
+        }
+
+    def measure(self, client, label, build, sample, iterations):
+        """
+        Requests one URL repeatedly and summarizes the latencies and query counts.
+
+        Args:
+            client (Client): The test client.
+            label (str): The name of the benchmarked request.
+            build (callable): Returns the path to request for a sample and iteration.
+            sample (Sample): The request parameters.
+            iterations (int): The number of requests.
+
+        Returns:
+            dict: The `path` of the first request and the mean, median, 95th
+                percentile and maximum latencies in milliseconds, with the largest
+                number of queries issued by one request.
+
+        Raises:
+            CommandError: If a request fails.
+        """
+        latencies = []
+        queries = 0
+        for iteration in range(iterations):
+            path = build(sample, iteration)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(path)
+                if response.streaming:
+                    for chunk in response.streaming_content:
+                        pass
+                latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f"{label}: {path} answered {response.status_code}.")
+            queries = max(queries, len(captured))
+        ordered = sorted(latencies)
+        return {
+            'path': build(sample, 0),
+            'iterations': iterations,
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+            'max_ms': round(ordered[-1], 2),
+            'queries': queries,
+        }
+
+    def compare(self, baseline, results):
+        """
+        Prints how the median latencies of this run relate to an earlier run.
+
+        Args:
+            baseline (dict): The results of the earlier run.
+            results (dict): The results of this run.
+        """
+        self.stdout.write(f"{'scale':>9}  {'request':<24}{'before':>10}{'after':>10}{'change':>9}")
+        for scale, current in results['scales'].items():
+            previous = baseline.get('scales', {}).get(scale, {}).get('requests', {})
+            for label, figures in current['requests'].items():
+                if label not in previous:
+                    continue
+                before, after = previous[label]['p50_ms'], figures['p50_ms']
+                change = (after - before) / before * 100 if before else 0.0
+                line = f"{scale:>9}  {label:<24}{before:>10.2f}{after:>10.2f}{change:>+8.0f}%"
+                self.stdout.write(self.style.WARNING(line) if change > 20 else line)
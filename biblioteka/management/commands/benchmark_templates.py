@@ -0,0 +1,138 @@
+"""
+Management command measuring how long the title list takes to render its rows.
+
+Usage:
+    python manage.py benchmark_templates
+    python manage.py benchmark_templates --rows 10000 --iterations 10 --json
+
+The rows are rendered from titles built in memory, and the fragment cache is a
+private in-process cache large enough for every row, so no database or cache
+server is needed and the numbers are the cost of the templates and of the cache
+lookups alone. Five variants are compared:
+
+    - `loader:uncached`: loading and parsing `title_list.html` with the plain
+      filesystem and app directories loaders, as on every render without the
+      cached loader;
+    - `loader:cached`: loading it through the cached loader, after the first time;
+    - `rows:per-row-url`: the previous row markup, reversing the detail URL with
+      `{% url %}` and truncating the whole description for every row;
+    - `rows:cold`: `render_title_rows` with an empty fragment cache, rendering the
+      precompiled row template with the URL prefix built once;
+    - `rows:warm`: `render_title_rows` with every row in the fragment cache.
+"""
+
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Engine
+from django.utils import timezone
+
+from ...excerpts import make_excerpt
+from ...fragments import ROW_TEMPLATE, render_title_rows
+from ...models import Author, Title
+from ...synthetic import WORDS
+
+LEGACY_ROWS = """{% load biblioteka_extras %}{% for title in titles %}
+        <li>
+            <a href="{% url 'title_detail' title.id %}"><strong>{{ title.name }}</strong></a> - {{ title.author }}
+            <br>
+            {% if query %}{{ title.snippet|highlight }}{% else %}{{ title.description|truncatewords:20 }}{% endif %}
+        </li>
+    {% endfor %}"""
+
+
+def build_titles(count):
+    """
+    Builds unsaved titles with authors, descriptions and excerpts.
+
+    Args:
+        count (int): The number of titles.
+
+    Returns:
+        list: The titles, with ids starting at 1.
+    """
+    now = timezone.now()
+    titles = []
+    for pk in range(1, count + 1):
+        description = ' '.join(WORDS[(pk * 7 + i) % len(WORDS)] for i in range(60 + pk % 60)) + '.'
+        title = Title(
+            pk=pk, name=f'{WORDS[pk % len(WORDS)].capitalize()} {pk}', description=description,
+            excerpt=make_excerpt(description), updated_at=now,
+        )
+        title.author = Author(pk=pk % 500 + 1, name=f'Author {pk % 500}')
+        titles.append(title)
+    return titles
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks template loading and title list row rendering.
+    """
+    help = "Measures the render time of the title list rows, before and after the fragment cache."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument('--rows', type=int, default=10000, help="Rows rendered per iteration (default: 10000).")
+        parser.add_argument('--iterations', type=int, default=10, help="Iterations per variant (default: 10).")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        """
+        Runs every variant and prints the median and best times.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If the row or iteration count is not positive.
+        """
+        if options['rows'] < 1 or options['iterations'] < 1:
+            raise CommandError("--rows and --iterations must be positive.")
+        titles = build_titles(options['rows'])
+        dirs = settings.TEMPLATES[0]['DIRS']
+        builtins = {'libraries': {'biblioteka_extras': 'biblioteka.templatetags.biblioteka_extras'}}
+        uncached = Engine(dirs=dirs, loaders=settings.TEMPLATE_LOADERS, **builtins)
+        cached = Engine(dirs=dirs, loaders=[('django.template.loaders.cached.Loader', settings.TEMPLATE_LOADERS)],
+                        **builtins)
+        legacy = cached.from_string(LEGACY_ROWS)
+        row_template = cached.get_template(ROW_TEMPLATE)
+        cache = LocMemCache('biblioteka-benchmark-rows', {'OPTIONS': {'MAX_ENTRIES': options['rows'] * 2}})
+
+        def cold():
+            cache.clear()
+            render_title_rows(row_template, titles, cache=cache)
+
+        variants = {
+            'loader:uncached': lambda: uncached.get_template('biblioteka/title_list.html'),
+            'loader:cached': lambda: cached.get_template('biblioteka/title_list.html'),
+            'rows:per-row-url': lambda: legacy.render(Context({'titles': titles})),
+            'rows:cold': cold,
+            'rows:warm': lambda: render_title_rows(row_template, titles, cache=cache),
+        }
+        results = {}
+        for name, run in variants.items():
+            run()
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {'median_ms': round(statistics.median(timings), 3), 'best_ms': round(min(timings), 3)}
+        cache.clear()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'rows': options['rows'], 'results': results}, indent=2))
+            return
+        self.stdout.write(f"{'variant':<20} {'median ms':>12} {'best ms':>12}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<20} {result['median_ms']:>12.3f} {result['best_ms']:>12.3f}")
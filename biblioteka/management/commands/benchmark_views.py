@@ -0,0 +1,311 @@
+"""
+Management command comparing view throughput under WSGI and ASGI.
+
+Usage:
+    python manage.py benchmark_views
+    python manage.py benchmark_views --requests 5000 --concurrency 256
+    python manage.py benchmark_views --path /api/titles/?limit=500 --path /search/?q=harry
+    ASYNC_VIEWS=1 python manage.py benchmark_views --mode asgi-async --json
+
+Requests are sent straight to Django's WSGI and ASGI handlers, without a server or
+sockets in between, so the numbers reflect the cost of the handlers, the views and
+the database round trips. Three configurations are compared:
+
+    - `wsgi-sync`: the synchronous views behind `WSGIHandler`, one thread per
+      concurrent request, as under a threaded WSGI server.
+    - `asgi-sync`: the synchronous views behind `ASGIHandler`, each request hopping
+      to a worker thread.
+    - `asgi-async`: the async views from `biblioteka.async_views` behind `ASGIHandler`,
+      with concurrent requests sharing one event loop.
+
+Without `--mode`, each configuration runs in its own process (the `ASYNC_VIEWS`
+setting is read when the URLconf is loaded) and a comparison table is printed.
+The catalogue must contain at least one title; `import_titles` can load one.
+"""
+
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Title
+
+MODES = {
+    'wsgi-sync': ('wsgi', False),
+    'asgi-sync': ('asgi', False),
+    'asgi-async': ('asgi', True),
+}
+
+HOST = 'localhost'
+
+
+def summarize(mode, latencies, failures, elapsed):
+    """
+    Summarizes the latencies of a benchmark run.
+
+    Args:
+        mode (str): The benchmarked configuration.
+        latencies (list): The duration of every request, in seconds.
+        failures (int): The number of responses with a 4xx or 5xx status.
+        elapsed (float): The wall-clock duration of the run, in seconds.
+
+    Returns:
+        dict: Throughput in requests per second, and mean and percentile latencies in ms.
+    """
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'failures': failures,
+        'rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'p50_ms': round(quantiles[49] * 1000, 2),
+        'p95_ms': round(quantiles[94] * 1000, 2),
+        'p99_ms': round(quantiles[98] * 1000, 2),
+    }
+
+
+def run_wsgi(urls, total, concurrency):
+    """
+    Sends requests to the WSGI handler from a pool of threads.
+
+    Args:
+        urls (list): `(path, query_string)` pairs, requested in turn.
+        total (int): The number of requests to send.
+        concurrency (int): The number of threads sending requests.
+
+    Returns:
+        tuple: The request latencies and the number of failed requests.
+    """
+    handler = WSGIHandler()
+
+    def send(number):
+        path, query = urls[number % len(urls)]
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+            'SCRIPT_NAME': '', 'SERVER_NAME': HOST, 'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+            'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+        }
+        statuses = []
+        started = time.perf_counter()
+        body = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            b''.join(body)
+        finally:
+            body.close()
+        return time.perf_counter() - started, int(statuses[0].split()[0]) >= 400
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(send, range(total)))
+    return [latency for latency, failed in results], sum(failed for latency, failed in results)
+
+
+async def run_asgi(urls, total, concurrency):
+    """
+    Sends requests to the ASGI handler from concurrent tasks on one event loop.
+
+    Args:
+        urls (list): `(path, query_string)` pairs, requested in turn.
+        total (int): The number of requests to send.
+        concurrency (int): The number of requests in flight at a time.
+
+    Returns:
+        tuple: The request latencies and the number of failed requests.
+    """
+    handler = ASGIHandler()
+    numbers = iter(range(total))
+    latencies = []
+    failures = 0
+
+    async def send(number):
+        path, query = urls[number % len(urls)]
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', HOST.encode())],
+            'server': (HOST, 80), 'client': ('127.0.0.1', 0),
+        }
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        disconnected = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send_message(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        started = time.perf_counter()
+        await handler(scope, receive, send_message)
+        disconnected.set()
+        return time.perf_counter() - started, statuses[0] >= 400
+
+    async def worker():
+        nonlocal failures
+        for number in numbers:
+            latency, failed = await send(number)
+            latencies.append(latency)
+            failures += failed
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures
+
+
+class Command(BaseCommand):
+    """
+    Measures view throughput and latency under WSGI and ASGI at a given concurrency.
+    """
+    help = "Compares sync WSGI, sync ASGI and async ASGI view throughput at high concurrency."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument(
+            '--mode', choices=sorted(MODES),
+            help="Benchmark a single configuration in this process. By default all "
+                 "configurations are run, each in a separate process.",
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help="Number of requests sent per configuration (default: 2000).",
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=64,
+            help="Number of requests in flight at a time (default: 64).",
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help="URL to request, with an optional query string. May be repeated. "
+                 "Defaults to the title list, a title detail page and a JSON API page.",
+        )
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmark.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If the catalogue is empty, the options are invalid, or a
+                configuration fails.
+        """
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+        if options['mode']:
+            results = [self.run_mode(options['mode'], options)]
+        else:
+            results = [self.run_subprocess(mode, options) for mode in MODES]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.stdout.write(
+            f"{'mode':<12}{'req/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>8}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:<12}{result['rps']:>10}{result['mean_ms']:>10}{result['p50_ms']:>10}"
+                f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['failures']:>8}"
+            )
+
+    def get_urls(self, paths):
+        """
+        Returns the URLs to request as `(path, query_string)` pairs.
+
+        Args:
+            paths (list or None): The URLs given on the command line.
+
+        Returns:
+            list: The split URLs.
+
+        Raises:
+            CommandError: If no URLs were given and the catalogue is empty.
+        """
+        if not paths:
+            pk = Title.objects.order_by('pk').values_list('pk', flat=True).first()
+            if pk is None:
+                raise CommandError("The catalogue is empty, import some titles first.")
+            paths = ['/', f'/{pk}/', '/api/titles/?limit=100']
+        return [(urlsplit(path).path, urlsplit(path).query) for path in paths]
+
+    def run_mode(self, mode, options):
+        """
+        Benchmarks one configuration in this process.
+
+        Args:
+            mode (str): One of the keys of `MODES`.
+            options (dict): The parsed command line options.
+
+        Returns:
+            dict: The summary produced by `summarize`.
+
+        Raises:
+            CommandError: If the `ASYNC_VIEWS` setting does not match the configuration.
+        """
+        interface, async_views = MODES[mode]
+        if settings.ASYNC_VIEWS != async_views:
+            raise CommandError(
+                f"{mode} needs ASYNC_VIEWS={'1' if async_views else '0'} in the environment."
+            )
+        urls = self.get_urls(options['paths'])
+        started = time.perf_counter()
+        if interface == 'wsgi':
+            latencies, failures = run_wsgi(urls, options['requests'], options['concurrency'])
+        else:
+            latencies, failures = asyncio.run(
+                run_asgi(urls, options['requests'], options['concurrency'])
+            )
+        return summarize(mode, latencies, failures, time.perf_counter() - started)
+
+    def run_subprocess(self, mode, options):
+        """
+        Benchmarks one configuration in a separate process.
+
+        Args:
+            mode (str): One of the keys of `MODES`.
+            options (dict): The parsed command line options.
+
+        Returns:
+            dict: The summary reported by the child process.
+
+        Raises:
+            CommandError: If the child process fails.
+        """
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_views', '--mode', mode, '--json',
+            '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+        ]
+        for path in options['paths'] or []:
+            command += ['--path', path]
+        env = dict(os.environ, ASYNC_VIEWS='1' if MODES[mode][1] else '0')
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'Library.settings')
+        process = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if process.returncode:
+            raise CommandError(f"{mode} benchmark failed:\n{process.stderr}")
+        return json.loads(process.stdout.strip().splitlines()[-1])[0]
@@ -0,0 +1,103 @@
+"""
+Management command writing the memory-mapped catalogue snapshot.
+
+Usage:
+    python manage.py build_catalogue_snapshot
+    python manage.py build_catalogue_snapshot --path /run/library/catalogue.snapshot --if-stale
+    python manage.py build_catalogue_snapshot --watch 2
+
+The snapshot (see `biblioteka.snapshot`) is written next to its target and moved
+into place atomically, so it can be rebuilt while the workers are reading it. The
+workers use it only while it matches the title collection version, and every
+change to the catalogue bumps that version; with `--watch`, the command keeps
+running and rebuilds the snapshot whenever the version has moved since the last
+build, checking every given number of seconds. Run it that way next to the
+application server, with the same `CATALOGUE_SNAPSHOT_PATH`.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from ...snapshot import SnapshotError, build_snapshot, is_current, open_snapshot
+
+
+class Command(BaseCommand):
+    """
+    Builds the catalogue snapshot once, when stale, or whenever it becomes stale.
+    """
+    help = "Writes the memory-mapped catalogue snapshot shared by the worker processes."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument('--path', help="Where to write the snapshot. Defaults to CATALOGUE_SNAPSHOT_PATH.")
+        parser.add_argument('--if-stale', action='store_true', help="Only build if the snapshot is missing or stale.")
+        parser.add_argument(
+            '--watch', type=float, metavar='SECONDS',
+            help="Keep running and rebuild the snapshot whenever it is stale, checking every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Builds the snapshot, or keeps it current with `--watch`.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If no path is configured or `--watch` is not positive.
+        """
+        path = options['path'] or settings.CATALOGUE_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("Set CATALOGUE_SNAPSHOT_PATH or pass --path.")
+        if options['watch'] is not None and options['watch'] <= 0:
+            raise CommandError("--watch must be positive.")
+        if options['watch'] is None:
+            self.build(path, options['if_stale'], options['verbosity'])
+            return
+        try:
+            while True:
+                close_old_connections()
+                self.build(path, True, options['verbosity'])
+                time.sleep(options['watch'])
+        except KeyboardInterrupt:
+            pass
+
+    def build(self, path, if_stale, verbosity):
+        """
+        Builds the snapshot and reports its size.
+
+        Args:
+            path (str): Where to write the snapshot.
+            if_stale (bool): Keep a snapshot that is still current.
+            verbosity (int): The command's verbosity.
+        """
+        if if_stale:
+            try:
+                snapshot = open_snapshot(path)
+            except (OSError, SnapshotError):
+                snapshot = None
+            if snapshot is not None:
+                current = is_current(snapshot)
+                snapshot.close()
+                if current:
+                    if verbosity > 1:
+                        self.stdout.write(f"The snapshot at {path} is current.")
+                    return
+        started = time.monotonic()
+        snapshot = build_snapshot(path)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote the snapshot of version {snapshot.version} to {path}: {len(snapshot.author_ids)} authors, "
+            f"{len(snapshot.genre_ids)} genres, {len(snapshot.title_ids)} titles, "
+            f"{snapshot.size / 1024 / 1024:.1f} MiB in {elapsed:.1f}s."
+        ))
+        snapshot.close()
@@ -0,0 +1,98 @@
+"""
+Management command deleting or editing many titles at once.
+
+Usage:
+    python manage.py bulk_edit_titles delete --ids-file imported.txt --dry-run
+    python manage.py bulk_edit_titles delete --ids-file imported.txt
+    python manage.py bulk_edit_titles reassign_author --author 12 --target 34
+    python manage.py bulk_edit_titles add_genre --search "smok" --genre 3 --target 7
+    python manage.py bulk_edit_titles remove_genre --genre 7 --target 7 --limit 50000
+
+Titles are selected with `--ids` or `--ids-file` (one id per line) and the filters
+`--genre`/`--match`, `--search` and `--author`; every given criterion must match.
+`--target` is the author or genre id the operation applies. The operation runs in
+one transaction with a handful of set-based statements (see `biblioteka.bulk_edit`)
+and refuses to touch more than `--limit` titles, `BULK_EDIT_LIMIT` by default.
+"""
+
+from django.core.exceptions import BadRequest
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from ...bulk_edit import OPERATIONS, BulkLimitExceeded, run_bulk_operation, select_titles_from_params
+from ...facets import MATCH_ALL, MATCH_ANY
+
+
+class Command(BaseCommand):
+    """
+    Runs one bulk operation on the selected titles.
+    """
+    help = "Deletes selected titles, moves them to another author, or adds or removes a genre."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument('operation', choices=sorted(OPERATIONS), help="The operation to run.")
+        parser.add_argument('--target', type=int, help="The author or genre id the operation applies.")
+        parser.add_argument('--ids', help="Comma-separated ids of the titles to select.")
+        parser.add_argument('--ids-file', help="File with the ids of the titles to select, one per line.")
+        parser.add_argument(
+            '--genre', type=int, action='append', default=[],
+            help="Select titles with this genre id; may be repeated.",
+        )
+        parser.add_argument(
+            '--match', choices=[MATCH_ALL, MATCH_ANY], default=MATCH_ALL,
+            help="Whether titles need all the --genre ids or any of them (default: all).",
+        )
+        parser.add_argument('--search', default='', help="Select titles matching this search text.")
+        parser.add_argument('--author', type=int, help="Select titles of this author id.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the titles that would change.")
+        parser.add_argument(
+            '--limit', type=int,
+            help="Largest number of titles that may be selected. Defaults to BULK_EDIT_LIMIT.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the operation and reports how many titles it changed.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If the selection or the target is invalid, or more than
+                `--limit` titles are selected.
+        """
+        params = QueryDict(mutable=True)
+        ids = options['ids'].split(',') if options['ids'] else []
+        if options['ids_file']:
+            try:
+                with open(options['ids_file']) as f:
+                    ids += [line.strip() for line in f if line.strip()]
+            except OSError as exc:
+                raise CommandError(f"Cannot read {options['ids_file']}: {exc}")
+        if options['ids'] or options['ids_file']:
+            params['ids'] = ','.join(ids)
+        params.setlist('genre', [str(genre_id) for genre_id in options['genre']])
+        params['match'] = options['match']
+        params['q'] = options['search']
+        if options['author'] is not None:
+            params['author'] = str(options['author'])
+
+        try:
+            titles = select_titles_from_params(params)
+            result = run_bulk_operation(
+                options['operation'], titles, options['target'], options['dry_run'], options['limit'],
+            )
+        except (BadRequest, BulkLimitExceeded) as exc:
+            raise CommandError(str(exc))
+
+        verb = "would change" if result['dry_run'] else "changed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['operation']}: {result['matched']} titles selected, {result['changed']} {verb}."
+        ))
@@ -0,0 +1,113 @@
+"""
+Management command checking the query plans of every view.
+
+Usage:
+    python manage.py check_query_plans
+    python manage.py check_query_plans --update
+    python manage.py check_query_plans --threshold 500 -v 2
+
+Inside one transaction, the command replaces the catalogue with the seeded plan
+catalogue, requests every URL of `biblioteka/urls.py` and explains the queries of
+each view (see `biblioteka.queryplans`), then rolls the transaction back, leaving
+the database as it was. It fails if a plan scans a large title, author or
+title-genre table sequentially without being listed in `ALLOWED_SEQ_SCANS`, or if
+a plan differs from the recorded one.
+
+After a change that alters plans on purpose (a new index, a rewritten query), run it
+with `--update` and commit the rewritten `biblioteka/query_plans.json` with the
+change, so that reviewers see the new plans. The tables are locked while the
+command runs: use a development database.
+"""
+
+import logging
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+
+from ...database import without_statement_timeout
+from ...queryplans import (
+    FINGERPRINTS_PATH, PLAN_CATALOGUE, SEQ_SCAN_THRESHOLD, PlanSample, changed_fingerprints, explain_views,
+    load_fingerprints, seed_plan_catalogue, write_fingerprints,
+)
+
+
+class Command(BaseCommand):
+    """
+    Explains the queries of every view on the seeded plan catalogue.
+    """
+    help = "Checks the query plans of every view for sequential scans and unrecorded changes."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument('--update', action='store_true', help="Record the current plans as the expected ones.")
+        parser.add_argument(
+            '--threshold', type=int, default=SEQ_SCAN_THRESHOLD,
+            help=f"Row count above which a sequential scan fails the check (default: {SEQ_SCAN_THRESHOLD}).",
+        )
+        parser.add_argument('--path', default=str(FINGERPRINTS_PATH), help="The recorded plans file.")
+
+    def handle(self, *args, **options):
+        """
+        Runs the checks and reports every request.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If a plan scans a large table sequentially, a request fails,
+                or a plan differs from the recorded one without `--update`.
+        """
+        metrics_logger = logging.getLogger('biblioteka.metrics')
+        level = metrics_logger.level
+        metrics_logger.setLevel(logging.WARNING)
+        try:
+            with without_statement_timeout(), override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+                seed_plan_catalogue()
+                sample = PlanSample(random.Random(PLAN_CATALOGUE['seed']), 1000)
+                report = explain_views(sample, options['threshold'])
+                transaction.set_rollback(True)
+        finally:
+            metrics_logger.setLevel(level)
+
+        recorded = load_fingerprints(options['path'])
+        changed = set(changed_fingerprints(recorded, report)) if recorded else set(report)
+        problems = []
+        for label, result in report.items():
+            scans = sorted({table for query in result['queries'] for table in query['seq_scans']})
+            status = 'changed' if label in changed else 'same'
+            self.stdout.write(f"{label:<28}{len(result['queries']):>3} queries  {status}"
+                              + (f"  seq scan: {', '.join(scans)}" if scans else ""))
+            if options['verbosity'] > 1 and label in changed:
+                for query in result['queries']:
+                    self.stdout.write('\n'.join(f"    {line}" for line in query['plan']))
+            if result['status'] >= 400:
+                problems.append(f"{label}: {result['path']} answered {result['status']}.")
+            if scans:
+                problems.append(f"{label}: sequential scan of {', '.join(scans)}.")
+        if problems:
+            raise CommandError('\n'.join(problems))
+
+        if options['update']:
+            write_fingerprints(report, options['path'])
+            self.stdout.write(self.style.SUCCESS(f"Recorded the plans of {len(report)} requests in {options['path']}."))
+        elif recorded is None:
+            raise CommandError(f"No plans are recorded in {options['path']}; record them with --update.")
+        elif recorded['postgresql'] != connection.pg_version // 10000:
+            self.stdout.write(self.style.WARNING(
+                f"The plans were recorded on PostgreSQL {recorded['postgresql']}; not comparing them."
+            ))
+        elif changed:
+            raise CommandError(
+                f"The plans of {', '.join(sorted(changed))} differ from {options['path']}. Check them with -v 2, "
+                f"and record them with --update if they are expected."
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f"The plans of all {len(report)} requests are as recorded."))
@@ -0,0 +1,259 @@
+"""
+Management command bulk-importing titles from CSV or JSON Lines files.
+
+Usage:
+    python manage.py import_titles catalogue.csv
+    python manage.py import_titles catalogue.jsonl --batch-size 20000 --drop-indexes
+    zcat dump.jsonl.gz | python manage.py import_titles - --format jsonl --job dump-2024
+
+Input records have a `name`, an optional `description`, an `author` name and a list
+of `genres`. In CSV files, `genres` is a single column with names separated by `|`
+(see `--genre-separator`); in JSON Lines files it is a list of strings.
+
+The input is streamed and processed in batches. Each batch is loaded by
+`biblioteka.bulk.load_titles`, which resolves its authors and genres with set-based
+upserts and loads titles and title-genre rows with `COPY`, and the command records
+its progress in an `ImportJob` row in the same transaction. Running the
+command again with the same job name resumes after the last committed batch.
+
+The `DB_STATEMENT_TIMEOUT` meant for web requests is lifted for the duration of the
+import, as large batches and index rebuilds can take longer.
+"""
+
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ...authors import normalize_author_name
+from ...database import without_statement_timeout
+from ...bulk import drop_secondary_indexes, load_titles, restore_indexes
+from ...models import Author, ImportJob, Title
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+NAME_MAX_LENGTH = Title._meta.get_field('name').max_length
+AUTHOR_MAX_LENGTH = Author._meta.get_field('name').max_length
+
+
+def read_records(stream, fmt, genre_separator):
+    """
+    Yields the records of a CSV or JSON Lines stream as dictionaries.
+
+    Args:
+        stream (file): The open input stream.
+        fmt (str): Either `csv` or `jsonl`.
+        genre_separator (str): The separator of genre names in CSV input.
+
+    Yields:
+        dict: A record with `name`, `description`, `author` and `genres` keys.
+    """
+    if fmt == 'csv':
+        rows = csv.DictReader(stream)
+    else:
+        rows = (json.loads(line) for line in stream if line.strip())
+    for row in rows:
+        genres = row.get('genres') or []
+        if isinstance(genres, str):
+            genres = genres.split(genre_separator)
+        yield {
+            'name': (row.get('name') or '').strip(),
+            'description': row.get('description') or None,
+            'author': normalize_author_name(row.get('author') or ''),
+            'genres': {genre.strip() for genre in genres if genre.strip()},
+        }
+
+
+def validate_record(record):
+    """
+    Checks that a record can be stored.
+
+    Args:
+        record (dict): A record produced by `read_records`.
+
+    Returns:
+        str or None: The reason the record is rejected, or None if it is valid.
+    """
+    if not record['name']:
+        return "missing name"
+    if not record['author']:
+        return "missing author"
+    if len(record['name']) > NAME_MAX_LENGTH:
+        return f"name longer than {NAME_MAX_LENGTH} characters"
+    if len(record['author']) > AUTHOR_MAX_LENGTH:
+        return f"author longer than {AUTHOR_MAX_LENGTH} characters"
+    return None
+
+
+class Command(BaseCommand):
+    """
+    Imports titles in bulk from a CSV or JSON Lines file.
+    """
+    help = "Bulk-imports titles from a CSV or JSON Lines file using COPY, resumably."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument('path', help="Input file, or '-' for standard input.")
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help="Input format. Guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help="Number of records imported per transaction (default: 5000).",
+        )
+        parser.add_argument(
+            '--job',
+            help="Name under which progress is recorded. Defaults to the input file name.",
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignore recorded progress and import the whole input again.",
+        )
+        parser.add_argument(
+            '--drop-indexes', action='store_true',
+            help="Drop secondary indexes of the title tables during the load and rebuild "
+                 "them at the end. Faster for large loads, but blocks writes while rebuilding.",
+        )
+        parser.add_argument(
+            '--genre-separator', default='|',
+            help="Separator of genre names in the CSV genres column (default: '|').",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the import.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If the input cannot be read or the job has already finished.
+        """
+        path = options['path']
+        fmt = options['format'] or FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise CommandError("Cannot guess the input format, pass --format.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        job = self.get_job(options['job'] or ('stdin' if path == '-' else os.path.basename(path)),
+                           options['restart'])
+        with without_statement_timeout():
+            if options['drop_indexes'] and not job.dropped_indexes:
+                with transaction.atomic():
+                    job.dropped_indexes = drop_secondary_indexes(
+                        [Title._meta.db_table, Title.genre.through._meta.db_table]
+                    )
+                    job.save(update_fields=['dropped_indexes', 'updated_at'])
+                self.stdout.write(f"Dropped {len(job.dropped_indexes)} indexes.")
+
+            try:
+                stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(f"Cannot open {path}: {exc}")
+            with stream:
+                self.import_records(job, read_records(stream, fmt, options['genre_separator']),
+                                    options['batch_size'])
+
+            if job.dropped_indexes:
+                self.stdout.write(f"Rebuilding {len(job.dropped_indexes)} indexes...")
+                restore_indexes(job.dropped_indexes)
+                job.dropped_indexes = []
+            job.finished_at = timezone.now()
+            job.save(update_fields=['dropped_indexes', 'finished_at', 'updated_at'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Import {job.name} finished: {job.records_done} records, "
+                f"{job.titles_created} titles created."
+            ))
+
+    def get_job(self, name, restart):
+        """
+        Returns the import job with the given name, resetting it when restarting.
+
+        Args:
+            name (str): The job name.
+            restart (bool): Whether recorded progress should be discarded.
+
+        Returns:
+            ImportJob: The job to continue.
+
+        Raises:
+            CommandError: If the job has already finished and is not restarted.
+        """
+        job, created = ImportJob.objects.get_or_create(name=name)
+        if restart:
+            job.records_done = 0
+            job.titles_created = 0
+            job.finished_at = None
+            job.save()
+        elif job.finished_at is not None:
+            raise CommandError(f"Import {name} has already finished, pass --restart to run it again.")
+        elif job.records_done:
+            self.stdout.write(f"Resuming import {name} after {job.records_done} records.")
+        return job
+
+    def import_records(self, job, records, batch_size):
+        """
+        Imports records in batches, skipping those processed by earlier runs.
+
+        Args:
+            job (ImportJob): The job recording the progress.
+            records (iterator): The input records.
+            batch_size (int): The number of records per batch.
+        """
+        records = itertools.islice(records, job.records_done, None)
+        genre_ids = {}
+        started = time.monotonic()
+        processed = 0
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                created = self.import_batch(job.records_done, batch, genre_ids)
+                job.records_done += len(batch)
+                job.titles_created += created
+                job.save(update_fields=['records_done', 'titles_created', 'updated_at'])
+            processed += len(batch)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{job.records_done} records processed, {job.titles_created} titles created "
+                f"({processed / elapsed if elapsed else 0:.0f} records/s)"
+            )
+
+    def import_batch(self, offset, batch, genre_ids):
+        """
+        Imports one batch of records inside the caller's transaction.
+
+        Args:
+            offset (int): The number of input records before this batch.
+            batch (list): The records to import.
+            genre_ids (dict): Genre ids by name resolved by earlier batches. Updated in place.
+
+        Returns:
+            int: The number of titles created.
+        """
+        valid = []
+        for number, record in enumerate(batch, offset + 1):
+            error = validate_record(record)
+            if error:
+                self.stderr.write(f"Record {number} skipped: {error}.")
+            else:
+                valid.append(record)
+        if not valid:
+            return 0
+
+        return len(load_titles(valid, genre_ids))
@@ -0,0 +1,65 @@
+"""
+Management command compacting and trimming the catalogue change log.
+
+Usage:
+    python manage.py prune_title_changes
+    python manage.py prune_title_changes --compact-after-days 0 --retention-days 7
+
+Meant to run daily. Entries older than `--compact-after-days` that are superseded by
+a later entry for the same title are deleted; entries older than `--retention-days`
+are deleted altogether, which expires the cursors of clients that have not synced
+since (see `biblioteka.changes`).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...changes import compact_changes, purge_changes
+from ...database import without_statement_timeout
+
+
+class Command(BaseCommand):
+    """
+    Compacts the change log and deletes entries past the retention period.
+    """
+    help = "Compacts the catalogue change log and deletes entries past the retention period."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument(
+            '--compact-after-days', type=float, default=settings.CHANGE_LOG_COMPACT_AFTER_DAYS,
+            help="Age after which superseded entries are deleted. Defaults to CHANGE_LOG_COMPACT_AFTER_DAYS.",
+        )
+        parser.add_argument(
+            '--retention-days', type=float, default=settings.CHANGE_LOG_RETENTION_DAYS,
+            help="Age after which every entry is deleted. Defaults to CHANGE_LOG_RETENTION_DAYS.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the compaction and the purge.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If a period is negative.
+        """
+        if options['compact_after_days'] < 0 or options['retention_days'] < 0:
+            raise CommandError("Periods must not be negative.")
+        now = timezone.now()
+        with without_statement_timeout():
+            compacted = compact_changes(now - timedelta(days=options['compact_after_days']))
+            purged = purge_changes(now - timedelta(days=options['retention_days']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {compacted} superseded changes and purged {purged} expired changes."
+        ))
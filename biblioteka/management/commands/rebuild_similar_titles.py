@@ -0,0 +1,71 @@
+"""
+Management command rebuilding the similar titles index.
+
+Usage:
+    python manage.py rebuild_similar_titles
+    python manage.py rebuild_similar_titles --limit 20 --batch-size 512
+
+The catalogue is read once, and the neighbours of every title are recomputed with
+sparse matrix products between its distinct genre sets (see `biblioteka.similar`).
+The lists of each batch are replaced in their own transaction, so detail pages keep
+showing the previous lists until then and the command can run on a live catalogue.
+Run it after bulk loads and bulk edits, and periodically to fold in the drift of
+genre weights; edits made through the application keep the index current between
+runs. Requires NumPy and SciPy.
+"""
+
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from ...similar import rebuild_similar_titles
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the similar titles of every title.
+    """
+    help = "Rebuilds the similar titles index from the current catalogue."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument(
+            '--limit', type=int,
+            help="Similar titles stored per title. Defaults to SIMILAR_TITLES_COUNT.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=256,
+            help="Genre sets compared per matrix product and written per transaction (default: 256).",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the rebuild.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If an option is not positive, or NumPy or SciPy is missing.
+        """
+        if options['batch_size'] < 1 or (options['limit'] is not None and options['limit'] < 1):
+            raise CommandError("--limit and --batch-size must be positive.")
+
+        def progress(done, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{done} of {total} titles indexed.")
+
+        started = time.monotonic()
+        try:
+            indexed = rebuild_similar_titles(options['limit'], options['batch_size'], progress)
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Indexed the similar titles of {indexed} titles in {elapsed:.1f}s."))
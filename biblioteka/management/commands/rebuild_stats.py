@@ -0,0 +1,70 @@
+"""
+Management command recomputing or checking the catalogue statistics.
+
+Usage:
+    python manage.py rebuild_stats
+    python manage.py rebuild_stats --check
+    python manage.py rebuild_stats --check --limit 50
+
+The `title_count` counters of authors and genres are maintained incrementally (see
+`biblioteka.stats`). Without options the command recomputes every counter from the
+title tables, writing only the wrong ones, which repairs counters after changes made
+behind the application's back, such as manual SQL. With `--check` it changes
+nothing, lists the counters that disagree with the data and fails if there are any,
+so it can run as a scheduled consistency check.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...database import without_statement_timeout
+from ...stats import check_stats, rebuild_stats
+
+
+class Command(BaseCommand):
+    """
+    Recomputes, or checks, the title counters of authors and genres.
+    """
+    help = "Recomputes the title counters of authors and genres, or checks them with --check."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report the counters that disagree with the data; fail if there are any.",
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help="Largest number of wrong counters listed per model with --check (default: 20).",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the rebuild or the check.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If `--check` finds wrong counters.
+        """
+        with without_statement_timeout():
+            if options['check']:
+                mismatches = check_stats(options['limit'])
+                for model, pk, stored, actual in mismatches:
+                    self.stdout.write(f"{model} {pk}: title_count is {stored}, should be {actual}")
+                if mismatches:
+                    raise CommandError("The catalogue statistics are inconsistent; run rebuild_stats.")
+                self.stdout.write(self.style.SUCCESS("The catalogue statistics are consistent."))
+                return
+            with transaction.atomic():
+                corrected = rebuild_stats()
+        for model, count in corrected.items():
+            self.stdout.write(f"{model}: {count} counters corrected.")
+        self.stdout.write(self.style.SUCCESS("The catalogue statistics were rebuilt."))
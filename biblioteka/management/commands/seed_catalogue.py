@@ -0,0 +1,101 @@
+"""
+Management command filling the catalogue with synthetic titles.
+
+Usage:
+    python manage.py seed_catalogue --titles 100000 --authors 5000 --genres 20
+    python manage.py seed_catalogue --titles 1000000 --authors 50000 --genres 40 --clear --noinput
+
+Authors are drawn from a Zipf distribution, so a few authors write most titles, and
+each title has one to `--max-genres` genres, popular genres being far more common.
+The same `--seed` always produces the same catalogue. Without `--clear`, the new
+titles are added after the existing ones and continue the same synthetic sequence,
+so seeding 1k titles and then 99k more gives the same catalogue as seeding 100k.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...database import without_statement_timeout
+from ...models import Title
+from ...synthetic import CatalogueGenerator, clear_catalogue
+
+
+class Command(BaseCommand):
+    """
+    Generates a synthetic catalogue with a realistic skew.
+    """
+    help = "Fills the catalogue with reproducible synthetic titles, authors and genres."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument('--titles', type=int, required=True, help="Number of titles to add.")
+        parser.add_argument('--authors', type=int, default=1000, help="Number of distinct authors (default: 1000).")
+        parser.add_argument('--genres', type=int, default=20, help="Number of distinct genres (default: 20).")
+        parser.add_argument(
+            '--max-genres', type=int, default=3,
+            help="Largest number of genres of one title (default: 3).",
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help="Zipf exponent of the author and genre distributions (default: 1.1).",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help="Number of titles inserted per transaction (default: 10000).",
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help="Delete every title, author and genre before seeding.",
+        )
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help="Do not ask for confirmation before clearing the catalogue.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the generator.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If a count is not positive or clearing is not confirmed.
+        """
+        for option in ('titles', 'authors', 'genres', 'max_genres', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be positive.")
+
+        if options['clear']:
+            if options['interactive'] and input(
+                "This deletes every title, author and genre. Type 'yes' to continue: "
+            ) != 'yes':
+                raise CommandError("Seeding cancelled.")
+            clear_catalogue()
+
+        generator = CatalogueGenerator(
+            options['authors'], options['genres'], options['max_genres'],
+            options['zipf'], options['seed'],
+        )
+        start = Title.objects.count()
+        started = time.monotonic()
+
+        def progress(loaded):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{loaded} titles added ({loaded / elapsed if elapsed else 0:.0f} titles/s)"
+            )
+
+        with without_statement_timeout():
+            generator.load(start, options['titles'], options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalogue now has {start + options['titles']} titles."
+        ))
@@ -0,0 +1,105 @@
+"""
+Management command streaming the catalogue change log as JSON Lines.
+
+Usage:
+    python manage.py title_changes --head
+    python manage.py title_changes --after <cursor> --output changes.jsonl
+    python manage.py title_changes --cursor-file sync.cursor --output changes.jsonl
+
+Each line is one change log entry, as returned by the `api/changes/` feed. With
+`--cursor-file`, reading starts after the cursor stored in the file and the cursor of
+the last entry written is stored back once the output is complete, so a scheduled
+job transfers each change once. `--head` prints the cursor of the newest entry, to
+be stored before a full export with `export_titles`.
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...api import dumps
+from ...changes import ChangeCursorExpired, head_cursor, read_changes
+
+
+class Command(BaseCommand):
+    """
+    Writes the change log entries after a cursor.
+    """
+    help = "Streams the catalogue change log after a cursor as JSON Lines."
+
+    def add_arguments(self, parser):
+        """
+        Defines the command line arguments.
+
+        Args:
+            parser (CommandParser): The argument parser.
+        """
+        parser.add_argument('--after', help="Cursor to start after. Defaults to the oldest retained entry.")
+        parser.add_argument(
+            '--cursor-file',
+            help="File holding the cursor to start after; updated with the new cursor on success.",
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help="Output file, or '-' for standard output (default).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Entries read from the database at a time (default: 1000).",
+        )
+        parser.add_argument('--head', action='store_true', help="Only print the cursor of the newest entry.")
+
+    def handle(self, *args, **options):
+        """
+        Runs the export of the change log.
+
+        Args:
+            *args: Positional arguments (unused).
+            **options: The parsed command line options.
+
+        Raises:
+            CommandError: If the cursor has expired or a file cannot be read or written.
+        """
+        if options['head']:
+            self.stdout.write(head_cursor() or '')
+            return
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        cursor = options['after']
+        cursor_file = options['cursor_file']
+        if cursor is None and cursor_file:
+            try:
+                with open(cursor_file) as f:
+                    cursor = f.read().strip() or None
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                raise CommandError(f"Cannot read {cursor_file}: {exc}")
+
+        to_stdout = options['output'] == '-'
+        try:
+            output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        except OSError as exc:
+            raise CommandError(f"Cannot open {options['output']}: {exc}")
+        entries = 0
+        try:
+            has_more = True
+            while has_more:
+                results, cursor, has_more = read_changes(cursor, options['batch_size'])
+                for entry in results:
+                    output.write(dumps(entry) + b'\n')
+                entries += len(results)
+        except ChangeCursorExpired:
+            raise CommandError("The cursor has expired; resynchronize the catalogue.")
+        finally:
+            if not to_stdout:
+                output.close()
+
+        if cursor_file and cursor:
+            try:
+                with open(cursor_file, 'w') as f:
+                    f.write(cursor)
+            except OSError as exc:
+                raise CommandError(f"Cannot write {cursor_file}: {exc}")
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {entries} changes to {options['output']}."))
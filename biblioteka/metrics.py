@@ -0,0 +1,443 @@
+"""
+Request-level performance instrumentation for the library application.
+
+`PerformanceMiddleware` measures every request and reports, per request:
+
+    - the number of database queries and the time spent in them, on every alias;
+    - the time spent rendering templates;
+    - the hits and misses of the application caches (detail pages, genre choices,
+      author ids);
+    - the total time spent in Django.
+
+The figures are sent back in a `Server-Timing` header, which browsers show in their
+developer tools, written as one JSON log line per request to the `biblioteka.metrics`
+logger, and aggregated into in-process histograms per URL name. The histograms can
+be read from the `/metrics/` endpoint, which is closed unless it is configured
+(see `metrics_allowed`).
+
+The instrumentation is cheap enough to leave on: queries are timed by an execute
+wrapper installed once per connection, template rendering by the `TimedDjangoTemplates`
+backend, and cache lookups by the caches themselves calling `record_cache`. Each only
+reads a context variable when no request is being measured. Histograms use fixed
+logarithmic buckets, so recording is a binary search and percentiles are accurate to
+within one bucket (25%).
+
+Classes:
+    - `RequestMetrics`: The figures collected for one request.
+    - `Histogram`: A fixed-bucket latency histogram.
+    - `MetricsRegistry`: Per URL name histograms and totals of this process.
+    - `PerformanceMiddleware`: Measures requests and reports the figures.
+    - `TimedDjangoTemplates`: Django template backend timing every render.
+
+Functions:
+    - `record_query`: Database execute wrapper timing the queries of the current request.
+    - `instrument_connection`: Installs `record_query` on a new database connection.
+    - `record_cache`: Counts a cache hit or miss for the current request.
+    - `metrics_allowed`: Tells whether a client may read the metrics endpoints.
+
+Attributes:
+    - `registry`: The `MetricsRegistry` of this process.
+"""
+
+import hmac
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_MS = tuple(0.25 * 1.25 ** exponent for exponent in range(60))
+
+PERCENTILES = (50, 95, 99)
+
+_current = ContextVar('biblioteka_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    The figures collected while handling one request.
+
+    Attributes:
+        started (float): `time.perf_counter()` when the request arrived.
+        queries (int): The number of database queries.
+        db_time (float): The time spent in database queries, in seconds.
+        template_time (float): The time spent rendering templates, in seconds.
+        cache_hits (int): The number of application cache hits.
+        cache_misses (int): The number of application cache misses.
+    """
+    __slots__ = ('started', 'queries', 'db_time', 'template_time', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class Histogram:
+    """
+    A histogram of durations over fixed logarithmic buckets.
+
+    Attributes:
+        counts (list): The number of values in each bucket; the last one is unbounded.
+        count (int): The number of recorded values.
+        total (float): The sum of the recorded values, in milliseconds.
+        maximum (float): The largest recorded value, in milliseconds.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value_ms):
+        """
+        Records a duration.
+
+        Args:
+            value_ms (float): The duration in milliseconds.
+        """
+        self.counts[bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.maximum = max(self.maximum, value_ms)
+
+    def percentile(self, percent):
+        """
+        Returns an upper estimate of a percentile of the recorded durations.
+
+        Args:
+            percent (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The upper bound of the bucket holding the percentile, in milliseconds,
+                capped at the largest recorded value. 0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                bound = BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.maximum
+                return min(bound, self.maximum)
+        return self.maximum
+
+
+class MetricsRegistry:
+    """
+    Aggregates request metrics per URL name in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, url_name, metrics, total, status):
+        """
+        Adds the figures of a finished request.
+
+        Args:
+            url_name (str): The URL name the request resolved to.
+            metrics (RequestMetrics): The figures collected for the request.
+            total (float): The total duration of the request, in seconds.
+            status (int): The response status code.
+        """
+        with self._lock:
+            view = self._views.get(url_name)
+            if view is None:
+                view = self._views[url_name] = {
+                    'latency': Histogram(), 'db': Histogram(), 'queries': 0,
+                    'template_ms': 0.0, 'cache_hits': 0, 'cache_misses': 0, 'errors': 0,
+                }
+            view['latency'].add(total * 1000)
+            view['db'].add(metrics.db_time * 1000)
+            view['queries'] += metrics.queries
+            view['template_ms'] += metrics.template_time * 1000
+            view['cache_hits'] += metrics.cache_hits
+            view['cache_misses'] += metrics.cache_misses
+            view['errors'] += status >= 500
+
+    def snapshot(self):
+        """
+        Returns the aggregated figures of every URL name.
+
+        Returns:
+            dict: For each URL name, the request `count`, `errors`, latency mean,
+                maximum and percentiles, database time percentiles, mean query count,
+                mean template time and the cache hit and miss totals.
+        """
+        with self._lock:
+            snapshot = {}
+            for url_name, view in sorted(self._views.items()):
+                latency, db, count = view['latency'], view['db'], view['latency'].count
+                snapshot[url_name] = {
+                    'count': count,
+                    'errors': view['errors'],
+                    'latency_ms': {
+                        'mean': round(latency.total / count, 2),
+                        'max': round(latency.maximum, 2),
+                        **{f'p{p}': round(latency.percentile(p), 2) for p in PERCENTILES},
+                    },
+                    'db_ms': {f'p{p}': round(db.percentile(p), 2) for p in PERCENTILES},
+                    'queries_mean': round(view['queries'] / count, 2),
+                    'template_ms_mean': round(view['template_ms'] / count, 2),
+                    'cache_hits': view['cache_hits'],
+                    'cache_misses': view['cache_misses'],
+                }
+            return snapshot
+
+    def clear(self):
+        """
+        Drops all recorded figures.
+        """
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Times a database query and adds it to the figures of the current request, if any.
+
+    Args:
+        execute (callable): The next execute function in the chain.
+        sql (str): The SQL statement.
+        params: The statement parameters.
+        many (bool): Whether this is an `executemany` call.
+        context (dict): The execution context.
+
+    Returns:
+        The result of `execute`.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def instrument_connection(connection):
+    """
+    Installs `record_query` on a database connection, once.
+
+    Args:
+        connection (BaseDatabaseWrapper): The connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache(hit):
+    """
+    Counts an application cache lookup for the current request, if any.
+
+    Args:
+        hit (bool): Whether the lookup found the value.
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def metrics_allowed(request):
+    """
+    Tells whether a client may read the metrics endpoints.
+
+    A client is allowed if it sends `Authorization: Bearer <METRICS_TOKEN>`, or if
+    its address is listed in `METRICS_ALLOWED_IPS`. Both are empty by default, which
+    closes the endpoints. The address is `REMOTE_ADDR`, which is the proxy's behind a
+    reverse proxy: list addresses only when clients connect directly, and use the
+    token otherwise.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        bool: Whether the client sent the metrics token or has an allowed address.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+            return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+class PerformanceMiddleware:
+    """
+    Measures each request and reports its figures.
+
+    Should be the first middleware, so that the time spent in the others is included.
+    For streaming responses, only the time until the response starts is measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """
+        Handles the request while collecting its figures.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            HttpResponse: The response, with a `Server-Timing` header.
+        """
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        """
+        Handles the request in async mode while collecting its figures.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            HttpResponse: The response, with a `Server-Timing` header.
+        """
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        """
+        Adds the `Server-Timing` header, logs the figures and records them in `registry`.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            response (HttpResponse): The response to the request.
+            metrics (RequestMetrics): The figures collected for the request.
+
+        Returns:
+            HttpResponse: The same response.
+        """
+        total = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name or match.view_name) if match else 'unmatched'
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries", '
+            f'tpl;dur={metrics.template_time * 1000:.2f}, '
+            f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses", '
+            f'total;dur={total * 1000:.2f}'
+        )
+        registry.record(url_name, metrics, total, response.status_code)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': url_name,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'db_ms': round(metrics.db_time * 1000, 2),
+                'queries': metrics.queries,
+                'template_ms': round(metrics.template_time * 1000, 2),
+                'cache_hits': metrics.cache_hits,
+                'cache_misses': metrics.cache_misses,
+            }))
+        return response
+
+
+class TimedTemplate(Template):
+    """
+    A Django template whose renders are added to the figures of the current request.
+    """
+
+    def render(self, context=None, request=None):
+        """
+        Renders the template and records the time it took.
+
+        Args:
+            context (dict, optional): The template context.
+            request (HttpRequest, optional): The HTTP request object.
+
+        Returns:
+            SafeString: The rendered template.
+        """
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, returning templates that time their renders.
+
+    Templates included from other templates are rendered within the outer render
+    and are not counted twice.
+    """
+
+    def from_string(self, template_code):
+        """
+        Compiles a template from a string.
+
+        Args:
+            template_code (str): The template source.
+
+        Returns:
+            TimedTemplate: The compiled template.
+        """
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        """
+        Loads a template by name.
+
+        Args:
+            template_name (str): The template name.
+
+        Returns:
+            TimedTemplate: The loaded template.
+
+        Raises:
+            TemplateDoesNotExist: If no loader finds the template.
+        """
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
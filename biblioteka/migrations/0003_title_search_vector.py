@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-16 22:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+BACKFILL_SEARCH_VECTOR = """
+UPDATE biblioteka_title AS t
+SET search_vector =
+    setweight(to_tsvector('simple', coalesce(t.name, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(t.description, '')), 'B')
+    || setweight(to_tsvector('simple', coalesce(a.name, '')), 'C')
+FROM biblioteka_author AS a
+WHERE a.id = t.author_id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteka', '0002_title_name_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='title_search_vector_idx'),
+        ),
+    ]
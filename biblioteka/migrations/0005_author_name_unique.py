@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-16 23:01
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+NORMALIZE_AUTHOR_NAMES = r"""
+UPDATE biblioteka_author
+SET name = regexp_replace(btrim(name), '\s+', ' ', 'g')
+WHERE name <> regexp_replace(btrim(name), '\s+', ' ', 'g')
+"""
+
+MERGE_DUPLICATE_AUTHORS = """
+CREATE TEMPORARY TABLE author_merge ON COMMIT DROP AS
+SELECT id, MIN(id) OVER (PARTITION BY LOWER(name)) AS keep_id FROM biblioteka_author;
+
+DELETE FROM author_merge WHERE id = keep_id;
+
+UPDATE biblioteka_title AS t
+SET author_id = m.keep_id
+FROM author_merge AS m
+WHERE t.author_id = m.id;
+
+DELETE FROM biblioteka_author AS a
+USING author_merge AS m
+WHERE a.id = m.id;
+
+SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteka', '0004_author_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(NORMALIZE_AUTHOR_NAMES, migrations.RunSQL.noop),
+        migrations.RunSQL(MERGE_DUPLICATE_AUTHORS, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='author',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='author_name_lower_uniq'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-16 23:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_titles_version(apps, schema_editor):
+    CatalogueVersion = apps.get_model('biblioteka', 'CatalogueVersion')
+    CatalogueVersion.objects.get_or_create(name='titles')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteka', '0005_author_name_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(create_titles_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteka', '0008_title_genre_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='title_count',
+            field=models.PositiveIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='title_count',
+            field=models.PositiveIntegerField(db_default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE biblioteka_author AS a SET title_count = d.n
+            FROM (SELECT author_id, count(*) AS n FROM biblioteka_title GROUP BY author_id) AS d
+            WHERE a.id = d.author_id;
+            UPDATE biblioteka_genre AS g SET title_count = d.n
+            FROM (SELECT genre_id, count(*) AS n FROM biblioteka_title_genre GROUP BY genre_id) AS d
+            WHERE g.id = d.genre_id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
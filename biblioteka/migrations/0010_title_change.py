@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 11:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteka', '0009_title_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField(db_default=django.db.models.functions.comparison.Cast(django.db.models.functions.comparison.Cast(models.Func(function='pg_current_xact_id', output_field=models.TextField()), models.TextField()), models.BigIntegerField()))),
+                ('title_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=7)),
+                ('changed_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+            options={
+                'indexes': [models.Index(fields=['txid', 'id'], name='title_change_position_idx'), models.Index(fields=['title_id', 'txid', 'id'], name='title_change_title_idx'), django.contrib.postgres.indexes.BrinIndex(fields=['changed_at'], name='title_change_changed_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Adds the stored description excerpt of titles.
+
+    The column is added with a constant default, which does not rewrite the table;
+    the excerpts of existing titles are filled in by the `backfill_excerpts` command.
+    """
+
+    dependencies = [
+        ('biblioteka', '0010_title_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='excerpt',
+            field=models.TextField(blank=True, db_default='', default='', editable=False),
+        ),
+    ]
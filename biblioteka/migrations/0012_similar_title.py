@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Creates the similar titles index.
+
+    The table starts empty; it is filled by the `rebuild_similar_titles` command.
+    """
+
+    dependencies = [
+        ('biblioteka', '0011_title_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarTitle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='biblioteka.title')),
+                ('title', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='biblioteka.title')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['title', '-score', 'similar'], name='similar_title_rank_idx')],
+            },
+        ),
+    ]
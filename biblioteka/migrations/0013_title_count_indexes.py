@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Adds `(title_count DESC, name)` indexes to the author and genre tables.
+
+    The catalogue statistics list the authors and genres with the most titles; with
+    these indexes the first rows are read in order instead of sorting the whole table.
+    """
+
+    dependencies = [
+        ('biblioteka', '0012_similar_title'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(models.OrderBy(models.F('title_count'), descending=True), models.F('name'), name='author_title_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(models.OrderBy(models.F('title_count'), descending=True), models.F('name'), name='genre_title_count_idx'),
+        ),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, router, transaction
+from django.db.models import F, Func
+from django.db.models.functions import Cast, Lower, Now, Upper
+from django.utils import timezone
 
 class Author(models.Model):
     """
@@ -8,12 +13,39 @@ class Author(models.Model):
     various titles in the library.
 
     Attributes:
-        name (str): The name of the author. Limited to 100 characters.
+        name (str): The name of the author. Limited to 100 characters. Unique regardless
+            of letter case; use `biblioteka.authors.resolve_author` to look authors up by name.
+        title_count (int): The number of titles of the author. Maintained by `biblioteka.stats`.
 
     Methods:
         __str__(): Returns the name of the author as its string representation.
     """
     name = models.CharField(max_length=100)
+    title_count = models.PositiveIntegerField(db_default=0, editable=False)
+
+    class Meta:
+        """
+        Meta options for the Author model.
+
+        Attributes:
+            indexes (list): Indexes backing the author autocomplete: a `pg_trgm` GIN
+                index for fuzzy matching and a pattern index on the upper-cased name
+                for case-insensitive "starts with" lookups.
+                A `(title_count DESC, name)` index lets the catalogue statistics read
+                the most prolific authors in order without sorting the table.
+            constraints (list): A unique index on the lower-cased name, which is also
+                the conflict target of the author upsert.
+        """
+        indexes = [
+            GinIndex(OpClass('name', name='gin_trgm_ops'), name='author_name_trgm_idx'),
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'), name='author_name_prefix_idx'
+            ),
+            models.Index(F('title_count').desc(), 'name', name='author_title_count_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='author_name_lower_uniq'),
+        ]
 
     def __str__(self):
         """
@@ -36,8 +68,22 @@ class Genre(models.Model):
 
     Attributes:
         name (str): The name of the genre. Limited to 50 characters.
+        title_count (int): The number of titles of the genre. Maintained by `biblioteka.stats`.
     """
     name = models.CharField(max_length=50)
+    title_count = models.PositiveIntegerField(db_default=0, editable=False)
+
+    class Meta:
+        """
+        Meta options for the Genre model.
+
+        Attributes:
+            indexes (list): A `(title_count DESC, name)` index letting the catalogue
+                statistics read the largest genres in order without sorting the table.
+        """
+        indexes = [
+            models.Index(F('title_count').desc(), 'name', name='genre_title_count_idx'),
+        ]
 
     def __str__(self):
         """
@@ -65,14 +111,38 @@ class Title(models.Model):
         author (Author): A foreign key linking the title to a single author. Deleting an author
             will cascade and delete all associated titles.
         genre (Genre): A many-to-many relationship linking the title to multiple genres.
+        excerpt (str): The first words of the description, shown by the title list so that
+            it does not load whole descriptions. Maintained by `biblioteka.signals` and
+            backfilled by the `backfill_excerpts` command (see `biblioteka.excerpts`).
+        search_vector (SearchVector): The precomputed full-text search document built from
+            the name, description and author name. Maintained by `biblioteka.signals`.
+        updated_at (datetime): When the title was last changed, including changes to its
+            genres and its author's name. Used for HTTP conditional requests.
 
     Methods:
         __str__(): Returns the name of the title as its string representation.
+        save(): Saves the title in a transaction with the work of its signal handlers.
     """
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
+    excerpt = models.TextField(blank=True, default='', db_default='', editable=False)
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name="titles")
     genre = models.ManyToManyField(Genre, related_name="titles")
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """
+        Meta options for the Title model.
+
+        Attributes:
+            indexes (list): A composite `(name, id)` index backing the keyset
+                pagination of the title list, and a GIN index over the search vector.
+        """
+        indexes = [
+            models.Index(fields=['name', 'id'], name='title_name_id_idx'),
+            GinIndex(fields=['search_vector'], name='title_search_vector_idx'),
+        ]
 
     def __str__(self):
         """
@@ -85,3 +155,187 @@ class Title(models.Model):
             str: The name of the title.
         """
         return self.name
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the title in a transaction together with the work of its signal handlers.
+
+        `biblioteka.signals` locks the title row before it is saved to read the
+        previous author, and updates counters and the change log after it is saved;
+        all of it has to run in one transaction, also when the caller has none.
+        """
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class CatalogueVersion(models.Model):
+    """
+    Tracks the version of a collection of rows in the library system.
+
+    A collection such as the list of titles has no single timestamp that changes on
+    every insert, update and delete. This model keeps one counter row per collection,
+    which is bumped on every change and can be read with a single primary key lookup.
+
+    Attributes:
+        name (str): The name of the collection, such as `titles`.
+        version (int): A counter incremented on every change to the collection.
+        updated_at (datetime): When the collection last changed.
+
+    Methods:
+        __str__(): Returns the collection name and version.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        """
+        Returns a string representation of the CatalogueVersion instance.
+
+        Returns:
+            str: The collection name followed by its version.
+        """
+        return f"{self.name} v{self.version}"
+
+
+class ImportJob(models.Model):
+    """
+    Records the progress of a bulk import run by the `import_titles` command.
+
+    Progress is saved in the same transaction as each imported batch, so an import
+    interrupted by a crash can be resumed from the first batch that was not committed.
+
+    Attributes:
+        name (str): The unique name of the import, by default the input file name.
+        records_done (int): The number of input records processed so far.
+        titles_created (int): The number of titles created so far.
+        dropped_indexes (list): The definitions of indexes dropped for the load that
+            still have to be recreated.
+        started_at (datetime): When the import was started.
+        updated_at (datetime): When the last batch was committed.
+        finished_at (datetime, optional): When the import completed.
+
+    Methods:
+        __str__(): Returns the import name and progress.
+    """
+    name = models.CharField(max_length=200, unique=True)
+    records_done = models.PositiveBigIntegerField(default=0)
+    titles_created = models.PositiveBigIntegerField(default=0)
+    dropped_indexes = models.JSONField(default=list, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the ImportJob instance.
+
+        Returns:
+            str: The import name followed by the number of processed records.
+        """
+        return f"{self.name} ({self.records_done} records)"
+
+
+class TitleChange(models.Model):
+    """
+    Records a change to a title in the change log read by sync clients.
+
+    An entry is written in the same transaction as every creation, change and
+    deletion of a title, including changes to its genres and author (see
+    `biblioteka.changes`). Entries of deleted titles remain as tombstones until they
+    expire.
+
+    Entries are ordered by `(txid, id)`. The id sequence alone is not safe for
+    incremental reads, since a transaction can commit an entry with a lower id after
+    a reader has moved past it; transaction ids let readers stop before the oldest
+    transaction still in progress.
+
+    Attributes:
+        txid (int): The id of the transaction that made the change, set by the database.
+        title_id (int): The id of the changed title. Not a foreign key, so that
+            tombstones outlive their titles.
+        action (str): `created`, `updated` or `deleted`.
+        changed_at (datetime): When the change was made, set by the database.
+
+    Methods:
+        __str__(): Returns the action and the title id.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted')]
+
+    txid = models.BigIntegerField(db_default=Cast(
+        Cast(Func(function='pg_current_xact_id', output_field=models.TextField()), models.TextField()),
+        models.BigIntegerField(),
+    ))
+    title_id = models.BigIntegerField()
+    action = models.CharField(max_length=7, choices=ACTIONS)
+    changed_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        """
+        Meta options for the TitleChange model.
+
+        Attributes:
+            indexes (list): A `(txid, id)` index backing the feed, a
+                `(title_id, txid, id)` index finding superseded entries during
+                compaction, and a BRIN index on the append-only `changed_at`.
+        """
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='title_change_position_idx'),
+            models.Index(fields=['title_id', 'txid', 'id'], name='title_change_title_idx'),
+            BrinIndex(fields=['changed_at'], name='title_change_changed_at_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the TitleChange instance.
+
+        Returns:
+            str: The action followed by the title id.
+        """
+        return f"{self.action} {self.title_id}"
+
+
+class SimilarTitle(models.Model):
+    """
+    Links a title to one of its most similar titles in the similar titles index.
+
+    Each title has up to `SIMILAR_TITLES_COUNT` rows, computed offline by the
+    `rebuild_similar_titles` command and kept current for edited titles (see
+    `biblioteka.similar`), so its detail page reads them with one index scan.
+
+    Attributes:
+        title (Title): The title the row belongs to.
+        similar (Title): One of the titles most similar to `title`.
+        score (float): The cosine similarity of the two titles, between 0 and 1.
+
+    Methods:
+        __str__(): Returns the two title ids and the score.
+    """
+    title = models.ForeignKey(Title, on_delete=models.CASCADE, related_name='+', db_index=False)
+    similar = models.ForeignKey(Title, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        """
+        Meta options for the SimilarTitle model.
+
+        Attributes:
+            indexes (list): A `(title_id, score DESC, similar_id)` index returning the
+                neighbours of a title in display order without a sort.
+        """
+        indexes = [
+            models.Index(fields=['title', '-score', 'similar'], name='similar_title_rank_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the SimilarTitle instance.
+
+        Returns:
+            str: The title id, the similar title id and the score.
+        """
+        return f"{self.title_id} ~ {self.similar_id} ({self.score:.3f})"
@@ -0,0 +1,213 @@
+"""
+Rendered page caching for the library application.
+
+Title detail pages are read far more often than titles are edited, so their
+rendered HTML is cached per title. Each title has a version token stored in the
+cache, and a page is stored under a key made of the title id and that token.
+Invalidating a title only replaces its token: pages rendered for the old token are
+never looked up again and simply expire.
+
+When a page is missing, only one request renders it (single-flight): the first
+request takes a short-lived lock in the cache, and concurrent requests for the same
+page wait for the result instead of all hitting the database at once.
+
+The cache backend is the `pages` alias of `CACHES`, selected in `Library/settings.py`
+with the `PAGE_CACHE_BACKEND` environment variable.
+
+Classes:
+    - `DetailPageCache`: Versioned, single-flight cache of rendered detail pages.
+
+Attributes:
+    - `detail_page_cache`: The cache used by `TitleDetailView`.
+"""
+
+import asyncio
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import record_cache
+
+
+class DetailPageCache:
+    """
+    Caches rendered pages per object, keyed by object id and a version token.
+
+    Attributes:
+        alias (str): The `CACHES` alias holding the pages.
+        prefix (str): The prefix of every key written by this cache.
+        lock_timeout (float): How long a render lock is held at most, in seconds.
+        wait_interval (float): How often a waiting request checks for the page, in seconds.
+    """
+
+    def __init__(self, alias, prefix, lock_timeout=10, wait_interval=0.05):
+        self.alias = alias
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.wait_interval = wait_interval
+
+    @property
+    def cache(self):
+        """
+        Returns the cache backend for the configured alias.
+        """
+        return caches[self.alias]
+
+    def version_key(self, pk):
+        """
+        Returns the key holding the version token of an object.
+        """
+        return f'{self.prefix}:version:{pk}'
+
+    def page_key(self, pk, version):
+        """
+        Returns the key holding the page of an object at a given version.
+        """
+        return f'{self.prefix}:page:{pk}:{version}'
+
+    def lock_key(self, pk, version):
+        """
+        Returns the key of the render lock of an object at a given version.
+        """
+        return f'{self.prefix}:lock:{pk}:{version}'
+
+    def get_version(self, pk):
+        """
+        Returns the current version token of an object, creating one if missing.
+
+        Args:
+            pk (int): The primary key of the object.
+
+        Returns:
+            str: The version token.
+        """
+        key = self.version_key(pk)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, uuid.uuid4().hex, None)
+            version = self.cache.get(key)
+        return version
+
+    def get_or_render(self, pk, render):
+        """
+        Returns the cached page of an object, rendering and storing it if missing.
+
+        If another request is already rendering the same page, waits up to
+        `lock_timeout` seconds for its result before rendering the page itself.
+
+        Args:
+            pk (int): The primary key of the object.
+            render (callable): Called without arguments to produce the page content.
+
+        Returns:
+            bytes: The page content.
+        """
+        version = self.get_version(pk)
+        page_key = self.page_key(pk, version)
+        content = self.cache.get(page_key)
+        record_cache(content is not None)
+        if content is not None:
+            return content
+
+        lock_key = self.lock_key(pk, version)
+        if not self.cache.add(lock_key, 1, self.lock_timeout):
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.wait_interval)
+                content = self.cache.get(page_key)
+                if content is not None:
+                    return content
+                if self.cache.get(lock_key) is None:
+                    break
+            return render()
+
+        try:
+            content = render()
+            self.cache.set(page_key, content, settings.DETAIL_PAGE_CACHE_TIMEOUT)
+        finally:
+            self.cache.delete(lock_key)
+        return content
+
+    async def aget_version(self, pk):
+        """
+        Async version of `get_version`.
+
+        Args:
+            pk (int): The primary key of the object.
+
+        Returns:
+            str: The version token.
+        """
+        key = self.version_key(pk)
+        version = await self.cache.aget(key)
+        if version is None:
+            await self.cache.aadd(key, uuid.uuid4().hex, None)
+            version = await self.cache.aget(key)
+        return version
+
+    async def aget_or_render(self, pk, render):
+        """
+        Async version of `get_or_render`, waiting for a concurrent render without blocking.
+
+        Args:
+            pk (int): The primary key of the object.
+            render (callable): Called without arguments, returns an awaitable producing
+                the page content.
+
+        Returns:
+            bytes: The page content.
+        """
+        version = await self.aget_version(pk)
+        page_key = self.page_key(pk, version)
+        content = await self.cache.aget(page_key)
+        record_cache(content is not None)
+        if content is not None:
+            return content
+
+        lock_key = self.lock_key(pk, version)
+        if not await self.cache.aadd(lock_key, 1, self.lock_timeout):
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.wait_interval)
+                content = await self.cache.aget(page_key)
+                if content is not None:
+                    return content
+                if await self.cache.aget(lock_key) is None:
+                    break
+            return await render()
+
+        try:
+            content = await render()
+            await self.cache.aset(page_key, content, settings.DETAIL_PAGE_CACHE_TIMEOUT)
+        finally:
+            await self.cache.adelete(lock_key)
+        return content
+
+    def _bump_versions(self, pks):
+        self.cache.set_many(
+            {self.version_key(pk): uuid.uuid4().hex for pk in pks}, None
+        )
+
+    def invalidate(self, pks):
+        """
+        Invalidates the cached pages of the given objects.
+
+        The versions are replaced immediately and, inside a transaction, again once it
+        commits, so that a page rendered from the database by a concurrent request
+        before the commit is discarded as well.
+
+        Args:
+            pks (iterable): The primary keys of the objects.
+        """
+        pks = list(pks)
+        if not pks:
+            return
+        self._bump_versions(pks)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._bump_versions(pks))
+
+
+detail_page_cache = DetailPageCache('pages', 'title-detail')
@@ -0,0 +1,194 @@
+"""
+Keyset (cursor) pagination for the library application.
+
+Offset pagination (`LIMIT n OFFSET m`) makes the database walk and discard `m` rows
+for every page, so deep pages get slower as the catalogue grows. Keyset pagination
+instead remembers the sort key of the last row shown and asks for the rows that
+come after it, which an index on the sort key answers in constant time.
+
+Cursors are opaque, URL-safe tokens wrapping the `(name, id)` pair of the boundary
+row. `id` is included as a tie-breaker so that titles sharing a name are never
+skipped or repeated.
+
+Classes:
+    - `KeysetPage`: A single page of results together with its navigation cursors.
+    - `KeysetPaginator`: Splits an ordered queryset into keyset pages.
+
+Functions:
+    - `encode_cursor`: Turns a `(name, id)` pair into an opaque token.
+    - `decode_cursor`: Turns an opaque token back into a `(name, id)` pair.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+
+def encode_cursor(name, pk):
+    """
+    Encodes a boundary row key as an opaque cursor token.
+
+    Args:
+        name (str): The `name` of the boundary title.
+        pk (int): The primary key of the boundary title.
+
+    Returns:
+        str: A URL-safe token without padding.
+    """
+    raw = json.dumps([name, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decodes an opaque cursor token back into a boundary row key.
+
+    Args:
+        token (str): A token previously produced by `encode_cursor`.
+
+    Returns:
+        tuple: The `(name, id)` pair stored in the token.
+
+    Raises:
+        BadRequest: If the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        name, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise BadRequest("Invalid pagination cursor")
+    if not isinstance(name, str) or not isinstance(pk, int):
+        raise BadRequest("Invalid pagination cursor")
+    return name, pk
+
+
+def _row_key(row):
+    if isinstance(row, dict):
+        return row['name'], row['id']
+    return row.name, row.pk
+
+
+class KeysetPage:
+    """
+    A single page produced by `KeysetPaginator`.
+
+    Attributes:
+        object_list (list): The rows on this page, in `(name, id)` order. Rows are
+            model instances, or dictionaries with `name` and `id` keys.
+        has_next (bool): Whether there are rows after this page.
+        has_previous (bool): Whether there are rows before this page.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        """
+        Returns the cursor for the following page, or None on the last page.
+        """
+        if not self.has_next or not self.object_list:
+            return None
+        return encode_cursor(*_row_key(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        """
+        Returns the cursor for the preceding page, or None on the first page.
+        """
+        if not self.has_previous or not self.object_list:
+            return None
+        return encode_cursor(*_row_key(self.object_list[0]))
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset on the `(name, id)` key.
+
+    Each page costs a single `LIMIT page_size + 1` query whose `WHERE` clause starts
+    at the cursor, so with an index on `(name, id)` the cost of a page does not depend
+    on how deep into the catalogue it is. The extra row is only used to find out
+    whether another page exists in the direction of travel.
+
+    Attributes:
+        queryset (QuerySet): The rows to paginate. Any existing ordering is replaced.
+        page_size (int): The maximum number of rows per page.
+    """
+
+    def __init__(self, queryset, page_size):
+        self.queryset = queryset
+        self.page_size = page_size
+
+    def page(self, after=None, before=None):
+        """
+        Returns the page that starts after, or ends before, the given cursor.
+
+        Args:
+            after (str, optional): Cursor of the row preceding the wanted page.
+            before (str, optional): Cursor of the row following the wanted page.
+                Ignored when `after` is given.
+
+        Returns:
+            KeysetPage: The requested page. Without a cursor, the first page.
+
+        Raises:
+            BadRequest: If the cursor is malformed.
+        """
+        rows, direction = self._query(after, before)
+        return self._build_page(list(rows), direction)
+
+    async def apage(self, after=None, before=None):
+        """
+        Async version of `page`, reading the rows with the async ORM.
+
+        Args:
+            after (str, optional): Cursor of the row preceding the wanted page.
+            before (str, optional): Cursor of the row following the wanted page.
+
+        Returns:
+            KeysetPage: The requested page.
+
+        Raises:
+            BadRequest: If the cursor is malformed.
+        """
+        rows, direction = self._query(after, before)
+        return self._build_page([row async for row in rows], direction)
+
+    def _query(self, after, before):
+        limit = self.page_size + 1
+        if after:
+            name, pk = decode_cursor(after)
+            rows = (
+                self.queryset
+                .filter(Q(name__gte=name) & (Q(name__gt=name) | Q(pk__gt=pk)))
+                .order_by('name', 'pk')[:limit]
+            )
+            return rows, 'after'
+        if before:
+            name, pk = decode_cursor(before)
+            rows = (
+                self.queryset
+                .filter(Q(name__lte=name) & (Q(name__lt=name) | Q(pk__lt=pk)))
+                .order_by('-name', '-pk')[:limit]
+            )
+            return rows, 'before'
+        return self.queryset.order_by('name', 'pk')[:limit], None
+
+    def _build_page(self, rows, direction):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == 'before':
+            rows.reverse()
+            return KeysetPage(rows, True, has_more)
+        return KeysetPage(rows, has_more, direction == 'after')
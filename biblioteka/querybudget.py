@@ -0,0 +1,182 @@
+"""
+Query budgets for the library application views.
+
+A view declares how many database queries a single request may issue by setting a
+`query_budget` class attribute. `QueryBudgetMiddleware` counts the queries run while
+the view handles the request and reacts when the budget is exceeded, so that an
+accidental N+1 pattern (for example a template touching an unloaded relation in a
+loop) is caught by the test suite instead of in production.
+
+Classes:
+    - `QueryBudgetExceeded`: Raised when a view issues more queries than it declared.
+    - `QueryBudgetMiddleware`: Enforces the declared budgets.
+
+Settings:
+    - `QUERY_BUDGET_STRICT`: When True, exceeding a budget raises `QueryBudgetExceeded`;
+      otherwise a warning is logged and the response is returned unchanged.
+"""
+
+import logging
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .replicas import read_alias
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a view issues more database queries than its declared budget.
+
+    Attributes:
+        view_name (str): The name of the offending view class.
+        budget (int): The number of queries the view declared.
+        queries (list): The SQL of every query issued by the view.
+    """
+
+    def __init__(self, view_name, budget, queries):
+        self.view_name = view_name
+        self.budget = budget
+        self.queries = queries
+        listing = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(queries, 1))
+        super().__init__(
+            f"{view_name} issued {len(queries)} queries, budget is {budget}:\n{listing}"
+        )
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the database queries issued by views that declare a `query_budget`.
+
+    Views without a `query_budget` attribute are not instrumented and pay no
+    overhead. Queries issued by middleware running before the view are not
+    counted against the view's budget. Queries are counted on every database
+    alias and summed, so that reads routed to a replica (see `biblioteka.replicas`)
+    count as well.
+
+    The middleware supports both sync and async request handling. Counting starts in
+    `process_view`, which Django runs on the thread that also executes the ORM calls
+    of an async view, so queries are counted the same way under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """
+        Handles the request and checks the budget of the view that served it.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            HttpResponse: The response produced by the view.
+
+        Raises:
+            QueryBudgetExceeded: If the budget was exceeded and `QUERY_BUDGET_STRICT` is on.
+        """
+        if self.async_mode:
+            return self.__acall__(request)
+        request._query_budget = None
+        try:
+            response = self.get_response(request)
+        finally:
+            self.stop_counting(request)
+        self.check_budget(request)
+        return response
+
+    async def __acall__(self, request):
+        """
+        Handles the request in async mode and checks the budget of the view that served it.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            HttpResponse: The response produced by the view.
+
+        Raises:
+            QueryBudgetExceeded: If the budget was exceeded and `QUERY_BUDGET_STRICT` is on.
+        """
+        request._query_budget = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            if request._query_budget is not None:
+                await sync_to_async(self.stop_counting)(request)
+        self.check_budget(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Starts counting queries if the view about to handle the request declares a budget.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            view_func (callable): The view function produced by `as_view()`.
+            view_args (tuple): Positional arguments for the view.
+            view_kwargs (dict): Keyword arguments for the view.
+
+        Returns:
+            None: Request processing always continues.
+        """
+        view_class = getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+        if budget is not None:
+            if budget:
+                # Connect before counting, so that the setup queries run on a new
+                # connection (type lookups and the like) are not charged to the view.
+                for alias in {DEFAULT_DB_ALIAS, read_alias()}:
+                    connections[alias].ensure_connection()
+            queries = []
+
+            def record(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            wrappers = ExitStack()
+            for connection in connections.all():
+                wrappers.enter_context(connection.execute_wrapper(record))
+            request._query_budget = (view_class.__name__, budget, queries, wrappers)
+        return None
+
+    def stop_counting(self, request):
+        """
+        Stops counting the queries of the current request, if they were counted.
+
+        Must run on the thread that ran `process_view`.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+        """
+        if request._query_budget is not None:
+            request._query_budget[3].close()
+
+    def check_budget(self, request):
+        """
+        Reports a view that issued more queries than its budget.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Raises:
+            QueryBudgetExceeded: If the budget was exceeded and `QUERY_BUDGET_STRICT` is on.
+        """
+        if request._query_budget is None:
+            return
+        view_name, budget, queries, wrappers = request._query_budget
+        if len(queries) > budget:
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(view_name, budget, queries)
+            logger.warning(
+                "%s issued %d queries, budget is %d", view_name, len(queries), budget
+            )
@@ -0,0 +1,365 @@
+"""
+Query plan regression checks for the library application views.
+
+A dropped or unusable index does not change what a view returns, and on a small
+development database it does not change how fast it answers either; it shows up in
+production latencies instead. This module catches it before that: it requests every
+URL of `biblioteka/urls.py` against a seeded catalogue, captures the SQL each view
+issues and asks PostgreSQL for its plan with `EXPLAIN (FORMAT JSON)`, without running it.
+
+Two properties of the plans are checked:
+
+    - no plan reads `CHECKED_TABLES` with a sequential scan when the table holds
+      more than `SEQ_SCAN_THRESHOLD` rows, unless `ALLOWED_SEQ_SCANS` lists the
+      scan with the reason it is the better plan;
+    - every plan has the shape recorded in `FINGERPRINTS_PATH`. A shape lists the
+      plan nodes with their join types, tables and indexes, leaving out the cost
+      and row estimates, and its fingerprint is a short hash of it. The file is
+      committed, so any change of plan, wanted or not, shows up in review as a
+      diff of readable plan shapes.
+
+The requests are those benchmarked by `benchmark_catalogue`
+(`biblioteka.benchmarks.REQUESTS`), which must cover every URL, with a `PlanSample`
+that searches for the name of a rarely seen author: every word of the synthetic descriptions occurs in most titles, and
+searching for one rightly reads the whole table. The catalogue is generated by
+`seed_plan_catalogue` with fixed sizes and seed, and analyzed with every row
+sampled, so that the same PostgreSQL major version always chooses the same plans.
+
+The `check_query_plans` command runs the checks and rewrites the fingerprints with
+`--update`; the test suite runs them too.
+
+Classes:
+    - `PlanSample`: The request parameters of the plan checks.
+
+Functions:
+    - `seed_plan_catalogue`: Loads and analyzes the catalogue the plans are checked on.
+    - `explainable_sql`: Returns the statement to explain for a captured query.
+    - `explain`: Returns the plan PostgreSQL chooses for a statement.
+    - `plan_shape`: Describes a plan without its estimates.
+    - `plan_fingerprint`: Returns a short hash of a plan shape.
+    - `sequential_scans`: Returns the large tables a plan scans sequentially.
+    - `explain_views`: Captures and explains the queries of every view.
+    - `load_fingerprints`: Reads the recorded plan shapes.
+    - `write_fingerprints`: Records the plan shapes of a report.
+    - `changed_fingerprints`: Compares a report with the recorded plan shapes.
+
+Constants:
+    - `CHECKED_TABLES`: The tables that must not be scanned sequentially.
+    - `SEQ_SCAN_THRESHOLD`: The row count above which a sequential scan is reported.
+    - `PLAN_CATALOGUE`: The size and seed of the seeded catalogue.
+    - `ALLOWED_SEQ_SCANS`: The sequential scans accepted for each request label, with their reasons.
+    - `FINGERPRINTS_PATH`: The file recording the plan shapes.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .authors import author_cache
+from .benchmarks import REQUESTS, Sample
+from .genres import invalidate_genre_choices
+from .models import Author, Title
+from .synthetic import CatalogueGenerator, clear_catalogue
+
+CHECKED_TABLES = (Title._meta.db_table, Author._meta.db_table, Title.genre.through._meta.db_table)
+
+SEQ_SCAN_THRESHOLD = 2000
+
+# Every checked table holds more than `SEQ_SCAN_THRESHOLD` rows, so that each check can fire.
+PLAN_CATALOGUE = {'titles': 20000, 'authors': 10000, 'genres': 30, 'seed': 0}
+
+ALLOWED_SEQ_SCANS = {
+    'api_title_batch:500': {
+        Author._meta.db_table: "A batch joins the authors of up to 500 titles; hashing the author "
+                               "table once is cheaper than an index lookup per title.",
+    },
+}
+
+FINGERPRINTS_PATH = Path(__file__).resolve().parent / 'query_plans.json'
+
+# Server-side cursors (`QuerySet.iterator()`) declare the cursor around the query.
+_DECLARE_CURSOR = re.compile(r'^\s*DECLARE\s+.*?\bCURSOR\s+(?:WITH(?:OUT)?\s+HOLD\s+)?FOR\s+', re.S | re.I)
+
+
+class PlanSample(Sample):
+    """
+    Request parameters for the plan checks, searching for a rare author's name.
+
+    Attributes:
+        search (str): The name of the author with the fewest titles.
+    """
+
+    def __init__(self, rng, size):
+        super().__init__(rng, size)
+        self.search = Author.objects.filter(title_count__gt=0).order_by('title_count', 'pk').values_list(
+            'name', flat=True,
+        ).first() or ''
+
+    def word(self, iteration):
+        """
+        Returns the search query, the same for every iteration.
+        """
+        return self.search.replace(' ', '+')
+
+
+def seed_plan_catalogue(using=DEFAULT_DB_ALIAS):
+    """
+    Replaces the catalogue with the `PLAN_CATALOGUE` and analyzes the database.
+
+    Meant to run inside a transaction that is rolled back afterwards, as the test
+    suite and `check_query_plans` do; the statistics target is raised for that
+    transaction only, so that `ANALYZE` reads every row and its statistics do not
+    depend on a random sample.
+
+    Args:
+        using (str, optional): The database alias.
+    """
+    clear_catalogue()
+    generator = CatalogueGenerator(PLAN_CATALOGUE['authors'], PLAN_CATALOGUE['genres'], seed=PLAN_CATALOGUE['seed'])
+    generator.load(0, PLAN_CATALOGUE['titles'])
+    with connections[using].cursor() as cursor:
+        cursor.execute("SET LOCAL default_statistics_target = 10000")
+        # Every table, so that no plan depends on statistics left by earlier data.
+        cursor.execute("ANALYZE")
+
+
+def explainable_sql(sql):
+    """
+    Returns the statement to explain for a captured query.
+
+    Args:
+        sql (str): The captured SQL, with its parameters interpolated.
+
+    Returns:
+        str or None: The `SELECT` statement, without the cursor declaration around
+            it, or None for statements that are not queries, such as `BEGIN`.
+    """
+    sql = _DECLARE_CURSOR.sub('', sql, count=1).lstrip()
+    return sql if sql[:6].upper() == 'SELECT' or sql[:4].upper() == 'WITH' else None
+
+
+def explain(sql, using=DEFAULT_DB_ALIAS):
+    """
+    Returns the plan PostgreSQL chooses for a statement, without running it.
+
+    Args:
+        sql (str): The statement, with its parameters interpolated.
+        using (str, optional): The database alias.
+
+    Returns:
+        dict: The root node of the plan.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+
+def _nodes(node, depth=0):
+    yield depth, node
+    for child in node.get('Plans', []):
+        yield from _nodes(child, depth + 1)
+
+
+def plan_shape(plan):
+    """
+    Describes a plan without its cost and row estimates.
+
+    Args:
+        plan (dict): The root node of a plan.
+
+    Returns:
+        list: One line per node, indented by depth, with the node type, the join
+            type or aggregate strategy, and the table and index it reads.
+    """
+    lines = []
+    for depth, node in _nodes(plan):
+        parts = [node['Node Type']]
+        for key in ('Join Type', 'Strategy', 'Scan Direction'):
+            if key in node and node[key] not in ('Inner', 'Plain', 'Forward'):
+                parts.append(node[key])
+        if 'Relation Name' in node:
+            parts.append(f"on {node['Relation Name']}")
+        if 'Index Name' in node:
+            parts.append(f"using {node['Index Name']}")
+        if 'Subplan Name' in node:
+            parts.append(f"({node['Subplan Name']})")
+        lines.append('  ' * depth + ' '.join(parts))
+    return lines
+
+
+def plan_fingerprint(shape):
+    """
+    Returns a short hash of a plan shape.
+
+    Args:
+        shape (list): The lines returned by `plan_shape`.
+
+    Returns:
+        str: The first 16 hexadecimal digits of the SHA-1 of the shape.
+    """
+    return hashlib.sha1('\n'.join(shape).encode()).hexdigest()[:16]
+
+
+def _table_rows(using):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(%s) AND relkind = 'r'",
+            [list(CHECKED_TABLES)],
+        )
+        return dict(cursor.fetchall())
+
+
+def sequential_scans(plan, table_rows, threshold=SEQ_SCAN_THRESHOLD):
+    """
+    Returns the large checked tables a plan scans sequentially.
+
+    Args:
+        plan (dict): The root node of a plan.
+        table_rows (dict): The estimated row count of each of `CHECKED_TABLES`.
+        threshold (int, optional): The row count above which a scan is reported.
+
+    Returns:
+        list: The names of the tables, in plan order.
+    """
+    return [
+        node['Relation Name'] for _, node in _nodes(plan)
+        if node['Node Type'] == 'Seq Scan' and table_rows.get(node.get('Relation Name'), 0) > threshold
+    ]
+
+
+def explain_views(sample, threshold=SEQ_SCAN_THRESHOLD, using=DEFAULT_DB_ALIAS):
+    """
+    Requests every URL in `REQUESTS` once and explains the queries it issues.
+
+    Caches are emptied before each request, so that every query a view can issue
+    is captured, neither read replicas nor the catalogue snapshot are used, and the
+    test client is allowed to read the metrics endpoints.
+    The views run with private in-memory caches in place of every configured one,
+    so that emptying them does not flush a shared cache, and the pages, versions
+    and names cached from the plan catalogue are dropped afterwards: the catalogue
+    is rolled back, and its ids are reused by the real one.
+
+    Args:
+        sample (Sample): The request parameters.
+        threshold (int, optional): The row count above which a sequential scan is reported.
+        using (str, optional): The database alias.
+
+    Returns:
+        dict: For each request label, its `path`, response `status` and `queries`,
+            a list with the `sql`, `plan` shape, `fingerprint` and `seq_scans` of
+            each explained query, in execution order. `seq_scans` leaves out the
+            scans `ALLOWED_SEQ_SCANS` accepts for the label.
+    """
+    table_rows = _table_rows(using)
+    client = Client()
+    report = {}
+    private_caches = {
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'query-plans-{alias}'}
+        for alias in settings.CACHES
+    }
+    with override_settings(
+        CACHES=private_caches, DATABASE_REPLICAS=[], CATALOGUE_SNAPSHOT_PATH='', METRICS_ALLOWED_IPS=['127.0.0.1'],
+    ):
+        try:
+            for name in sorted(REQUESTS):
+                for label, build in REQUESTS[name]:
+                    _forget_cached_data()
+                    path = build(sample, 0)
+                    with CaptureQueriesContext(connections[using]) as captured:
+                        response = client.get(path)
+                        if response.streaming:
+                            for chunk in response.streaming_content:
+                                pass
+                    queries = []
+                    for query in captured.captured_queries:
+                        sql = explainable_sql(query['sql'])
+                        if sql is None:
+                            continue
+                        plan = explain(sql, using)
+                        shape = plan_shape(plan)
+                        queries.append({
+                            'sql': sql, 'plan': shape, 'fingerprint': plan_fingerprint(shape),
+                            'seq_scans': [
+                                table for table in sequential_scans(plan, table_rows, threshold)
+                                if table not in ALLOWED_SEQ_SCANS.get(label, {})
+                            ],
+                        })
+                    report[label] = {'path': path, 'status': response.status_code, 'queries': queries}
+        finally:
+            _forget_cached_data()
+    return report
+
+
+def _forget_cached_data():
+    for cache in caches.all():
+        cache.clear()
+    invalidate_genre_choices()
+    author_cache.clear()
+
+
+def _postgresql_major(using):
+    return connections[using].pg_version // 10000
+
+
+def load_fingerprints(path=FINGERPRINTS_PATH):
+    """
+    Reads the recorded plan shapes.
+
+    Args:
+        path (Path, optional): The fingerprints file.
+
+    Returns:
+        dict or None: The recorded `postgresql` major version and the `plans` of
+            each request label, or None if the file does not exist.
+    """
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def write_fingerprints(report, path=FINGERPRINTS_PATH, using=DEFAULT_DB_ALIAS):
+    """
+    Records the plan shapes of a report.
+
+    Args:
+        report (dict): The result of `explain_views`.
+        path (Path, optional): The fingerprints file.
+        using (str, optional): The database alias the report was made on.
+    """
+    recorded = {
+        'postgresql': _postgresql_major(using),
+        'catalogue': PLAN_CATALOGUE,
+        'plans': {
+            label: [{'fingerprint': query['fingerprint'], 'plan': query['plan']} for query in result['queries']]
+            for label, result in sorted(report.items())
+        },
+    }
+    Path(path).write_text(json.dumps(recorded, indent=2, ensure_ascii=False) + '\n')
+
+
+def changed_fingerprints(recorded, report):
+    """
+    Compares a report with the recorded plan shapes.
+
+    Args:
+        recorded (dict): The result of `load_fingerprints`.
+        report (dict): The result of `explain_views`.
+
+    Returns:
+        list: The labels of the requests whose plans were added, removed or changed.
+    """
+    plans = recorded['plans']
+    return sorted(
+        label for label in plans.keys() | report.keys()
+        if [query['fingerprint'] for query in plans.get(label, [])]
+        != [query['fingerprint'] for query in report.get(label, {}).get('queries', [])]
+    )
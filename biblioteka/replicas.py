@@ -0,0 +1,205 @@
+"""
+Read-replica routing for the library application.
+
+When `DB_REPLICA_HOSTS` lists read replicas, `Library/settings.py` adds a
+`replicaN` database alias for each of them. `ReplicaMiddleware` then picks one
+replica per safe (GET, HEAD, OPTIONS) request, and `ReplicaRouter` sends the
+catalogue reads of that request to it. Everything else uses the primary:
+
+    - writes, and reads inside a transaction on the primary;
+    - requests with an unsafe method, such as form submissions;
+    - code running outside a request, such as management commands and signals;
+    - models of other applications, such as sessions and users.
+
+Replicas lag slightly behind the primary. To make sure users see their own changes,
+a response to an unsafe request sets a short-lived cookie, and requests carrying it
+read from the primary for `READ_YOUR_WRITES_SECONDS` (read-your-writes stickiness).
+The redirect to the title list after adding a title is therefore served by the
+primary.
+
+Classes:
+    - `ReplicaRouter`: Database router sending request reads to the chosen replica.
+    - `ReplicaMiddleware`: Chooses the database alias for the reads of each request.
+
+Functions:
+    - `read_alias`: Returns the alias serving the reads of the current request.
+
+Constants:
+    - `STICKY_COOKIE`: The cookie pinning a client's reads to the primary.
+"""
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'read_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = ContextVar('biblioteka_read_alias', default=None)
+
+
+def read_alias():
+    """
+    Returns the alias chosen for the reads of the current request.
+
+    Returns:
+        str: The replica chosen by `ReplicaMiddleware`, or the primary alias.
+    """
+    return _read_alias.get() or DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """
+    Routes the reads of the current request to a replica and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        """
+        Returns the alias to read a model from.
+
+        Args:
+            model (type): The model being read.
+            **hints: Routing hints (unused).
+
+        Returns:
+            str: The replica chosen for the request, or the primary alias.
+        """
+        alias = _read_alias.get()
+        if (
+            alias is None
+            or model._meta.app_label != 'biblioteka'
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        """
+        Returns the primary alias for every write.
+
+        Args:
+            model (type): The model being written.
+            **hints: Routing hints (unused).
+
+        Returns:
+            str: The primary alias.
+        """
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        Allows relations between objects from any alias, since replicas hold the same data.
+
+        Returns:
+            bool: Always True.
+        """
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """
+        Runs migrations on the primary only; replicas receive them through replication.
+
+        Args:
+            db (str): The alias being migrated.
+            app_label (str): The application of the migration.
+            model_name (str, optional): The model being migrated.
+            **hints: Routing hints (unused).
+
+        Returns:
+            bool: Whether `db` is the primary.
+        """
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Chooses where the reads of each request go and sets the read-your-writes cookie.
+
+    Requests are pinned to a single replica, so that the queries of one response (for
+    example a version lookup and the rows it validates) see the same snapshot. Without
+    configured replicas the middleware does nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """
+        Handles the request with its reads routed to the chosen alias.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            HttpResponse: The response, with the sticky cookie after an unsafe request.
+        """
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _read_alias.set(self.choose_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.stick_to_primary(request, response)
+
+    async def __acall__(self, request):
+        """
+        Handles the request in async mode with its reads routed to the chosen alias.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            HttpResponse: The response, with the sticky cookie after an unsafe request.
+        """
+        token = _read_alias.set(self.choose_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.stick_to_primary(request, response)
+
+    def choose_alias(self, request):
+        """
+        Returns the replica serving the reads of a request.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            str or None: A random replica alias, or None to read from the primary.
+        """
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in SAFE_METHODS
+            or STICKY_COOKIE in request.COOKIES
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def stick_to_primary(self, request, response):
+        """
+        Pins the client's reads to the primary for a while after an unsafe request.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            response (HttpResponse): The response to the request.
+
+        Returns:
+            HttpResponse: The same response.
+        """
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.READ_YOUR_WRITES_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,180 @@
+"""
+PostgreSQL full-text search and author autocomplete for the library catalogue.
+
+Every `Title` stores a precomputed `search_vector` built from its name (weight A),
+description (weight B) and author name (weight C). The column is covered by a GIN
+index, so a search is an index lookup instead of a sequential scan that re-parses
+every description. The vector is refreshed from `biblioteka.signals` whenever a
+title or its author is saved.
+
+Author names are matched for autocomplete in two steps: a case-insensitive prefix
+lookup served by a pattern index on `UPPER(name)`, topped up with fuzzy matches
+served by a `pg_trgm` GIN index when there are not enough prefix matches.
+
+Constants:
+    - `SEARCH_CONFIG`: The text search configuration used for vectors and queries.
+      Both sides must use the same configuration for the GIN index to apply.
+    - `HIGHLIGHT_START` / `HIGHLIGHT_STOP`: Markers placed around matched words in
+      snippets. They are turned into `<mark>` tags after HTML escaping.
+    - `TRIGRAM_MIN_LENGTH`: Shortest input for which fuzzy author matching is tried.
+
+Functions:
+    - `title_search_vector`: Builds the expression that computes a title's vector.
+    - `update_search_vectors`: Recomputes the stored vector for a queryset of titles.
+    - `match_titles`: Returns the titles matching a query, unranked.
+    - `search_titles`: Returns ranked titles matching a query, with snippets.
+    - `highlight_snippet`: Renders a snippet as safe HTML with `<mark>` tags.
+    - `autocomplete_authors`: Returns author suggestions for partially typed names.
+"""
+
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.db.models import F, OuterRef, Subquery
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Author, Title
+
+SEARCH_CONFIG = 'simple'
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+TRIGRAM_MIN_LENGTH = 3
+
+
+def title_search_vector():
+    """
+    Builds the expression computing the search vector of a title.
+
+    The author name is read through a correlated subquery because `UPDATE`
+    statements cannot join related tables.
+
+    Returns:
+        CombinedSearchVector: The weighted vector expression.
+    """
+    author_name = Subquery(Author.objects.filter(pk=OuterRef('author_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(author_name, weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(titles):
+    """
+    Recomputes the stored search vector for the given titles in a single query.
+
+    Args:
+        titles (QuerySet): The titles to refresh.
+
+    Returns:
+        int: The number of updated rows.
+    """
+    return titles.update(search_vector=title_search_vector())
+
+
+def match_titles(query, queryset=None):
+    """
+    Returns the titles matching a web-style search query, without ranking them.
+
+    Args:
+        query (str): The user's search text.
+        queryset (QuerySet, optional): The titles to search. Defaults to all titles.
+
+    Returns:
+        QuerySet: The matching titles, unordered.
+    """
+    if queryset is None:
+        queryset = Title.objects.all()
+    return queryset.filter(search_vector=SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG))
+
+
+def search_titles(query, queryset=None):
+    """
+    Returns the titles matching a web-style search query, best matches first.
+
+    The query accepts the same syntax as web search engines: quoted phrases,
+    `or`, and `-` for exclusion. Each result is annotated with `rank` and with a
+    `snippet` of its description in which matched words are wrapped in
+    `HIGHLIGHT_START` and `HIGHLIGHT_STOP`.
+
+    Args:
+        query (str): The user's search text.
+        queryset (QuerySet, optional): The titles to search. Defaults to all titles.
+
+    Returns:
+        QuerySet: The matching titles ordered by descending rank.
+    """
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    return (
+        match_titles(query, queryset)
+        .annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            snippet=SearchHeadline(
+                'description',
+                search_query,
+                config=SEARCH_CONFIG,
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                max_words=30,
+                min_words=10,
+            ),
+        )
+        .order_by('-rank', 'pk')
+    )
+
+
+def highlight_snippet(snippet):
+    """
+    Renders a search snippet produced by `search_titles` as safe HTML.
+
+    The snippet is HTML-escaped first, so user-provided descriptions cannot inject
+    markup, and only then are the highlight markers replaced with `<mark>` tags.
+
+    Args:
+        snippet (str): The snippet with `HIGHLIGHT_START`/`HIGHLIGHT_STOP` markers.
+
+    Returns:
+        SafeString: The escaped snippet with highlighted matches.
+    """
+    if not snippet:
+        return mark_safe('')
+    html = escape(snippet)
+    return mark_safe(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>'))
+
+
+def autocomplete_authors(term, limit):
+    """
+    Returns up to `limit` authors whose names match a partially typed name.
+
+    Names starting with the term come first, alphabetically. If there are fewer
+    than `limit` of them and the term is long enough to form trigrams, the list
+    is topped up with the most similar remaining names, which catches typos and
+    terms matching a later word of the name.
+
+    Args:
+        term (str): The text typed so far.
+        limit (int): The maximum number of suggestions.
+
+    Returns:
+        list: Dictionaries with the `id` and `name` of each suggested author.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    suggestions = list(
+        Author.objects.filter(name__istartswith=term).order_by('name').values('id', 'name')[:limit]
+    )
+    if len(suggestions) < limit and len(term) >= TRIGRAM_MIN_LENGTH:
+        seen = [suggestion['id'] for suggestion in suggestions]
+        suggestions += (
+            Author.objects
+            .filter(name__trigram_word_similar=term)
+            .exclude(pk__in=seen)
+            .annotate(similarity=TrigramWordSimilarity(term, 'name'))
+            .order_by('-similarity', 'name')
+            .values('id', 'name')[:limit - len(suggestions)]
+        )
+    return suggestions
@@ -0,0 +1,462 @@
+"""
+Signal handlers for the library application.
+
+These handlers keep denormalized data derived from titles and authors up to date
+whenever the underlying rows change. They are connected in `BibliotekaConfig.ready()`.
+
+Handlers:
+    - `set_title_excerpt`: Recomputes the stored description excerpt of a title about to be saved.
+    - `refresh_title_search_vector`: Recomputes the search vector of a saved title.
+    - `refresh_author_search_vectors`: Recomputes the search vectors of a renamed author's titles.
+    - `clear_author_cache`: Drops cached author ids after an author is renamed or deleted.
+    - `clear_genre_choices`: Drops the cached genre choices after a genre changes.
+    - `catalogue_names_changed`: Makes catalogue snapshots stale after an author or genre changes.
+    - `title_saved_or_deleted`: Records the change of a saved or deleted title.
+    - `title_genres_changed`: Records the change of titles whose genres were changed.
+    - `author_titles_changed`: Records the change of a renamed author's titles.
+    - `genre_titles_changed`: Records the change of a renamed or deleted genre's titles.
+    - `remember_title_author`: Remembers the author of a title about to be saved.
+    - `count_title_saved`: Updates the author counters after a title is created or moved.
+    - `count_title_deleted`: Updates the author and genre counters before a title is deleted.
+    - `count_title_genres_changed`: Updates the genre counters after genres are added or removed.
+    - `similar_title_saved`: Schedules the similar titles update of a created or moved title.
+    - `similar_title_genres_changed`: Schedules the similar titles update of titles whose genres changed.
+    - `similar_title_renamed`: Invalidates the pages listing a title renamed or given another author.
+    - `similar_author_renamed`: Invalidates the pages listing a title of a renamed author.
+    - `similar_title_deleted`: Invalidates the pages listing a title about to be deleted as similar.
+    - `connection_opened`: Instruments new database connections for `biblioteka.metrics`.
+
+A change to a title means bumping its `updated_at` and the title collection version
+(see `biblioteka.versions`), invalidating its cached detail page (see
+`biblioteka.pagecache`) and writing a change log entry (see `biblioteka.changes`). `titles_changed` does all of this for titles whose rows are
+not saved themselves.
+
+The `count_*` handlers keep the `title_count` counters of authors and genres current
+(see `biblioteka.stats`), and the `similar_*` handlers the similar titles index (see
+`biblioteka.similar`).
+"""
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authors import author_cache
+from .changes import record_title_changes
+from .excerpts import make_excerpt
+from .genres import invalidate_genre_choices
+from .metrics import instrument_connection
+from .models import Author, Genre, SimilarTitle, Title, TitleChange
+from .pagecache import detail_page_cache
+from .search import update_search_vectors
+from .similar import schedule_similar_update
+from .snapshot import recheck_snapshot
+from .stats import adjust_title_counts, count_titles
+from .versions import bump_catalogue_version, touch_titles
+
+
+@receiver(pre_save, sender=Title)
+def set_title_excerpt(sender, instance, **kwargs):
+    """
+    Recomputes the description excerpt of a title before it is saved.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The title about to be saved.
+        **kwargs: Additional signal arguments.
+    """
+    instance.excerpt = make_excerpt(instance.description)
+
+
+@receiver(post_save, sender=Title)
+def refresh_title_search_vector(sender, instance, **kwargs):
+    """
+    Recomputes the stored search vector after a title is saved.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The saved title.
+        **kwargs: Additional signal arguments.
+    """
+    update_search_vectors(Title.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Author)
+def refresh_author_search_vectors(sender, instance, created, **kwargs):
+    """
+    Recomputes the search vectors of an author's titles after the author is renamed.
+
+    A newly created author has no titles yet, so there is nothing to refresh.
+
+    Args:
+        sender (type): The `Author` model class.
+        instance (Author): The saved author.
+        created (bool): Whether the author was just created.
+        **kwargs: Additional signal arguments.
+    """
+    if not created:
+        update_search_vectors(Title.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def clear_author_cache(sender, **kwargs):
+    """
+    Clears the per-process author cache after an author is changed or deleted.
+
+    The old name of a renamed author is not known here, so the whole cache is
+    dropped. Authors are rarely edited, so the cache refills quickly. The caches of
+    other processes are not reached; `resolve_author` checks cached ids on use.
+
+    Args:
+        sender (type): The `Author` model class.
+        **kwargs: Additional signal arguments.
+    """
+    author_cache.clear()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def clear_genre_choices(sender, **kwargs):
+    """
+    Invalidates the cached genre choices after a genre is saved or deleted.
+
+    Args:
+        sender (type): The `Genre` model class.
+        **kwargs: Additional signal arguments.
+    """
+    invalidate_genre_choices()
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def catalogue_names_changed(sender, **kwargs):
+    """
+    Bumps the title collection version after an author or genre is saved or deleted.
+
+    Catalogue snapshots hold every author and genre name, including those of authors
+    and genres without titles, whose changes bump no title. The bump makes every
+    snapshot stale (see `biblioteka.snapshot`), at once in this process and within
+    `CATALOGUE_SNAPSHOT_CHECK_INTERVAL` seconds in the others.
+
+    Args:
+        sender (type): The `Author` or `Genre` model class.
+        **kwargs: Additional signal arguments.
+    """
+    bump_catalogue_version()
+    recheck_snapshot()
+
+
+def titles_changed(pks):
+    """
+    Records a change to titles made without saving the title rows themselves.
+
+    Bumps `updated_at` of the titles and the version of the title collection,
+    invalidates their cached detail pages and logs them as updated.
+
+    Args:
+        pks (iterable): The primary keys of the changed titles.
+    """
+    pks = list(pks)
+    if pks:
+        touch_titles(Title.objects.filter(pk__in=pks))
+        detail_page_cache.invalidate(pks)
+        record_title_changes(pks, TitleChange.UPDATED)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_saved_or_deleted(sender, instance, signal, created=False, **kwargs):
+    """
+    Records the change of a saved or deleted title.
+
+    `updated_at` of a saved title is set by `auto_now`, so only the collection
+    version is bumped, the cached detail page invalidated and the change logged.
+    A deleted title is logged as a tombstone.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The saved or deleted title.
+        signal (Signal): `post_save` or `post_delete`.
+        created (bool): Whether the title was just created.
+        **kwargs: Additional signal arguments.
+    """
+    bump_catalogue_version()
+    detail_page_cache.invalidate([instance.pk])
+    if signal is post_delete:
+        action = TitleChange.DELETED
+    else:
+        action = TitleChange.CREATED if created else TitleChange.UPDATED
+    record_title_changes([instance.pk], action)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Records the change of titles whose genres were changed.
+
+    The relation can be changed from either side: `title.genre.add(...)` passes the
+    title as `instance`, while `genre.titles.add(...)` passes the genre and the ids
+    of the affected titles in `pk_set`. A reverse `clear()` does not pass `pk_set`,
+    so the affected titles are looked up before the rows are removed.
+
+    Args:
+        sender (type): The `Title.genre` through model.
+        instance (Title or Genre): The object whose relation changed.
+        action (str): The kind of change, such as `post_add` or `pre_clear`.
+        reverse (bool): Whether the change was made from the `Genre` side.
+        pk_set (set): The primary keys added or removed, if known.
+        **kwargs: Additional signal arguments.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            titles_changed([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        titles_changed(pk_set)
+    elif action == 'pre_clear':
+        titles_changed(instance.titles.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Author)
+def author_titles_changed(sender, instance, created, **kwargs):
+    """
+    Records the change of an author's titles after the author is renamed.
+
+    Args:
+        sender (type): The `Author` model class.
+        instance (Author): The saved author.
+        created (bool): Whether the author was just created.
+        **kwargs: Additional signal arguments.
+    """
+    if not created:
+        titles_changed(instance.titles.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def genre_titles_changed(sender, instance, created=False, **kwargs):
+    """
+    Records the change of a genre's titles after the genre is renamed or deleted.
+
+    Deleting a genre removes its through rows without sending `m2m_changed`, so the
+    affected titles are looked up before the deletion.
+
+    Args:
+        sender (type): The `Genre` model class.
+        instance (Genre): The saved or deleted genre.
+        created (bool): Whether the genre was just created.
+        **kwargs: Additional signal arguments.
+    """
+    if not created:
+        titles_changed(instance.titles.values_list('pk', flat=True))
+
+
+@receiver(pre_save, sender=Title)
+def remember_title_author(sender, instance, using, **kwargs):
+    """
+    Remembers the author and name a title had before it is saved, for `count_title_saved`
+    and `similar_title_renamed`.
+
+    The row is locked until the save commits (`Title.save` runs in a transaction),
+    so that concurrent saves moving the title away from the same author read the
+    author one after the other and do not both count that author down.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The title about to be saved.
+        using (str): The database alias the title is saved to.
+        **kwargs: Additional signal arguments.
+    """
+    instance._previous_author_id = instance._previous_name = None
+    if not instance._state.adding:
+        instance._previous_author_id, instance._previous_name = (
+            Title.objects.using(using).select_for_update(no_key=True).filter(pk=instance.pk)
+            .values_list('author_id', 'name').first()
+            or (None, None)
+        )
+
+
+@receiver(post_save, sender=Title)
+def count_title_saved(sender, instance, created, **kwargs):
+    """
+    Updates the title counters of authors after a title is created or given another author.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The saved title.
+        created (bool): Whether the title was just created.
+        **kwargs: Additional signal arguments.
+    """
+    previous = getattr(instance, '_previous_author_id', None)
+    if created:
+        adjust_title_counts(Author, {instance.author_id: 1})
+    elif previous != instance.author_id:
+        adjust_title_counts(Author, {previous: -1, instance.author_id: 1})
+
+
+@receiver(pre_delete, sender=Title)
+def count_title_deleted(sender, instance, **kwargs):
+    """
+    Removes a title from the counters of its author and genres before it is deleted.
+
+    Deleting a title removes its genre links without sending `m2m_changed`, so the
+    genres are counted down here, while the links still exist.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The title about to be deleted.
+        **kwargs: Additional signal arguments.
+    """
+    count_titles([instance.pk], -1)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def count_title_genres_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Updates the title counters of genres after genres are added to or removed from titles.
+
+    `add()` only reports the links it actually creates, but `remove()` reports every
+    given id, so removed links are looked up before they are deleted. Each change
+    runs in the transaction of the relation change.
+
+    Args:
+        sender (type): The `Title.genre` through model.
+        instance (Title or Genre): The object whose relation changed.
+        action (str): The kind of change, such as `post_add` or `pre_clear`.
+        reverse (bool): Whether the change was made from the `Genre` side.
+        pk_set (set): The primary keys added or removed, if known.
+        using (str): The database alias of the change.
+        **kwargs: Additional signal arguments.
+    """
+    links = sender.objects.using(using)
+    if not reverse:
+        if action == 'post_add':
+            adjust_title_counts(Genre, dict.fromkeys(pk_set, 1))
+        elif action in ('pre_remove', 'pre_clear'):
+            removed = links.filter(title_id=instance.pk)
+            if action == 'pre_remove':
+                removed = removed.filter(genre_id__in=pk_set)
+            adjust_title_counts(Genre, dict.fromkeys(removed.values_list('genre_id', flat=True), -1))
+    elif action == 'post_add':
+        adjust_title_counts(Genre, {instance.pk: len(pk_set)})
+    elif action == 'pre_remove':
+        adjust_title_counts(Genre, {instance.pk: -links.filter(genre_id=instance.pk, title_id__in=pk_set).count()})
+    elif action == 'pre_clear':
+        Genre.objects.using(using).filter(pk=instance.pk).update(title_count=0)
+
+
+@receiver(post_save, sender=Title)
+def similar_title_saved(sender, instance, created, using, **kwargs):
+    """
+    Schedules the similar titles update of a title after it is created or given another author.
+
+    Other fields do not take part in the similarity, so other saves change nothing.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The saved title.
+        created (bool): Whether the title was just created.
+        using (str): The database alias the title is saved to.
+        **kwargs: Additional signal arguments.
+    """
+    if created or getattr(instance, '_previous_author_id', None) != instance.author_id:
+        schedule_similar_update(instance.pk, using)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def similar_title_genres_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Schedules the similar titles update of titles whose genres were changed.
+
+    A reverse `clear()` can touch every title of a genre and is left to the next
+    rebuild of the index.
+
+    Args:
+        sender (type): The `Title.genre` through model.
+        instance (Title or Genre): The object whose relation changed.
+        action (str): The kind of change, such as `post_add` or `pre_clear`.
+        reverse (bool): Whether the change was made from the `Genre` side.
+        pk_set (set): The primary keys added or removed, if known.
+        using (str): The database alias of the change.
+        **kwargs: Additional signal arguments.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_similar_update(instance.pk, using)
+    elif action in ('post_add', 'post_remove'):
+        for pk in pk_set:
+            schedule_similar_update(pk, using)
+
+
+@receiver(post_save, sender=Title)
+def similar_title_renamed(sender, instance, created, using, **kwargs):
+    """
+    Invalidates the cached pages of titles that list a title renamed or given another author.
+
+    The similar titles panel shows the name and author of each neighbour.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The saved title.
+        created (bool): Whether the title was just created.
+        using (str): The database alias the title is saved to.
+        **kwargs: Additional signal arguments.
+    """
+    if created:
+        return
+    if (getattr(instance, '_previous_name', None) != instance.name
+            or getattr(instance, '_previous_author_id', None) != instance.author_id):
+        detail_page_cache.invalidate(
+            SimilarTitle.objects.using(using).filter(similar_id=instance.pk).values_list('title_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=Author)
+def similar_author_renamed(sender, instance, created, using, **kwargs):
+    """
+    Invalidates the cached pages of titles that list a title of a renamed author.
+
+    Args:
+        sender (type): The `Author` model class.
+        instance (Author): The saved author.
+        created (bool): Whether the author was just created.
+        using (str): The database alias the author is saved to.
+        **kwargs: Additional signal arguments.
+    """
+    if not created:
+        detail_page_cache.invalidate(
+            SimilarTitle.objects.using(using).filter(similar__author_id=instance.pk)
+            .values_list('title_id', flat=True).distinct()
+        )
+
+
+@receiver(pre_delete, sender=Title)
+def similar_title_deleted(sender, instance, using, **kwargs):
+    """
+    Invalidates the cached pages of titles that list a title about to be deleted as similar.
+
+    The index rows themselves are removed by their foreign keys.
+
+    Args:
+        sender (type): The `Title` model class.
+        instance (Title): The title about to be deleted.
+        using (str): The database alias the title is deleted from.
+        **kwargs: Additional signal arguments.
+    """
+    detail_page_cache.invalidate(
+        SimilarTitle.objects.using(using).filter(similar_id=instance.pk).values_list('title_id', flat=True)
+    )
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """
+    Installs the query timer of `biblioteka.metrics` on a new database connection.
+
+    Args:
+        sender (type): The database wrapper class.
+        connection (BaseDatabaseWrapper): The opened connection.
+        **kwargs: Additional signal arguments.
+    """
+    instrument_connection(connection)
@@ -0,0 +1,545 @@
+"""
+Similar titles index for the library application.
+
+Each title is described by a sparse vector with one dimension per genre and one
+per author. A genre dimension is weighted by the genre's inverse document
+frequency (`genre_weights`), so that sharing a rare genre counts for more than
+sharing a common one, and the author dimension has the constant weight
+`AUTHOR_WEIGHT`. Two titles are as similar as the cosine of their vectors, and the
+neighbours of a title are the `SIMILAR_TITLES_COUNT` titles with the highest
+positive similarity, ties going to the lower id. They are stored in the
+`SimilarTitle` table, so a detail page reads them with one index scan
+(`similar_titles`) and never compares titles while it is requested.
+
+The index is maintained in two ways:
+
+    - `rebuild_similar_titles`, run by the command of the same name, recomputes
+      every neighbour list from a snapshot of the catalogue, mapped from the
+      catalogue snapshot file when it is current (see `biblioteka.snapshot`) and
+      read from the tables otherwise. Titles with the same set of genres have the
+      same genre part, so the genre similarities are computed between the distinct
+      genre sets ("profiles", far fewer than titles) rather
+      than between titles: the weighted profile vectors form a SciPy sparse matrix
+      and each batch of profiles is multiplied with all of them at once. The
+      neighbours of a title are then read off its profile's row in similarity
+      order, and the author term is added for the titles of the same author;
+    - `update_similar_titles` recomputes the neighbours of titles edited through
+      the ORM, scheduled by `biblioteka.signals` to run once their transaction
+      commits. The candidates are the titles listing the edited title or listed by
+      it, and bounded pools (`SIMILAR_TITLES_CANDIDATES` titles each) of the titles
+      most likely to rank first: the lowest ids with exactly the same genres, of the
+      author and of each genre. They are scored in one NumPy pass with the same
+      weights as the rebuild. The edited title is rescored in the lists that hold
+      it and inserted into the lists of other candidates it now ranks in. Its own
+      list is exact whenever enough titles share its genres; a list it drops lower
+      in keeps it until the next rebuild finds a better title.
+
+Deleting a title removes its rows through the foreign keys. Titles created by the
+bulk loaders, and titles changed by the set-based operations of
+`biblioteka.bulk_edit`, get their neighbours at the next rebuild.
+
+The detail pages of titles whose neighbours change are invalidated, so cached
+pages do not link to stale or deleted titles, and so are the pages listing a title
+that is renamed, moved to another author or deleted, or whose author is renamed
+(see `biblioteka.signals`). The entity tags of detail pages include the state of
+the neighbours (`annotate_neighbour_state`), so clients revalidate them as well.
+
+NumPy and SciPy are optional: without them the index is neither rebuilt nor
+updated, and pages show the rows already stored.
+
+Constants:
+    - `AUTHOR_WEIGHT`: The weight of the author dimension of a title vector.
+    - `SIMILAR_TABLE`, `TITLE_TABLE`, `LINK_TABLE`: The index, title and title-genre tables.
+
+Functions:
+    - `similar_titles`: Returns the stored neighbours of a title.
+    - `annotate_neighbour_state`: Annotates titles with the state of their stored neighbours.
+    - `similarity_available`: Tells whether NumPy and SciPy are installed.
+    - `genre_weights`: Returns the weights of genres from their title counts.
+    - `rebuild_similar_titles`: Recomputes the neighbours of every title.
+    - `update_similar_titles`: Recomputes the neighbours of some titles.
+    - `schedule_similar_update`: Updates the neighbours of a title once its transaction commits.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import CharField, DateTimeField
+from django.db.models.expressions import RawSQL
+
+from .models import Author, Genre, SimilarTitle, Title
+from .pagecache import detail_page_cache
+from .snapshot import get_snapshot
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+AUTHOR_WEIGHT = 3.0
+
+SIMILAR_TABLE = SimilarTitle._meta.db_table
+TITLE_TABLE = Title._meta.db_table
+LINK_TABLE = Title.genre.through._meta.db_table
+
+
+def similar_titles(pk, limit=None, using=DEFAULT_DB_ALIAS):
+    """
+    Returns the stored neighbours of a title, most similar first.
+
+    The rows are read in index order with the similar titles and their authors
+    joined, in a single query.
+
+    Args:
+        pk (int): The primary key of the title.
+        limit (int, optional): The largest number of neighbours. Defaults to
+            `SIMILAR_TITLES_COUNT`.
+        using (str, optional): The database alias to read from.
+
+    Returns:
+        QuerySet: `SimilarTitle` rows with `score`, `similar.name` and
+            `similar.author.name` loaded.
+    """
+    limit = settings.SIMILAR_TITLES_COUNT if limit is None else limit
+    return (
+        SimilarTitle.objects.using(using)
+        .filter(title_id=pk)
+        .select_related('similar__author')
+        .only('score', 'similar__name', 'similar__author__name')
+        .order_by('-score', 'similar_id')[:limit]
+    )
+
+
+def annotate_neighbour_state(queryset):
+    """
+    Annotates titles with the state of their stored neighbours.
+
+    The similar titles panel of a detail page shows the neighbours' names and
+    authors, so the page changes whenever a neighbour is renamed or moved to another
+    author, which bumps the neighbour's `updated_at`, and whenever the neighbour list
+    itself changes. Both annotations are correlated subqueries reading the index rows
+    of each title, so they add no query to the one reading the titles.
+
+    Args:
+        queryset (QuerySet): The titles to annotate.
+
+    Returns:
+        QuerySet: The titles with `neighbours_updated_at`, the latest `updated_at` of
+            a neighbour, and `neighbours_digest`, an MD5 hash of the ids, scores and
+            `updated_at` of the neighbours in page order; both None for a title
+            without neighbours.
+    """
+    neighbours = (
+        f'FROM "{SIMILAR_TABLE}" s JOIN "{TITLE_TABLE}" n ON n.id = s.similar_id '
+        f'WHERE s.title_id = "{TITLE_TABLE}".id'
+    )
+    return queryset.annotate(
+        neighbours_updated_at=RawSQL(f"SELECT max(n.updated_at) {neighbours}", [], output_field=DateTimeField()),
+        neighbours_digest=RawSQL(
+            f"SELECT md5(string_agg(s.similar_id || ':' || s.score || ':' || n.updated_at, ',' "
+            f"ORDER BY s.score DESC, s.similar_id)) {neighbours}",
+            [], output_field=CharField(),
+        ),
+    )
+
+
+def genre_weights(counts, total):
+    """
+    Returns the inverse document frequency weights of genres.
+
+    Args:
+        counts (ndarray): The number of titles of each genre.
+        total (int): The number of titles in the catalogue.
+
+    Returns:
+        ndarray: One weight per genre, at least 1 and larger for rarer genres.
+    """
+    return np.log((1.0 + total) / (1.0 + np.asarray(counts, dtype=np.float64))) + 1.0
+
+
+def similarity_available():
+    """
+    Tells whether NumPy and SciPy are installed, so that the index can be built and updated.
+
+    Returns:
+        bool: True if the index can be built.
+    """
+    return np is not None and sparse is not None
+
+
+def _top(ids, scores, limit):
+    # The positions of the `limit` highest scores, ties by id, sorting only the
+    # scores that can make it.
+    if limit < 1 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if len(scores) > 4 * limit:
+        threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+        subset = np.flatnonzero(scores >= threshold)
+        return subset[np.lexsort((ids[subset], -scores[subset]))[:limit]]
+    return np.lexsort((ids, -scores))[:limit]
+
+
+def _write(pks, title_ids, similar_ids, scores):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SIMILAR_TABLE} WHERE title_id = ANY(%s::bigint[])", [pks])
+        if len(title_ids):
+            cursor.execute(
+                f"INSERT INTO {SIMILAR_TABLE} (title_id, similar_id, score) "
+                f"SELECT n.* FROM unnest(%s::bigint[], %s::bigint[], %s::float8[]) AS n(title_id, similar_id, score) "
+                f"WHERE EXISTS (SELECT 1 FROM {TITLE_TABLE} WHERE id = n.similar_id) "
+                f"AND EXISTS (SELECT 1 FROM {TITLE_TABLE} WHERE id = n.title_id)",
+                [title_ids, similar_ids, scores],
+            )
+
+
+def _load_catalogue():
+    snapshot = get_snapshot(recheck=True)
+    if snapshot is not None:
+        # Read the arrays straight from the mapped snapshot instead of the tables.
+        ids = np.frombuffer(snapshot.title_ids, dtype=np.int64)
+        counts = np.diff(np.frombuffer(snapshot.title_genre_offsets, dtype=np.int64))
+        links = np.column_stack((np.repeat(ids, counts), np.frombuffer(snapshot.title_genre_ids, dtype=np.int64)))
+        return ids, np.frombuffer(snapshot.title_authors, dtype=np.int64), links
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT id, author_id FROM {TITLE_TABLE} ORDER BY id")
+        titles = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        cursor.execute(f"SELECT title_id, genre_id FROM {LINK_TABLE}")
+        links = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+    return titles[:, 0], titles[:, 1], links
+
+
+def _profiles(ids, links):
+    # The binary title x genre matrix, its distinct rows and the row of each title.
+    genre_ids = np.unique(links[:, 1])
+    rows = np.searchsorted(ids, links[:, 0])
+    known = rows < len(ids)
+    known[known] = ids[rows[known]] == links[known, 0]
+    rows, cols = rows[known], np.searchsorted(genre_ids, links[known, 1])
+    genres = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=(len(ids), max(len(genre_ids), 1)),
+    )
+    genres.sum_duplicates()
+    genres.data[:] = 1.0
+    packed = np.packbits(genres.toarray().astype(bool), axis=1)
+    _, first, profile_of = np.unique(packed, axis=0, return_index=True, return_inverse=True)
+    return genres, first, profile_of.ravel()
+
+
+class _Catalogue:
+    # The snapshot of the catalogue a rebuild works on, indexed by title row.
+
+    def __init__(self, ids, authors, links):
+        self.ids = ids
+        genres, first, self.profile_of = _profiles(ids, links)
+        weights = genre_weights(np.asarray(genres.sum(axis=0)).ravel(), len(ids))
+        weighted = genres[first].multiply(weights).tocsr()
+        self.norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel() + AUTHOR_WEIGHT ** 2)
+        self.vectors = (sparse.diags(1.0 / self.norms) @ weighted).tocsr()
+        self.walks = {}
+        self.profile_count = len(first)
+        self.by_profile = self._group(self.profile_of, self.profile_count)
+        author_index, author_of = np.unique(authors, return_inverse=True)
+        self.author_of = author_of.ravel()
+        self.by_author = self._group(self.author_of, len(author_index))
+
+    @staticmethod
+    def _group(keys, count):
+        # The title rows of each key, in id order.
+        order = np.argsort(keys, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=count))])
+        return [order[bounds[i]:bounds[i + 1]] for i in range(count)]
+
+    def similarities(self, profiles):
+        # The cosine similarities of the genre parts of some profiles with all profiles.
+        return (self.vectors[profiles] @ self.vectors.T).toarray()
+
+    def walk(self, row, count):
+        # The first `count` title rows in descending `row` similarity, ties by id.
+        candidates = np.flatnonzero(row > 0)
+        candidates = candidates[np.argsort(-row[candidates], kind='stable')]
+        rows, scores, taken, start = [], [], 0, 0
+        while start < len(candidates) and taken < count:
+            end = start + 1
+            while end < len(candidates) and row[candidates[end]] == row[candidates[start]]:
+                end += 1
+            members = np.concatenate([self.by_profile[profile] for profile in candidates[start:end]])
+            if end - start > 1:
+                members.sort()
+            members = members[:count - taken]
+            rows.append(members)
+            scores.append(np.full(len(members), row[candidates[start]]))
+            taken += len(members)
+            start = end
+        exhausted = start >= len(candidates)
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0), True
+        return np.concatenate(rows), np.concatenate(scores), exhausted
+
+    def neighbours(self, profile, row, author, titles, limit):
+        # The neighbours of the titles of one author with one profile.
+        same = self.by_author[author]
+        same_scores = row[self.profile_of[same]] + AUTHOR_WEIGHT ** 2 / (
+            self.norms[profile] * self.norms[self.profile_of[same]]
+        )
+        best = _top(self.ids[same], same_scores, limit + 1)
+        candidates, scores = [same[best]], [same_scores[best]]
+        others, other_scores, exhausted = self.walks.get(profile) or self.walk(row, 2 * limit)
+        while True:
+            keep = self.author_of[others] != author
+            if keep.sum() >= limit or exhausted:
+                break
+            others, other_scores, exhausted = self.walk(row, 4 * len(others))
+        self.walks[profile] = others, other_scores, exhausted
+        candidates.append(others[keep][:limit])
+        scores.append(other_scores[keep][:limit])
+        candidates, scores = np.concatenate(candidates), np.concatenate(scores)
+        order = _top(self.ids[candidates], scores, 2 * limit + 1)
+        candidates, scores = candidates[order], scores[order]
+        result = []
+        for title in titles:
+            keep = (candidates != title) & (scores > 0)
+            result.append((candidates[keep][:limit], scores[keep][:limit]))
+        return result
+
+
+def rebuild_similar_titles(limit=None, batch_size=256, progress=None):
+    """
+    Recomputes the neighbours of every title from a snapshot of the catalogue.
+
+    Profiles are processed in batches of `batch_size`; the neighbour lists of the
+    titles of a batch are replaced in one transaction, so pages keep showing the
+    previous lists until then.
+
+    Args:
+        limit (int, optional): The number of neighbours stored per title. Defaults to
+            `SIMILAR_TITLES_COUNT`.
+        batch_size (int, optional): The number of profiles compared per matrix product.
+        progress (callable, optional): Called after each batch with the number of
+            titles done and the total.
+
+    Returns:
+        int: The number of titles indexed.
+
+    Raises:
+        ImproperlyConfigured: If NumPy or SciPy is not installed.
+    """
+    if not similarity_available():
+        raise ImproperlyConfigured("Building the similar titles index requires NumPy and SciPy.")
+    limit = settings.SIMILAR_TITLES_COUNT if limit is None else limit
+    ids, authors, links = _load_catalogue()
+    if not len(ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SIMILAR_TABLE}")
+        return 0
+    catalogue = _Catalogue(ids, authors, links)
+    done = 0
+    for start in range(0, catalogue.profile_count, batch_size):
+        profiles = np.arange(start, min(start + batch_size, catalogue.profile_count))
+        rows = catalogue.similarities(profiles)
+        titles, title_ids, similar_ids, scores = [], [], [], []
+        for profile, row in zip(profiles, rows):
+            members = catalogue.by_profile[profile]
+            members = members[np.argsort(catalogue.author_of[members], kind='stable')]
+            bounds = np.flatnonzero(np.diff(catalogue.author_of[members])) + 1
+            for group in np.split(members, bounds):
+                author = catalogue.author_of[group[0]]
+                for title, (neighbours, neighbour_scores) in zip(
+                    group, catalogue.neighbours(profile, row, author, group, limit),
+                ):
+                    title_ids.append(np.full(len(neighbours), ids[title]))
+                    similar_ids.append(ids[neighbours])
+                    scores.append(neighbour_scores)
+            titles.append(ids[members])
+        catalogue.walks.clear()
+        pks = np.concatenate(titles).tolist()
+        with transaction.atomic():
+            _write(
+                pks, np.concatenate(title_ids).tolist(), np.concatenate(similar_ids).tolist(),
+                np.concatenate(scores).tolist(),
+            )
+            detail_page_cache.invalidate(pks)
+        done += len(pks)
+        if progress:
+            progress(done, len(ids))
+    return done
+
+
+def _candidates(cursor, pk, author, genres, rarest, count):
+    # One query for the current neighbours and the candidate pools of a title.
+    cursor.execute(
+        f"""
+        SELECT t.id, t.author_id, ARRAY(SELECT genre_id FROM {LINK_TABLE} WHERE title_id = t.id)
+        FROM {TITLE_TABLE} AS t WHERE t.id IN (
+            (SELECT l.title_id FROM {LINK_TABLE} AS l
+             WHERE l.genre_id = %(rarest)s AND ARRAY(
+                 SELECT x.genre_id FROM {LINK_TABLE} AS x WHERE x.title_id = l.title_id ORDER BY x.genre_id
+             ) = %(genres)s::bigint[]
+             ORDER BY l.title_id LIMIT %(count)s)
+            UNION ALL
+            (SELECT a.id FROM {TITLE_TABLE} AS a WHERE a.author_id = %(author)s ORDER BY a.id LIMIT %(count)s)
+            UNION ALL
+            SELECT p.title_id FROM unnest(%(genres)s::bigint[]) AS g(id) CROSS JOIN LATERAL (
+                SELECT title_id FROM {LINK_TABLE} WHERE genre_id = g.id ORDER BY title_id LIMIT %(count)s
+            ) AS p
+            UNION ALL
+            SELECT similar_id FROM {SIMILAR_TABLE} WHERE title_id = %(pk)s
+            UNION ALL
+            SELECT title_id FROM {SIMILAR_TABLE} WHERE similar_id = %(pk)s
+        ) AND t.id <> %(pk)s
+        """,
+        {'pk': pk, 'author': author, 'genres': genres, 'rarest': rarest, 'count': count},
+    )
+    return cursor.fetchall()
+
+
+def _score(author, genres, candidates, weights, total):
+    # The cosine similarities of a title with its candidates, from the stored counters.
+    lengths = np.array([len(row[2]) for row in candidates], dtype=np.int64)
+    flat = np.fromiter((genre for row in candidates for genre in row[2]), dtype=np.int64, count=lengths.sum())
+    owner = np.repeat(np.arange(len(candidates)), lengths)
+    genre_ids = np.array(sorted(weights), dtype=np.int64)
+    table = genre_weights([weights[genre] for genre in genre_ids], total)
+    position = np.clip(np.searchsorted(genre_ids, flat), 0, max(len(genre_ids) - 1, 0))
+    squares = np.where(genre_ids[position] == flat, table[position], 1.0) ** 2 if len(flat) else np.empty(0)
+    shared = np.isin(flat, genres)
+    norms = np.sqrt(np.bincount(owner, squares, minlength=len(candidates)) + AUTHOR_WEIGHT ** 2)
+    dots = np.bincount(owner, squares * shared, minlength=len(candidates))
+    authors = np.array([row[1] for row in candidates], dtype=np.int64)
+    dots += np.where(authors == author, AUTHOR_WEIGHT ** 2, 0.0)
+    own = np.searchsorted(genre_ids, genres)
+    norm = np.sqrt(np.sum(table[own] ** 2) + AUTHOR_WEIGHT ** 2)
+    return dots / (norms * norm)
+
+
+def _update_title(cursor, pk, limit, count, weights, total):
+    cursor.execute(
+        f"SELECT author_id, ARRAY(SELECT genre_id FROM {LINK_TABLE} WHERE title_id = %s ORDER BY genre_id) "
+        f"FROM {TITLE_TABLE} WHERE id = %s",
+        [pk, pk],
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return set()
+    author, genres = row
+    rarest = min(genres, key=lambda genre: (weights.get(genre, 0), genre)) if genres else None
+    candidates = _candidates(cursor, pk, author, genres, rarest, count)
+    ids = np.array([candidate[0] for candidate in candidates], dtype=np.int64)
+    scores = _score(author, genres, candidates, weights, total) if candidates else np.empty(0)
+    positive = scores > 0
+    ids, scores = ids[positive], scores[positive]
+    best = _top(ids, scores, limit)
+
+    _write([pk], [pk] * len(best), ids[best].tolist(), scores[best].tolist())
+    params = {'pk': pk, 'ids': ids.tolist(), 'scores': scores.tolist(), 'limit': limit}
+    # Lists holding the title keep it with its new score, or drop it if it shares nothing any more.
+    cursor.execute(
+        f"""
+        UPDATE {SIMILAR_TABLE} AS s SET score = c.score
+        FROM unnest(%(ids)s::bigint[], %(scores)s::float8[]) AS c(id, score)
+        WHERE s.similar_id = %(pk)s AND s.title_id = c.id AND s.score <> c.score
+        RETURNING s.title_id
+        """,
+        params,
+    )
+    changed = {title_id for title_id, in cursor.fetchall()} | {pk}
+    cursor.execute(
+        f"DELETE FROM {SIMILAR_TABLE} WHERE similar_id = %(pk)s AND NOT title_id = ANY(%(ids)s::bigint[]) "
+        f"RETURNING title_id",
+        params,
+    )
+    changed.update(title_id for title_id, in cursor.fetchall())
+    # Other candidates get the title if it ranks within their first `limit`.
+    cursor.execute(
+        f"""
+        INSERT INTO {SIMILAR_TABLE} (title_id, similar_id, score)
+        SELECT c.id, %(pk)s, c.score FROM unnest(%(ids)s::bigint[], %(scores)s::float8[]) AS c(id, score)
+        WHERE NOT EXISTS (SELECT 1 FROM {SIMILAR_TABLE} AS s WHERE s.title_id = c.id AND s.similar_id = %(pk)s)
+        AND NOT EXISTS (
+            SELECT 1 FROM (
+                SELECT s.score, s.similar_id FROM {SIMILAR_TABLE} AS s WHERE s.title_id = c.id
+                ORDER BY s.score DESC, s.similar_id OFFSET %(limit)s - 1 LIMIT 1
+            ) AS last WHERE last.score > c.score OR last.score = c.score AND last.similar_id < %(pk)s
+        )
+        RETURNING title_id
+        """,
+        params,
+    )
+    inserted = [title_id for title_id, in cursor.fetchall()]
+    if inserted:
+        cursor.execute(
+            f"""
+            DELETE FROM {SIMILAR_TABLE} WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (PARTITION BY title_id ORDER BY score DESC, similar_id) AS rank
+                    FROM {SIMILAR_TABLE} WHERE title_id = ANY(%s::bigint[])
+                ) AS ranked WHERE rank > %s
+            )
+            """,
+            [inserted, limit],
+        )
+    return changed | set(inserted)
+
+
+def update_similar_titles(pks, limit=None, candidates=None):
+    """
+    Recomputes the neighbours of some titles and inserts them into their candidates' lists.
+
+    Genre weights are computed from the `title_count` counters, so that scores agree
+    with those of the last rebuild as long as the counters are current. Titles that
+    no longer exist are skipped. Does nothing without NumPy and SciPy.
+
+    Args:
+        pks (iterable): The primary keys of the changed titles.
+        limit (int, optional): The number of neighbours stored per title. Defaults to
+            `SIMILAR_TITLES_COUNT`.
+        candidates (int, optional): The size of each candidate pool. Defaults to
+            `SIMILAR_TITLES_CANDIDATES`.
+
+    Returns:
+        set: The primary keys of the titles whose neighbour lists changed.
+    """
+    pks = sorted(set(pks))
+    if not pks or not similarity_available():
+        return set()
+    limit = settings.SIMILAR_TITLES_COUNT if limit is None else limit
+    candidates = settings.SIMILAR_TITLES_CANDIDATES if candidates is None else candidates
+    changed = set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT g.id, g.title_count, (SELECT coalesce(sum(title_count), 0) FROM {Author._meta.db_table}) "
+            f"FROM {Genre._meta.db_table} AS g"
+        )
+        rows = cursor.fetchall()
+        weights = {genre: count for genre, count, _ in rows}
+        total = rows[0][2] if rows else 0
+        for pk in pks:
+            changed |= _update_title(cursor, pk, limit, candidates, weights, total)
+        detail_page_cache.invalidate(changed)
+    return changed
+
+
+def _run_update(pk):
+    update_similar_titles([pk])
+
+
+def schedule_similar_update(pk, using=DEFAULT_DB_ALIAS):
+    """
+    Updates the neighbours of a title once the current transaction commits.
+
+    A title saved and given new genres in one transaction is updated only once.
+    Outside a transaction the update runs immediately.
+
+    Args:
+        pk (int): The primary key of the changed title.
+        using (str, optional): The database alias of the change.
+    """
+    conn = connections[using]
+    if conn.in_atomic_block and any(
+        getattr(callback, 'args', None) == (pk,) and getattr(callback, 'func', None) is _run_update
+        for _, callback, _ in conn.run_on_commit
+    ):
+        return
+    transaction.on_commit(partial(_run_update, pk), using=using)
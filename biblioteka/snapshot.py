@@ -0,0 +1,461 @@
+"""
+Memory-mapped catalogue snapshot shared by the worker processes of one host.
+
+Every worker process used to warm its own copies of the catalogue's hot lookup
+data: the genre choices (see `biblioteka.genres`) and the names of recently
+resolved authors (see `biblioteka.authors`). A snapshot holds that data, and the
+author and genres of every title, in one compact read-only file:
+
+    - sorted `int64` arrays of the author, genre and title ids;
+    - the author and genre names as one UTF-8 blob each, with `int64` offsets, and
+      the author positions ordered by lower-case name for case-insensitive lookups;
+    - the author id of every title, and the genre ids of every title in compressed
+      sparse row form (one offsets array, one genre ids array).
+
+Processes map the file with `mmap` and read the arrays through `memoryview`s, so the
+pages live once in the operating system's page cache whatever the number of
+workers, and lookups are binary searches that copy nothing but the returned name.
+The arrays can be handed to NumPy with `numpy.frombuffer`, as the similar titles
+rebuild does.
+
+`build_snapshot`, run by the `build_catalogue_snapshot` command, reads the catalogue
+in one repeatable-read transaction, writes the snapshot to a temporary file next to
+the target and moves it into place with `os.replace`. Readers therefore see either
+the previous file or the new one, never a partial write; a process keeps reading the
+file it mapped until its next check notices the swap.
+
+A snapshot records the title collection version (see `biblioteka.versions`) and the
+database it was read from. `get_snapshot` compares them with the database at most
+every `CATALOGUE_SNAPSHOT_CHECK_INTERVAL` seconds, and returns nothing while the
+snapshot is missing, unreadable or stale, in which case callers fall back to their
+own caches and queries. Every title change and every author or genre change bumps
+the version, so a snapshot is only used until the first change after it was built;
+run the command with `--watch` to rebuild it whenever the version moves.
+
+The arrays are written in the byte order of the host, so a snapshot is only read on
+the host, or hosts of the same architecture, that built it.
+
+Classes:
+    - `SnapshotError`: Raised when a file is not a readable snapshot.
+    - `CatalogueSnapshot`: A read-only view of a mapped snapshot.
+
+Functions:
+    - `build_snapshot`: Writes a snapshot of the current catalogue.
+    - `open_snapshot`: Maps a snapshot file.
+    - `is_current`: Tells whether a snapshot matches the database.
+    - `get_snapshot`: Returns this process's snapshot if it is current.
+    - `recheck_snapshot`: Makes the next `get_snapshot` call check the database again.
+    - `forget_snapshot`: Drops this process's snapshot.
+
+Constants:
+    - `MAGIC`: The first bytes of every snapshot file.
+    - `FORMAT_VERSION`: The version of the file layout.
+    - `SECTIONS`: The arrays of a snapshot, in file order.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import Author, CatalogueVersion, Genre, Title
+from .versions import TITLES
+
+MAGIC = b'BIBSNAP1'
+
+FORMAT_VERSION = 1
+
+SECTIONS = (
+    'author_ids', 'author_name_offsets', 'author_name_order',
+    'genre_ids', 'genre_name_offsets',
+    'title_ids', 'title_authors', 'title_genre_offsets', 'title_genre_ids',
+    'author_names', 'genre_names',
+)
+
+_BLOBS = {'author_names', 'genre_names'}
+
+# Magic, layout version, catalogue version, build time in microseconds, database
+# name, and the length of every section.
+_HEADER = struct.Struct(f'=8sI4xqq64s{len(SECTIONS)}q')
+
+_lock = threading.Lock()
+_state = {'snapshot': None, 'file': None, 'current': False, 'next_check': 0.0}
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a file is not a complete snapshot in the current layout.
+    """
+
+
+class CatalogueSnapshot:
+    """
+    A read-only view of a mapped catalogue snapshot.
+
+    The `SECTIONS` are exposed as attributes holding `memoryview`s over the mapping:
+    `int64` for the arrays and bytes for the name blobs.
+
+    Attributes:
+        version (int): The title collection version the snapshot was built at.
+        built_at (float): When the snapshot was built, as a Unix timestamp.
+        database (str): The name of the database it was read from.
+        size (int): The size of the file, in bytes.
+    """
+
+    def __init__(self, buffer):
+        if len(buffer) < _HEADER.size:
+            raise SnapshotError("The file is shorter than a snapshot header.")
+        magic, format_version, self.version, built_at, database, *lengths = _HEADER.unpack_from(buffer)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotError("The file is not a catalogue snapshot in the current format.")
+        self.built_at = built_at / 1e6
+        self.database = database.rstrip(b'\0').decode(errors='ignore')
+        self.size = len(buffer)
+        self._buffer = buffer
+        view = memoryview(buffer)
+        offset = _HEADER.size
+        for name, length in zip(SECTIONS, lengths):
+            size = length if name in _BLOBS else length * 8
+            if offset + size > len(view):
+                raise SnapshotError("The snapshot is truncated.")
+            section = view[offset:offset + size]
+            setattr(self, name, section if name in _BLOBS else section.cast('q'))
+            offset += size + -size % 8
+        if not (len(self.author_name_offsets) == len(self.author_name_order) + 1 == len(self.author_ids) + 1
+                and len(self.genre_name_offsets) == len(self.genre_ids) + 1
+                and len(self.title_genre_offsets) == len(self.title_authors) + 1 == len(self.title_ids) + 1):
+            raise SnapshotError("The snapshot sections do not match.")
+
+    def __repr__(self):
+        return (f'<CatalogueSnapshot version={self.version} authors={len(self.author_ids)} '
+                f'genres={len(self.genre_ids)} titles={len(self.title_ids)}>')
+
+    @staticmethod
+    def _find(ids, pk):
+        index = bisect_left(ids, pk)
+        return index if index < len(ids) and ids[index] == pk else None
+
+    @staticmethod
+    def _name(blob, offsets, index):
+        return str(blob[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def author_name(self, pk):
+        """
+        Returns the name of an author.
+
+        Args:
+            pk (int): The author id.
+
+        Returns:
+            str or None: The name, or None if the author is not in the snapshot.
+        """
+        index = self._find(self.author_ids, pk)
+        return None if index is None else self._name(self.author_names, self.author_name_offsets, index)
+
+    def find_author(self, name):
+        """
+        Looks an author up by name, ignoring case.
+
+        Args:
+            name (str): The normalized name (see `biblioteka.authors.normalize_author_name`).
+
+        Returns:
+            tuple or None: The `(id, name)` of the author as stored, or None if the
+                snapshot has no author with that name.
+        """
+        key = name.lower()
+        order = self.author_name_order
+        index = bisect_left(
+            order, key, key=lambda position: self._name(self.author_names, self.author_name_offsets, position).lower(),
+        )
+        if index == len(order):
+            return None
+        position = order[index]
+        stored = self._name(self.author_names, self.author_name_offsets, position)
+        return (self.author_ids[position], stored) if stored.lower() == key else None
+
+    def genre_name(self, pk):
+        """
+        Returns the name of a genre.
+
+        Args:
+            pk (int): The genre id.
+
+        Returns:
+            str or None: The name, or None if the genre is not in the snapshot.
+        """
+        index = self._find(self.genre_ids, pk)
+        return None if index is None else self._name(self.genre_names, self.genre_name_offsets, index)
+
+    def genre_choices(self):
+        """
+        Returns the `(id, name)` pairs of all genres, ordered by id.
+
+        Returns:
+            list: The genre choices, as `biblioteka.genres.get_genre_choices` returns them.
+        """
+        return [
+            (pk, self._name(self.genre_names, self.genre_name_offsets, index))
+            for index, pk in enumerate(self.genre_ids.tolist())
+        ]
+
+    def title_author(self, pk):
+        """
+        Returns the author id of a title.
+
+        Args:
+            pk (int): The title id.
+
+        Returns:
+            int or None: The author id, or None if the title is not in the snapshot.
+        """
+        index = self._find(self.title_ids, pk)
+        return None if index is None else self.title_authors[index]
+
+    def title_genres(self, pk):
+        """
+        Returns the genre ids of a title.
+
+        Args:
+            pk (int): The title id.
+
+        Returns:
+            list or None: The genre ids in ascending order, or None if the title is
+                not in the snapshot.
+        """
+        index = self._find(self.title_ids, pk)
+        if index is None:
+            return None
+        offsets = self.title_genre_offsets
+        return self.title_genre_ids[offsets[index]:offsets[index + 1]].tolist()
+
+    def close(self):
+        """
+        Releases the arrays and unmaps the file.
+        """
+        for name in SECTIONS:
+            getattr(self, name).release()
+        self._buffer.close()
+
+
+def _names(rows):
+    # The UTF-8 blob of the names and the offsets of each name in it.
+    offsets, blob = array('q', [0]), bytearray()
+    for _, name in rows:
+        blob += name.encode()
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def _database_name(using):
+    return str(connections[using].settings_dict['NAME']).encode()[:64]
+
+
+def _read_catalogue(using):
+    connection = connections[using]
+    isolate = not connection.in_atomic_block
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if isolate:
+            # Every table is read from the same snapshot of the database as the version.
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        version = CatalogueVersion.objects.using(using).filter(name=TITLES).values_list('version', flat=True).first()
+        cursor.execute(f"SELECT id, name FROM {Author._meta.db_table} ORDER BY id")
+        authors = cursor.fetchall()
+        cursor.execute(f"SELECT id, name FROM {Genre._meta.db_table} ORDER BY id")
+        genres = cursor.fetchall()
+        cursor.execute(f"SELECT id, author_id FROM {Title._meta.db_table} ORDER BY id")
+        titles = cursor.fetchall()
+        cursor.execute(f"SELECT title_id, genre_id FROM {Title.genre.through._meta.db_table} ORDER BY title_id, genre_id")
+        links = cursor.fetchall()
+    return version or 0, authors, genres, titles, links
+
+
+def _sections(authors, genres, titles, links):
+    author_name_offsets, author_names = _names(authors)
+    genre_name_offsets, genre_names = _names(genres)
+    order = sorted(range(len(authors)), key=lambda index: (authors[index][1].lower(), authors[index][0]))
+    counts = Counter(title_id for title_id, _ in links)
+    title_genre_offsets, total = array('q', [0]), 0
+    for pk, _ in titles:
+        total += counts[pk]
+        title_genre_offsets.append(total)
+    return {
+        'author_ids': array('q', (pk for pk, _ in authors)),
+        'author_name_offsets': author_name_offsets,
+        'author_name_order': array('q', order),
+        'genre_ids': array('q', (pk for pk, _ in genres)),
+        'genre_name_offsets': genre_name_offsets,
+        'title_ids': array('q', (pk for pk, _ in titles)),
+        'title_authors': array('q', (author_id for _, author_id in titles)),
+        'title_genre_offsets': title_genre_offsets,
+        'title_genre_ids': array('q', (genre_id for _, genre_id in links)),
+        'author_names': author_names,
+        'genre_names': genre_names,
+    }
+
+
+def build_snapshot(path=None, using=DEFAULT_DB_ALIAS):
+    """
+    Writes a snapshot of the current catalogue, replacing the previous one atomically.
+
+    Args:
+        path (str, optional): Where to write the snapshot. Defaults to
+            `CATALOGUE_SNAPSHOT_PATH`.
+        using (str, optional): The database alias to read from.
+
+    Returns:
+        CatalogueSnapshot: The new snapshot, mapped from the written file.
+
+    Raises:
+        ImproperlyConfigured: If no path is given and `CATALOGUE_SNAPSHOT_PATH` is empty.
+    """
+    path = path or settings.CATALOGUE_SNAPSHOT_PATH
+    if not path:
+        raise ImproperlyConfigured("Set CATALOGUE_SNAPSHOT_PATH or pass the path of the snapshot.")
+    version, *rows = _read_catalogue(using)
+    sections = _sections(*rows)
+    database = _database_name(using)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, version, int(time.time() * 1e6), database,
+        *(len(sections[name]) for name in SECTIONS),
+    )
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.catalogue-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            for name in SECTIONS:
+                data = sections[name]
+                f.write(data)
+                size = len(data) if name in _BLOBS else len(data) * 8
+                f.write(b'\0' * (-size % 8))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    recheck_snapshot()
+    return open_snapshot(path)
+
+
+def open_snapshot(path):
+    """
+    Maps a snapshot file into memory.
+
+    Args:
+        path (str): The snapshot file.
+
+    Returns:
+        CatalogueSnapshot: The mapped snapshot.
+
+    Raises:
+        OSError: If the file cannot be read.
+        SnapshotError: If the file is not a complete snapshot.
+    """
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotError("The snapshot file is empty.")
+    try:
+        return CatalogueSnapshot(buffer)
+    except SnapshotError:
+        buffer.close()
+        raise
+
+
+def is_current(snapshot, using=DEFAULT_DB_ALIAS):
+    """
+    Tells whether a snapshot was built from the current version of a database.
+
+    Args:
+        snapshot (CatalogueSnapshot): The snapshot.
+        using (str, optional): The database alias to compare it with.
+
+    Returns:
+        bool: True if the snapshot was read from this database at its current
+            title collection version.
+    """
+    if snapshot.database != _database_name(using).decode(errors='ignore'):
+        return False
+    version = CatalogueVersion.objects.using(using).filter(name=TITLES).values_list('version', flat=True).first()
+    return snapshot.version == (version or 0)
+
+
+def _refresh(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        _state.update(snapshot=None, file=None, current=False)
+        return
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if identity != _state['file']:
+        # A snapshot replaced here is not closed: other threads may still be reading
+        # it, and the mapping is released with its last reference.
+        try:
+            snapshot = open_snapshot(path)
+        except (OSError, SnapshotError):
+            snapshot = None
+        _state.update(snapshot=snapshot, file=identity)
+    snapshot = _state['snapshot']
+    # Compared with the primary, which the snapshot is built from.
+    _state['current'] = snapshot is not None and is_current(snapshot)
+
+
+def get_snapshot(recheck=False):
+    """
+    Returns this process's catalogue snapshot, if it matches the database.
+
+    The snapshot file and the catalogue version are checked at most every
+    `CATALOGUE_SNAPSHOT_CHECK_INTERVAL` seconds; in between, the result of the last
+    check is reused and the call costs no query.
+
+    Args:
+        recheck (bool, optional): Check the file and the version now, whenever the
+            last check was.
+
+    Returns:
+        CatalogueSnapshot or None: The snapshot, or None if `CATALOGUE_SNAPSHOT_PATH`
+            is empty or the snapshot is missing, unreadable or stale.
+    """
+    path = settings.CATALOGUE_SNAPSHOT_PATH
+    if not path:
+        return None
+    if recheck or time.monotonic() >= _state['next_check']:
+        with _lock:
+            now = time.monotonic()
+            if recheck or now >= _state['next_check']:
+                _refresh(path)
+                _state['next_check'] = now + settings.CATALOGUE_SNAPSHOT_CHECK_INTERVAL
+    return _state['snapshot'] if _state['current'] else None
+
+
+def recheck_snapshot():
+    """
+    Makes the next `get_snapshot` call check the file and the catalogue version again.
+
+    Called after this process changes the catalogue, so that it stops using a
+    snapshot made stale by its own change without waiting for the check interval.
+    """
+    _state['next_check'] = 0.0
+
+
+def forget_snapshot():
+    """
+    Drops this process's snapshot, so that the next `get_snapshot` call maps the file again.
+    """
+    with _lock:
+        _state.update(snapshot=None, file=None, current=False, next_check=0.0)
@@ -0,0 +1,150 @@
+"""
+Materialized catalogue statistics for the library application.
+
+Every `Author` and `Genre` stores in `title_count` the number of its titles, so that
+dashboards, the genre facets of the title list and the statistics endpoint read a
+column instead of counting over the title and title-genre tables.
+
+The counters are maintained incrementally, in the same transaction as the change:
+
+    - `biblioteka.signals` adjusts them when a title is created, moved to another
+      author or deleted, and when genres are added to or removed from titles,
+      which covers the add, edit and delete views and the Django admin;
+    - set-based loaders that bypass signals, such as the `import_titles` and
+      `seed_catalogue` commands, call `count_titles` for the titles they create.
+
+Counter updates are relative (`title_count = title_count + n`), so concurrent
+changes do not overwrite each other. `rebuild_stats` recomputes every counter
+from scratch and `check_stats` lists the counters that disagree with the data;
+both are available through the `rebuild_stats` management command.
+
+Constants:
+    - `COUNTED_MODELS`: The models holding a `title_count` counter.
+
+Functions:
+    - `adjust_title_counts`: Adds deltas to the counters of some authors or genres.
+    - `count_titles`: Adds or removes titles from the counters of their authors and genres.
+    - `counter_queries`: Returns, per model, the SQL computing the true counts.
+    - `rebuild_stats`: Recomputes every counter.
+    - `check_stats`: Returns the counters that disagree with the data.
+"""
+
+from collections import Counter
+
+from django.db import connection
+
+from .models import Author, Genre, Title
+
+COUNTED_MODELS = (Author, Genre)
+
+
+def adjust_title_counts(model, deltas):
+    """
+    Adds deltas to the `title_count` of some authors or genres in one statement.
+
+    Args:
+        model (type): `Author` or `Genre`.
+        deltas (dict): The change of the count for each primary key. Zero deltas
+            are skipped.
+    """
+    deltas = {pk: delta for pk, delta in Counter(deltas).items() if pk is not None and delta}
+    if not deltas:
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS c SET title_count = c.title_count + d.delta "
+            f"FROM unnest(%s::bigint[], %s::integer[]) AS d (id, delta) WHERE c.id = d.id",
+            [list(deltas), list(deltas.values())],
+        )
+
+
+def count_titles(title_ids, sign=1):
+    """
+    Adds existing titles to, or removes them from, the counters of their authors and genres.
+
+    Each model is updated with one grouped statement, so loaders can call this once
+    per batch. Call it after inserting titles and their genres, or before deleting
+    them.
+
+    Args:
+        title_ids (list): The primary keys of the titles.
+        sign (int, optional): 1 to add the titles, -1 to remove them.
+    """
+    if not title_ids:
+        return
+    links = Title.genre.through._meta.db_table
+    sources = {
+        Author: f"SELECT author_id AS id, count(*) AS n FROM {Title._meta.db_table} "
+                f"WHERE id = ANY(%s) GROUP BY author_id",
+        Genre: f"SELECT genre_id AS id, count(*) AS n FROM {links} "
+               f"WHERE title_id = ANY(%s) GROUP BY genre_id",
+    }
+    with connection.cursor() as cursor:
+        for model, source in sources.items():
+            table = connection.ops.quote_name(model._meta.db_table)
+            cursor.execute(
+                f"UPDATE {table} AS c SET title_count = c.title_count + %s * d.n "
+                f"FROM ({source}) AS d WHERE c.id = d.id",
+                [sign, list(title_ids)],
+            )
+
+
+def counter_queries():
+    """
+    Returns, for each counted model, the SQL computing the true title count of every row.
+
+    Returns:
+        dict: A `SELECT id, n` statement for `Author` and for `Genre`.
+    """
+    links = Title.genre.through._meta.db_table
+    return {
+        Author: f"SELECT a.id, count(t.id) AS n FROM {Author._meta.db_table} a "
+                f"LEFT JOIN {Title._meta.db_table} t ON t.author_id = a.id GROUP BY a.id",
+        Genre: f"SELECT g.id, count(l.title_id) AS n FROM {Genre._meta.db_table} g "
+               f"LEFT JOIN {links} l ON l.genre_id = g.id GROUP BY g.id",
+    }
+
+
+def rebuild_stats():
+    """
+    Recomputes every `title_count` from the title and title-genre tables.
+
+    Only rows whose counter is wrong are written.
+
+    Returns:
+        dict: The number of corrected rows for each model name.
+    """
+    corrected = {}
+    with connection.cursor() as cursor:
+        for model, query in counter_queries().items():
+            table = connection.ops.quote_name(model._meta.db_table)
+            cursor.execute(
+                f"UPDATE {table} AS c SET title_count = d.n FROM ({query}) AS d "
+                f"WHERE c.id = d.id AND c.title_count <> d.n"
+            )
+            corrected[model.__name__] = cursor.rowcount
+    return corrected
+
+
+def check_stats(limit=None):
+    """
+    Returns the counters that disagree with the title and title-genre tables.
+
+    Args:
+        limit (int, optional): The largest number of disagreements to return per model.
+
+    Returns:
+        list: `(model name, id, stored count, true count)` tuples, ordered by model and id.
+    """
+    mismatches = []
+    with connection.cursor() as cursor:
+        for model, query in counter_queries().items():
+            table = connection.ops.quote_name(model._meta.db_table)
+            cursor.execute(
+                f"SELECT c.id, c.title_count, d.n FROM {table} c JOIN ({query}) AS d ON d.id = c.id "
+                f"WHERE c.title_count <> d.n ORDER BY c.id" + (" LIMIT %s" if limit else ""),
+                [limit] if limit else [],
+            )
+            mismatches += [(model.__name__, *row) for row in cursor.fetchall()]
+    return mismatches
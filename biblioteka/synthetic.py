@@ -0,0 +1,226 @@
+"""
+Synthetic catalogue generation for load testing and benchmarks.
+
+`CatalogueGenerator` produces a reproducible catalogue of any size whose shape is
+close to a real library's: a few prolific authors write most titles while the long
+tail writes one or two (authors are drawn from a Zipf distribution), titles have one
+to several genres with popular genres far more common, and descriptions vary in
+length, with some missing.
+
+Rows are written with `biblioteka.bulk.load_titles` (`COPY` for titles and genre
+links), in batches of one transaction each, so a million titles load in
+minutes rather than hours.
+
+Classes:
+    - `CatalogueGenerator`: Generates and loads a synthetic catalogue.
+
+Functions:
+    - `zipf_weights`: Returns cumulative Zipf weights for random sampling.
+    - `clear_catalogue`: Deletes every title, author and genre.
+"""
+
+import itertools
+import random
+
+from django.db import connection, transaction
+
+from .authors import author_cache
+from .bulk import load_titles
+from .changes import reset_change_log
+from .genres import invalidate_genre_choices
+from .models import Author, Genre, Title
+from .pagecache import detail_page_cache
+from .versions import bump_catalogue_version
+
+FIRST_NAMES = [
+    'Adam', 'Agata', 'Aleksander', 'Alicja', 'Anna', 'Barbara', 'Bartosz', 'Celina', 'Dawid',
+    'Dorota', 'Edward', 'Ewa', 'Filip', 'Grazyna', 'Henryk', 'Irena', 'Jakub', 'Jan', 'Joanna',
+    'Julia', 'Kamil', 'Katarzyna', 'Krzysztof', 'Lena', 'Marek', 'Maria', 'Michal', 'Natalia',
+    'Olga', 'Pawel', 'Piotr', 'Renata', 'Stanislaw', 'Tomasz', 'Urszula', 'Wiktor', 'Zofia',
+]
+
+LAST_NAMES = [
+    'Nowak', 'Kowalski', 'Wisniewski', 'Wojcik', 'Kowalczyk', 'Kaminski', 'Lewandowski',
+    'Zielinski', 'Szymanski', 'Wozniak', 'Dabrowski', 'Kozlowski', 'Jankowski', 'Mazur',
+    'Kwiatkowski', 'Krawczyk', 'Piotrowski', 'Grabowski', 'Nowakowski', 'Pawlowski', 'Michalski',
+    'Nowicki', 'Adamczyk', 'Dudek', 'Zajac', 'Wieczorek', 'Jablonski', 'Krol', 'Majewski',
+    'Olszewski', 'Jaworski', 'Wrobel', 'Malinowski', 'Pawlak', 'Witkowski', 'Walczak', 'Stepien',
+]
+
+GENRE_NAMES = [
+    'Fantasy', 'Science Fiction', 'Kryminal', 'Thriller', 'Romans', 'Horror', 'Biografia',
+    'Historia', 'Poezja', 'Dramat', 'Przygodowa', 'Reportaz', 'Poradnik', 'Filozofia',
+    'Dla dzieci', 'Mlodziezowa', 'Komiks', 'Satyra', 'Esej', 'Popularnonaukowa',
+]
+
+WORDS = (
+    'ksiega cien miasto noc zloto wiatr rzeka krol smok las dom gwiazda pamiec droga ogien '
+    'morze wojna milosc tajemnica zamek sen czas swiat granica lustro ziemia niebo kamien '
+    'serce krew wyspa most pustynia burza glos sekret korona miecz klucz ostatni dawny '
+    'ukryty zapomniany czerwony czarny bialy zimny dziki cichy wielki maly stary nowy'
+).split()
+
+
+def zipf_weights(count, exponent):
+    """
+    Returns cumulative weights of a Zipf distribution over `count` ranks.
+
+    Args:
+        count (int): The number of ranks.
+        exponent (float): The Zipf exponent; larger values give a steeper skew.
+
+    Returns:
+        list: Cumulative weights, for `random.Random.choices(cum_weights=...)`.
+    """
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def clear_catalogue():
+    """
+    Deletes every title, author and genre and restarts their id sequences.
+
+    The change log is emptied too and its cursors expired, so that sync clients
+    resynchronize. The ids are reused by the next titles, authors and genres, so
+    the data cached under the old ids is dropped as well: the cached pages of the
+    deleted titles, the author cache of this process and the genre choices.
+
+    Deferred foreign key checks are run first: PostgreSQL refuses to truncate a
+    table with pending trigger events, as after inserts in the same transaction.
+    """
+    tables = [
+        Title.genre.through._meta.db_table, Title._meta.db_table,
+        Author._meta.db_table, Genre._meta.db_table,
+    ]
+    detail_page_cache.invalidate(Title.objects.values_list('pk', flat=True))
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            f"TRUNCATE {', '.join(connection.ops.quote_name(table) for table in tables)} "
+            f"RESTART IDENTITY CASCADE"
+        )
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+    reset_change_log()
+    bump_catalogue_version()
+    author_cache.clear()
+    transaction.on_commit(author_cache.clear)
+    invalidate_genre_choices()
+
+
+class CatalogueGenerator:
+    """
+    Generates a reproducible synthetic catalogue.
+
+    The same seed always produces the same authors, genres and titles, so runs at
+    different sizes or on different machines can be compared.
+
+    Attributes:
+        authors (int): The number of distinct authors.
+        genres (int): The number of distinct genres.
+        max_genres (int): The largest number of genres of one title.
+        exponent (float): The Zipf exponent of the author and genre distributions.
+        seed (int): The random seed.
+    """
+
+    def __init__(self, authors, genres, max_genres=3, exponent=1.1, seed=0):
+        self.authors = authors
+        self.genres = genres
+        self.max_genres = min(max_genres, genres)
+        self.exponent = exponent
+        self.seed = seed
+        self.author_weights = zipf_weights(authors, exponent)
+        self.genre_weights = zipf_weights(genres, exponent)
+
+    @staticmethod
+    def author_name(index):
+        """
+        Returns the name of the author with the given index.
+
+        Args:
+            index (int): The author index, from 0.
+
+        Returns:
+            str: A name unique to the index.
+        """
+        combinations = len(FIRST_NAMES) * len(LAST_NAMES)
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        suffix = f' {index // combinations + 1}' if index >= combinations else ''
+        return f'{first} {last}{suffix}'
+
+    @staticmethod
+    def genre_name(index):
+        """
+        Returns the name of the genre with the given index.
+
+        Args:
+            index (int): The genre index, from 0.
+
+        Returns:
+            str: A name unique to the index.
+        """
+        name = GENRE_NAMES[index % len(GENRE_NAMES)]
+        return name if index < len(GENRE_NAMES) else f'{name} {index // len(GENRE_NAMES) + 1}'
+
+    def records(self, start, count):
+        """
+        Yields the titles with indexes `start` to `start + count - 1`.
+
+        Each title is generated from its own seeded random state, so a title's
+        content does not depend on how the catalogue is split into batches or runs.
+
+        Args:
+            start (int): The index of the first title.
+            count (int): The number of titles.
+
+        Yields:
+            dict: A title with `name`, `description`, `author` and `genres` keys.
+        """
+        for index in range(start, start + count):
+            rng = random.Random(f'{self.seed}:{index}')
+            words = rng.sample(WORDS, rng.randint(1, 4))
+            description = None
+            if rng.random() < 0.9:
+                description = ' '.join(rng.choices(WORDS, k=rng.randint(10, 120))).capitalize() + '.'
+            author = rng.choices(range(self.authors), cum_weights=self.author_weights)[0]
+            genres = set(rng.choices(
+                range(self.genres), cum_weights=self.genre_weights, k=rng.randint(1, self.max_genres)
+            ))
+            yield {
+                'name': ' '.join(words).capitalize(),
+                'description': description,
+                'author': self.author_name(author),
+                'genres': sorted(self.genre_name(genre) for genre in genres),
+            }
+
+    def load(self, start, count, batch_size=10000, progress=None):
+        """
+        Generates titles and loads them into the database in batches.
+
+        Args:
+            start (int): The index of the first title; use the current title count to
+                grow an existing synthetic catalogue.
+            count (int): The number of titles to load.
+            batch_size (int, optional): The number of titles per transaction.
+            progress (callable, optional): Called with the number of titles loaded so
+                far after every batch.
+        """
+        genre_ids = {}
+        loaded = 0
+        while loaded < count:
+            size = min(batch_size, count - loaded)
+            batch = list(self.records(start + loaded, size))
+            with transaction.atomic():
+                self.load_batch(batch, genre_ids)
+            loaded += size
+            if progress is not None:
+                progress(loaded)
+
+    def load_batch(self, batch, genre_ids):
+        """
+        Loads one batch of generated titles inside the caller's transaction.
+
+        Args:
+            batch (list): Titles produced by `records`.
+            genre_ids (dict): Genre ids by name resolved by earlier batches. Updated in place.
+        """
+        load_titles(batch, genre_ids)
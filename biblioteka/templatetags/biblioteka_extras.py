@@ -0,0 +1,38 @@
+"""
+Template tags and filters for the library application.
+
+Filters:
+    - `highlight`: Renders a search snippet with matched words wrapped in `<mark>`.
+
+Tags:
+    - `title_rows`: Renders the rows of the title list, from the row fragment cache.
+"""
+
+from django import template
+
+from ..fragments import ROW_TEMPLATE, render_title_rows
+from ..search import highlight_snippet
+
+register = template.Library()
+
+register.filter('highlight', highlight_snippet)
+
+
+@register.simple_tag(takes_context=True)
+def title_rows(context, titles, query=''):
+    """
+    Renders the rows of the title list with `render_title_rows`.
+
+    The row template is taken from the engine rendering the page, whose cached
+    loader compiles it once per process.
+
+    Args:
+        context (Context): The context of the page.
+        titles (iterable): The titles to list.
+        query (str, optional): The search text, for search results.
+
+    Returns:
+        SafeString: The rendered rows.
+    """
+    row_template = context.template.engine.get_template(ROW_TEMPLATE)
+    return render_title_rows(row_template, titles, query)
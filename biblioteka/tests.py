@@ -12,59 +12,1199 @@ Fixtures:
 
 Tests:
     - `test_title_list_view_get`
+    - `test_title_list_view_pagination`
+    - `test_title_list_view_invalid_cursor`
     - `test_title_detail_view_get`
+    - `test_title_list_and_detail_query_counts`
+    - `test_query_budget_exceeded`
+    - `test_query_budget_counts_replica_queries`
+    - `test_title_detail_view_cached`
+    - `test_detail_page_cache_single_flight`
+    - `test_title_detail_view_conditional_get`
+    - `test_title_list_view_conditional_get`
+    - `test_title_list_view_search`
+    - `test_title_list_view_genre_filter`
+    - `test_title_list_view_excerpts`
+    - `test_title_list_view_row_cache`
+    - `test_title_search_view`
+    - `test_author_autocomplete_view`
+    - `test_title_export_view`
+    - `test_title_export_view_gzip`
+    - `test_api_title_list_view`
+    - `test_api_title_detail_view`
+    - `test_api_title_batch_view`
+    - `test_similar_titles_view`
+    - `test_similar_titles_page_validators`
+    - `test_async_views`
+    - `test_async_view_query_budget_exceeded`
+    - `test_database_stats_view`
+    - `test_replica_routing`
+    - `test_performance_middleware`
+    - `test_latency_histogram`
+    - `test_catalogue_stats_maintained`
+    - `test_rebuild_stats_command`
+    - `test_title_change_feed`
+    - `test_title_change_log_pruning`
+    - `test_title_changes_command`
+    - `test_bulk_edit_view`
+    - `test_bulk_edit_titles_command`
     - `test_add_title_view_get`
     - `test_add_title_view_post`
+    - `test_title_form_genre_choices_cached`
+    - `test_genre_choices_other_process`
+    - `test_add_title_view_post_reuses_author`
+    - `test_resolve_author_stale_cache`
+    - `test_author_merge_migration`
     - `test_edit_title_view_get`
     - `test_edit_title_view_post`
     - `test_delete_title_view`
+    - `test_import_titles_command`
+    - `test_import_titles_command_resumes`
+    - `test_export_titles_command_round_trip`
+    - `test_seed_catalogue_command`
+    - `test_clear_catalogue`
+    - `test_backfill_excerpts_command`
+    - `test_rebuild_similar_titles_command`
+    - `test_catalogue_snapshot`
+    - `test_build_catalogue_snapshot_command`
+    - `test_benchmark_catalogue_command`
+    - `test_benchmark_templates_command`
+    - `test_view_query_plans`
 """
+import gzip
+import importlib
+import json
+import random
+import threading
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import Title, Author, Genre
+from django.utils import timezone
+from . import urls
+from .async_views import AsyncTitleListView
+from .authors import FIND_AUTHOR, INSERT_AUTHOR, LOCK_AUTHOR, resolve_author
+from . import genres
+from .genres import get_genre_choices
+from .changes import compact_changes, purge_changes
+from .excerpts import EXCERPT_WORDS
+from .fragments import row_key
+from .models import Title, Author, Genre, ImportJob, SimilarTitle, TitleChange
+from .pagecache import detail_page_cache
+from .metrics import Histogram, registry
+from .search import match_titles
+from .similar import rebuild_similar_titles, update_similar_titles
+from .snapshot import SnapshotError, get_snapshot, open_snapshot
+from .benchmarks import REQUESTS
+from .bulk_edit import reassign_author, select_titles
+from .querybudget import QueryBudgetExceeded
+from .queryplans import (
+    PLAN_CATALOGUE, SEQ_SCAN_THRESHOLD, PlanSample, changed_fingerprints, explain_views, load_fingerprints,
+    seed_plan_catalogue,
+)
+from .replicas import STICKY_COOKIE, ReplicaMiddleware
+from .stats import check_stats
+from .synthetic import CatalogueGenerator, clear_catalogue
+from .views import TitleListView
+
+@pytest.mark.django_db
+def test_title_list_view_get(client, setup_books):
+    """
+    Test the GET request for the title list view.
+
+    Ensures that the view returns a 200 status code and that all books
+    and their authors are present in the response content.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    url = reverse('title_list')
+    response = client.get(url)
+
+    assert response.status_code == 200
+
+    for book in setup_books:
+        assert book.name in response.content.decode()
+        assert book.author.name in response.content.decode()
+
+@pytest.mark.django_db
+def test_title_list_view_pagination(client, setup_books, settings):
+    """
+    Test keyset pagination of the title list view.
+
+    Ensures that with a page size of one, the first page shows the first title
+    by name with a link to the next page, and that following the `after` and
+    `before` cursors moves forwards and backwards through the list.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        settings: pytest-django fixture for overriding settings.
+    """
+    settings.TITLE_LIST_PAGE_SIZE = 1
+    url = reverse('title_list')
+
+    response = client.get(url)
+    page = response.context['page']
+    assert [title.name for title in page] == ['Harry Drukarka']
+    assert page.has_next and not page.has_previous
+
+    response = client.get(url, {'after': page.next_cursor})
+    page = response.context['page']
+    assert [title.name for title in page] == ['Harry Plotter']
+    assert page.has_previous and not page.has_next
+
+    response = client.get(url, {'before': page.previous_cursor})
+    page = response.context['page']
+    assert [title.name for title in page] == ['Harry Drukarka']
+    assert not page.has_previous
+
+@pytest.mark.django_db
+def test_title_list_view_invalid_cursor(client):
+    """
+    Test the title list view with a malformed cursor.
+
+    Ensures that the view answers with a 400 status code instead of failing.
+
+    Args:
+        client: Django's test client.
+    """
+    response = client.get(reverse('title_list'), {'after': 'not-a-cursor'})
+    assert response.status_code == 400
+
+@pytest.mark.django_db
+def test_title_detail_view_get(client, setup_books):
+    """
+    Test the GET request for the title detail view.
+
+    Ensures that the view returns a 200 status code and displays
+    the book's name, author, and genres in the response content.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    book = setup_books[0]
+    url = reverse('title_detail', args=[book.id])
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert book.name in response.content.decode()
+    assert book.author.name in response.content.decode()
+    for genre in book.genre.all():
+        assert genre.name in response.content.decode()
+
+@pytest.mark.django_db
+def test_title_list_and_detail_query_counts(client, setup_books, django_assert_num_queries):
+    """
+    Test that the list and detail views do not issue a query per related object.
+
+    Ensures that the list view loads titles with their authors in a single query
+    (after reading the catalogue version and counting the genre facets) regardless
+    of the number of titles, and that the detail view needs only one extra query
+    for the genres and one indexed lookup of its similar titles.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        django_assert_num_queries: pytest-django fixture counting executed queries.
+    """
+    author = Author.objects.create(name='Andrzej Sapkowski')
+    Title.objects.bulk_create(Title(name=f"Saga {i}", author=author) for i in range(10))
+
+    with django_assert_num_queries(3):
+        client.get(reverse('title_list'))
+    with django_assert_num_queries(4):
+        client.get(reverse('title_detail', args=[setup_books[0].id]))
+
+@pytest.mark.django_db
+def test_query_budget_exceeded(client, setup_books, settings, monkeypatch):
+    """
+    Test that a view exceeding its declared query budget is reported.
+
+    Ensures that `QueryBudgetMiddleware` raises `QueryBudgetExceeded` in strict mode.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        settings: pytest-django fixture for overriding settings.
+        monkeypatch: pytest fixture for patching attributes.
+    """
+    settings.QUERY_BUDGET_STRICT = True
+    monkeypatch.setattr(TitleListView, 'query_budget', 0)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(reverse('title_list'))
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'test_replica'])
+def test_query_budget_counts_replica_queries(client, setup_books, settings, monkeypatch):
+    """
+    Test that queries routed to a read replica are counted against the budget.
+
+    The `test_replica` alias mirrors the test database and stands in for a replica.
+    Reads inside a transaction stay on the primary, so the test does not run in one.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        settings: pytest-django fixture for overriding settings.
+        monkeypatch: pytest fixture for patching attributes.
+    """
+    settings.DATABASE_REPLICAS = ['test_replica']
+    settings.QUERY_BUDGET_STRICT = True
+    monkeypatch.setattr(TitleListView, 'query_budget', 0)
+    with CaptureQueriesContext(connection) as primary, pytest.raises(QueryBudgetExceeded) as exceeded:
+        client.get(reverse('title_list'))
+    assert len(primary) == 0
+    assert exceeded.value.queries
+
+@pytest.mark.django_db
+def test_title_detail_view_cached(client, setup_books, setup_genres, django_assert_num_queries):
+    """
+    Test that the detail page is cached and invalidated when its data changes.
+
+    Ensures that a repeated request is served from the cache, needing only the
+    `updated_at` lookup, and that renaming the
+    title or its author and changing its genres are reflected on the next request.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        setup_genres: Fixture that provides test genre data.
+        django_assert_num_queries: pytest-django fixture counting executed queries.
+    """
+    book = setup_books[0]
+    url = reverse('title_detail', args=[book.id])
+    client.get(url)
+    with django_assert_num_queries(1):
+        client.get(url)
+
+    book.name = 'Harry Potter'
+    book.save()
+    assert 'Harry Potter' in client.get(url).content.decode()
+
+    book.author.name = 'Robert Galbraith'
+    book.author.save()
+    assert 'Robert Galbraith' in client.get(url).content.decode()
+
+    book.genre.set([setup_genres[0]])
+    content = client.get(url).content.decode()
+    assert 'Adventure' in content and 'Fantasy' not in content
+
+    setup_genres[0].delete()
+    assert 'Adventure' not in client.get(url).content.decode()
+
+def test_detail_page_cache_single_flight():
+    """
+    Test that a request waits for a page another request is already rendering.
+
+    Ensures that while the render lock is held, `get_or_render` returns the page
+    stored by the lock holder instead of rendering it a second time.
+    """
+    version = detail_page_cache.get_version(1)
+    detail_page_cache.cache.add(detail_page_cache.lock_key(1, version), 1)
+    timer = threading.Timer(
+        0.1, detail_page_cache.cache.set, [detail_page_cache.page_key(1, version), b'shared']
+    )
+    timer.start()
+    renders = []
+
+    content = detail_page_cache.get_or_render(1, lambda: renders.append(1) or b'own')
+
+    timer.join()
+    assert content == b'shared'
+    assert renders == []
+
+@pytest.mark.django_db
+def test_title_detail_view_conditional_get(client, setup_books, setup_genres, django_assert_num_queries):
+    """
+    Test conditional GET requests for the detail view.
+
+    Ensures that a request repeating the page's `ETag` or `Last-Modified` gets a 304
+    response after a single query, and that changing the title's genres changes the
+    `ETag`.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        setup_genres: Fixture that provides test genre data.
+        django_assert_num_queries: pytest-django fixture counting executed queries.
+    """
+    book = setup_books[0]
+    url = reverse('title_detail', args=[book.id])
+    response = client.get(url)
+    etag = response.headers['ETag']
+
+    with django_assert_num_queries(1):
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    last_modified = response.headers['Last-Modified']
+    assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+
+    book.genre.add(setup_genres[0])
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+@pytest.mark.django_db
+def test_title_list_view_conditional_get(client, setup_books, django_assert_num_queries):
+    """
+    Test conditional GET requests for the list view.
+
+    Ensures that a request repeating the page's `ETag` gets a 304 response after a
+    single query, that other query strings get other `ETag`s, and that deleting a
+    title changes the `ETag`.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        django_assert_num_queries: pytest-django fixture counting executed queries.
+    """
+    url = reverse('title_list')
+    etag = client.get(url).headers['ETag']
+
+    with django_assert_num_queries(1):
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(url, {'q': 'harry'}).headers['ETag'] != etag
+
+    setup_books[1].delete()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+@pytest.mark.django_db
+def test_title_list_view_search(client, setup_books):
+    """
+    Test the full-text search mode of the title list view.
+
+    Ensures that only titles matching the `q` parameter are listed and that
+    matching words in the description are highlighted.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    book = setup_books[1]
+    book.description = "Young wizard <b>prints</b> spells"
+    book.save()
+
+    response = client.get(reverse('title_list'), {'q': 'wizard'})
+    content = response.content.decode()
+
+    assert response.status_code == 200
+    assert [title.name for title in response.context['titles']] == ['Harry Drukarka']
+    assert '<mark>wizard</mark>' in content
+    assert '<b>' not in content
+
+@pytest.mark.django_db
+def test_title_list_view_genre_filter(client, setup_books, django_assert_num_queries):
+    """
+    Test the genre filter and the genre facet counts of the title list view.
+
+    Ensures that selected genres combine with AND by default and with OR when
+    `match=any`, that the facets count the genres of the whole filtered result set
+    in one query, that counts without a search are cached until the catalogue
+    changes, and that a malformed filter is rejected.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        django_assert_num_queries: pytest-django fixture counting executed queries.
+    """
+    fantasy, adventure = Genre.objects.get(name='Fantasy'), Genre.objects.get(name='Adventure')
+    horror = Genre.objects.create(name='Horror')
+    other = Title.objects.create(name="It", author=Author.objects.create(name='Stephen King'))
+    other.genre.add(horror)
+
+    response = client.get(reverse('title_list'))
+    assert {(facet['name'], facet['count']) for facet in response.context['facets']} == {
+        ('Fantasy', 2), ('Adventure', 1), ('Horror', 1),
+    }
+
+    response = client.get(reverse('title_list'), {'genre': [fantasy.pk, adventure.pk]})
+    assert [title.name for title in response.context['titles']] == ['Harry Plotter']
+    assert {(facet['name'], facet['count'], facet['selected']) for facet in response.context['facets']} == {
+        ('Fantasy', 1, True), ('Adventure', 1, True),
+    }
+
+    response = client.get(reverse('title_list'), {'genre': [adventure.pk, horror.pk], 'match': 'any'})
+    assert [title.name for title in response.context['titles']] == ['Harry Plotter', 'It']
+    horror_facet = next(facet for facet in response.context['facets'] if facet['name'] == 'Horror')
+    assert horror_facet['url'] == f'?genre={adventure.pk}&match=any'
+
+    with django_assert_num_queries(2):
+        client.get(reverse('title_list'), {'genre': [adventure.pk, fantasy.pk], 'after': 'WyJBIiwxXQ'})
+    Title.objects.filter(pk=other.pk).delete()
+    response = client.get(reverse('title_list'), {'genre': [adventure.pk, horror.pk], 'match': 'any'})
+    assert [title.name for title in response.context['titles']] == ['Harry Plotter']
+    assert {facet['name'] for facet in response.context['facets']} == {'Fantasy', 'Adventure'}
+
+    assert client.get(reverse('title_list'), {'genre': 'fantasy'}).status_code == 400
+    assert client.get(reverse('title_list'), {'genre': fantasy.pk, 'match': 'some'}).status_code == 400
+
+@pytest.mark.django_db
+def test_title_list_view_excerpts(client, setup_books):
+    """
+    Test that the title list shows stored excerpts without loading descriptions.
+
+    Ensures that saving a title stores the first words of its description and that
+    the list renders them from a query that does not select the description.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    book = setup_books[0]
+    book.description = ' '.join(f'word{i}' for i in range(EXCERPT_WORDS + 10))
+    book.save()
+    excerpt = ' '.join(f'word{i}' for i in range(EXCERPT_WORDS)) + ' …'
+    assert Title.objects.get(pk=book.pk).excerpt == excerpt
+    assert Title.objects.get(pk=setup_books[1].pk).excerpt == ''
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('title_list'))
+    assert excerpt in response.content.decode()
+    assert 'word25' not in response.content.decode()
+    assert not any('"description"' in query['sql'] for query in queries.captured_queries)
+
+@pytest.mark.django_db
+def test_title_list_view_row_cache(client, setup_books):
+    """
+    Test that title list rows are served from the fragment cache until their title changes.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    book = setup_books[0]
+    content = client.get(reverse('title_list')).content.decode()
+    assert f'href="{reverse("title_detail", args=[book.pk])}"' in content
+    key = row_key(Title.objects.get(pk=book.pk))
+    assert book.name in caches['pages'].get(key)
+
+    caches['pages'].set(key, '<li>cached row</li>')
+    assert '<li>cached row</li>' in client.get(reverse('title_list')).content.decode()
+
+    book.author.name = 'Joanne Rowling'
+    book.author.save()
+    content = client.get(reverse('title_list')).content.decode()
+    assert 'cached row' not in content
+    assert content.count('Joanne Rowling') == 2
+
+@pytest.mark.django_db
+def test_title_search_view(client, setup_books):
+    """
+    Test the JSON search endpoint.
+
+    Ensures that titles are found by author name, that renaming the author
+    refreshes the stored search vectors, and that a blank query returns nothing.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    url = reverse('title_search')
+
+    results = client.get(url, {'q': 'Rowling'}).json()['results']
+    assert {result['name'] for result in results} == {'Harry Plotter', 'Harry Drukarka'}
+
+    author = setup_books[0].author
+    author.name = 'Robert Galbraith'
+    author.save()
+    assert client.get(url, {'q': 'Rowling'}).json()['results'] == []
+    assert len(client.get(url, {'q': 'Galbraith'}).json()['results']) == 2
+
+    assert client.get(url, {'q': '  '}).json()['results'] == []
+
+@pytest.mark.django_db
+def test_author_autocomplete_view(client):
+    """
+    Test the author autocomplete endpoint.
+
+    Ensures that names starting with the typed text come first, that the list is
+    topped up with fuzzy matches, and that a blank query returns nothing.
+
+    Args:
+        client: Django's test client.
+    """
+    for name in ['Rowling', 'Roberts', 'J.K. Rowling', 'Tolkien']:
+        Author.objects.create(name=name)
+    url = reverse('author_autocomplete')
+
+    names = [author['name'] for author in client.get(url, {'q': 'ro'}).json()['results']]
+    assert names == ['Roberts', 'Rowling']
+
+    names = [author['name'] for author in client.get(url, {'q': 'rowl'}).json()['results']]
+    assert names == ['Rowling', 'J.K. Rowling']
+
+    assert client.get(url, {'q': ''}).json()['results'] == []
+
+@pytest.mark.django_db
+def test_title_export_view(client, setup_books):
+    """
+    Test the streaming export view in CSV and JSON Lines formats.
+
+    Ensures that every title is exported with its author and genre names, and that
+    unknown formats are rejected.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    book = setup_books[0]
+    response = client.get(reverse('title_export'))
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Disposition'] == 'attachment; filename="titles.csv"'
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert lines[0] == 'id,name,description,author,genres'
+    assert len(lines) == len(setup_books) + 1
+    assert f'{book.id},{book.name},,{book.author.name},Adventure|Fantasy' in lines
+
+    response = client.get(reverse('title_export'), {'format': 'jsonl'})
+    rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+    assert rows[0] == {
+        'id': book.id, 'name': book.name, 'description': book.description,
+        'author': book.author.name, 'genres': ['Adventure', 'Fantasy'],
+    }
+    assert rows[1]['genres'] == ['Fantasy']
+
+    assert client.get(reverse('title_export'), {'format': 'xml'}).status_code == 400
+
+@pytest.mark.django_db
+def test_title_export_view_gzip(client, setup_books):
+    """
+    Test the gzip-compressed streaming export.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    response = client.get(reverse('title_export'), {'format': 'ndjson', 'gzip': '1'})
+    assert response['Content-Type'] == 'application/gzip'
+    assert response['Content-Disposition'] == 'attachment; filename="titles.ndjson.gz"'
+    lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+    assert [json.loads(line)['name'] for line in lines] == [book.name for book in setup_books]
+
+@pytest.mark.django_db
+def test_api_title_list_view(client, setup_books):
+    """
+    Test the JSON API title list.
+
+    Ensures that titles are paginated by name with cursors, that `fields` selects the
+    returned fields, and that invalid parameters are rejected.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    url = reverse('api_title_list')
+    with CaptureQueriesContext(connection) as queries:
+        data = client.get(url, {'limit': 1}).json()
+    assert len(queries) == 1
+    drukarka, plotter = sorted(setup_books, key=lambda book: book.name)
+    assert data['results'] == [{
+        'id': drukarka.id, 'name': drukarka.name, 'description': None,
+        'author': 'J.K. Rowling', 'genres': ['Fantasy'],
+    }]
+    assert data['previous'] is None
+
+    data = client.get(url, {'limit': 1, 'after': data['next'], 'fields': 'id,genres'}).json()
+    assert data['results'] == [{'id': plotter.id, 'genres': ['Adventure', 'Fantasy']}]
+    assert data['next'] is None
+    assert data['previous'] is not None
+
+    assert client.get(url, {'fields': 'id,secret'}).status_code == 400
+    assert client.get(url, {'limit': 0}).status_code == 400
+
+@pytest.mark.django_db
+def test_api_title_detail_view(client, setup_books):
+    """
+    Test the JSON API title detail.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    book = setup_books[0]
+    response = client.get(reverse('api_title_detail', args=[book.id]), {'fields': 'name,author_id'})
+    assert response['Content-Type'] == 'application/json'
+    assert response.json() == {'name': book.name, 'author_id': book.author_id}
+    assert client.get(reverse('api_title_detail', args=[book.id + 100])).status_code == 404
+
+@pytest.mark.django_db
+def test_api_title_batch_view(client, setup_books):
+    """
+    Test fetching titles by id with the JSON API.
+
+    Ensures that titles are returned in the requested order with a single query and
+    that unknown ids are reported as missing.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    ids = [setup_books[1].id, 0, setup_books[0].id]
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('api_title_batch'), {
+            'ids': ','.join(map(str, ids)), 'fields': 'id,name',
+        })
+    assert len(queries) == 1
+    assert response.json() == {
+        'results': [{'id': book.id, 'name': book.name} for book in reversed(setup_books)],
+        'missing': [0],
+    }
+    assert client.get(reverse('api_title_batch'), {'ids': '1,x'}).status_code == 400
+
+@pytest.mark.django_db
+def test_similar_titles_view(client, setup_books, django_capture_on_commit_callbacks):
+    """
+    Test the similar titles panel, its JSON API and the incremental index updates.
+
+    Ensures that after a rebuild the detail page and `api/titles/<pk>/similar/` list
+    the neighbours by descending similarity, with the same author and rarer shared
+    genres counting most, and that edits and deletions made through the views update
+    the lists of the edited title and of the titles listing it.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        django_capture_on_commit_callbacks: pytest-django fixture running on-commit callbacks.
+    """
+    plotter, drukarka = setup_books
+    fantasy, adventure = Genre.objects.get(name='Fantasy'), Genre.objects.get(name='Adventure')
+    sapkowski = Author.objects.create(name='Andrzej Sapkowski')
+    wiedzmin = Title.objects.create(name='Wiedzmin', author=sapkowski)
+    wiedzmin.genre.set([fantasy, adventure])
+    krew = Title.objects.create(name='Krew elfow', author=sapkowski)
+    krew.genre.set([adventure])
+    lalka = Title.objects.create(name='Lalka', author=Author.objects.create(name='Boleslaw Prus'))
+    rebuild_similar_titles()
+
+    def similar(title):
+        response = client.get(reverse('api_title_similar', args=[title.id]))
+        assert response.status_code == 200
+        return [row['name'] for row in response.json()['results']]
+
+    assert similar(plotter) == ['Harry Drukarka', 'Wiedzmin', 'Krew elfow']
+    assert similar(lalka) == []
+    response = client.get(reverse('api_title_similar', args=[plotter.id]), {'limit': 1})
+    assert [row['id'] for row in response.json()['results']] == [drukarka.id]
+    assert 0 < response.json()['results'][0]['score'] <= 1
+    assert client.get(reverse('api_title_similar', args=[plotter.id]), {'limit': 0}).status_code == 400
+    assert client.get(reverse('api_title_similar', args=[lalka.id + 100])).status_code == 404
+    page = client.get(reverse('title_detail', args=[plotter.id])).content.decode()
+    assert 'Podobne książki' in page
+    assert reverse('title_detail', args=[drukarka.id]) in page
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse('edit_title', args=[krew.id]), {
+            'name': 'Krew elfow', 'author': 'Andrzej Sapkowski', 'genre': [fantasy.id, adventure.id],
+        })
+    assert response.status_code == 302
+    assert similar(krew)[0] == 'Wiedzmin'
+    assert similar(wiedzmin)[0] == 'Krew elfow'
+    assert reverse('title_detail', args=[krew.id]) in client.get(reverse('title_detail', args=[wiedzmin.id])).content.decode()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(reverse('delete_title', args=[wiedzmin.id]))
+    assert 'Wiedzmin' not in similar(krew)
+    assert 'Wiedzmin' not in similar(plotter)
+    assert client.get(reverse('api_title_similar', args=[wiedzmin.id])).status_code == 404
+
+@pytest.mark.django_db
+def test_similar_titles_page_validators(client, setup_books):
+    """
+    Test that detail pages follow changes to the titles they list as similar.
+
+    Ensures that renaming a listed title or its author invalidates the cached pages
+    listing it and changes their entity tags, also when a bulk edit moves it to
+    another author, and that a rebuild changing a neighbour list changes the entity
+    tag of the page.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    plotter, drukarka = setup_books
+    drukarka.author = Author.objects.create(name='Robert Galbraith')
+    drukarka.save()
+    rebuild_similar_titles()
+    url = reverse('title_detail', args=[plotter.id])
+
+    def revalidate(etag):
+        response = client.get(url, headers={'If-None-Match': etag})
+        return response.status_code, response.headers['ETag'], response.content.decode()
+
+    etag = client.get(url).headers['ETag']
+    assert revalidate(etag)[0] == 304
+
+    drukarka.name = 'Harry Drukarz'
+    drukarka.save()
+    status, etag, page = revalidate(etag)
+    assert status == 200
+    assert 'Harry Drukarz' in page
+    assert client.get(url).content.decode() == page
+
+    author = drukarka.author
+    author.name = f'{author.name} Junior'
+    author.save(update_fields=['name'])
+    status, etag, page = revalidate(etag)
+    assert status == 200
+    assert author.name in page
+
+    rowling = plotter.author
+    reassign_author(select_titles(ids=[drukarka.pk]), rowling.pk)
+    status, etag, page = revalidate(etag)
+    assert status == 200
+    assert f'Harry Drukarz</a> - {rowling.name}' in page
+    assert client.get(url).content.decode() == page
+
+    wiedzmin = Title.objects.create(name='Wiedzmin', author=Author.objects.create(name='Andrzej Sapkowski'))
+    wiedzmin.genre.set(plotter.genre.all())
+    assert revalidate(etag)[0] == 304
+    rebuild_similar_titles()
+    status, etag, page = revalidate(etag)
+    assert status == 200
+    assert 'Wiedzmin' in page
+    assert revalidate(etag)[0] == 304
+
+@pytest.mark.django_db
+def test_async_views(async_views, setup_books, monkeypatch):
+    """
+    Test the async variants of the read-only views.
+
+    Ensures that, with `ASYNC_VIEWS` on, the list, detail, search and JSON API views
+    are served by coroutines with the same responses and query counts as their
+    synchronous counterparts, including conditional requests, and that the list view
+    reads and stores its cached rows with the async cache API only.
+
+    Args:
+        async_views: Fixture routing requests to the async views.
+        setup_books: Fixture that provides test book data.
+        monkeypatch: pytest fixture for patching attributes.
+    """
+    client = AsyncClient()
+    get = async_to_sync(client.get)
+    book = setup_books[0]
+
+    def blocking(*args, **kwargs):
+        raise AssertionError("The async list view used the blocking cache API.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(type(caches['pages']), 'get_many', blocking)
+        patch.setattr(type(caches['pages']), 'set_many', blocking)
+        response = get(reverse('title_list'))
+        assert response.resolver_match.func.view_class is AsyncTitleListView
+        assert book.name in response.content.decode()
+        assert caches['pages'].get(row_key(Title.objects.get(pk=book.pk))) is not None
+        caches['pages'].set(row_key(Title.objects.get(pk=book.pk)), '<li>cached row</li>')
+        assert '<li>cached row</li>' in get(reverse('title_list')).content.decode()
+    assert get(reverse('title_list'), headers={'if-none-match': response['ETag']}).status_code == 304
+
+    with CaptureQueriesContext(connection) as queries:
+        response = get(reverse('title_detail', args=[book.id]))
+    assert len(queries) == 4
+    assert book.name in response.content.decode()
+    with CaptureQueriesContext(connection) as queries:
+        assert get(reverse('title_detail', args=[book.id])).content == response.content
+    assert len(queries) == 1
+    assert get(reverse('title_detail', args=[book.id + 100])).status_code == 404
+
+    results = get(reverse('title_search'), {'q': 'plotter'}).json()['results']
+    assert [result['id'] for result in results] == [book.id]
+
+    data = get(reverse('api_title_list'), {'limit': 1, 'fields': 'name'}).json()
+    assert data['results'] == [{'name': 'Harry Drukarka'}]
+    data = get(reverse('api_title_list'), {'after': data['next'], 'fields': 'name'}).json()
+    assert data['results'] == [{'name': 'Harry Plotter'}]
+    assert get(reverse('api_title_detail', args=[book.id]), {'fields': 'id'}).json() == {'id': book.id}
+    data = get(reverse('api_title_batch'), {'ids': f'{book.id},0', 'fields': 'id'}).json()
+    assert data == {'results': [{'id': book.id}], 'missing': [0]}
+
+@pytest.mark.django_db
+def test_async_view_query_budget_exceeded(async_views, setup_books, settings, monkeypatch):
+    """
+    Test that `QueryBudgetMiddleware` counts the queries of async views.
+
+    Args:
+        async_views: Fixture routing requests to the async views.
+        setup_books: Fixture that provides test book data.
+        settings: pytest-django fixture for overriding settings.
+        monkeypatch: pytest fixture for patching attributes.
+    """
+    settings.QUERY_BUDGET_STRICT = True
+    monkeypatch.setattr(AsyncTitleListView, 'query_budget', 1)
+    with pytest.raises(QueryBudgetExceeded):
+        async_to_sync(AsyncClient().get)(reverse('title_list'))
+
+@pytest.mark.django_db
+def test_database_stats_view(client, settings):
+    """
+    Test the database connection statistics endpoint and the statement timeout.
+
+    Ensures that the configured statement timeout is applied to connections and that
+    the endpoint reports the connection mode of the worker.
+
+    Args:
+        client: Django's test client.
+        settings: pytest-django fixture for overriding settings.
+    """
+    settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        assert cursor.fetchone()[0] != '0'
+    data = client.get(reverse('database_stats')).json()
+    assert data['alias'] == 'default'
+    assert data['pooled'] is (connection.pool is not None)
+    assert ('in_use' in data) is data['pooled']
+
+def test_replica_routing(rf, settings):
+    """
+    Test read-replica routing and read-your-writes stickiness.
+
+    Ensures that reads of a GET request go to a replica, that a POST reads from the
+    primary and pins the client to it with a cookie, and that reads outside requests
+    and writes always use the primary.
+
+    Args:
+        rf: Django's request factory.
+        settings: pytest-django fixture for overriding settings.
+    """
+    settings.DATABASE_REPLICAS = ['replica1']
+    routed = []
+
+    def view(request):
+        routed.append((router.db_for_read(Title), router.db_for_read(ImportJob), router.db_for_write(Title)))
+        return HttpResponse()
+
+    middleware = ReplicaMiddleware(view)
+    middleware(rf.get('/'))
+    response = middleware(rf.post('/add/'))
+    assert response.cookies[STICKY_COOKIE]['max-age'] == settings.READ_YOUR_WRITES_SECONDS
+    sticky = rf.get('/')
+    sticky.COOKIES[STICKY_COOKIE] = '1'
+    middleware(sticky)
+
+    assert routed == [
+        ('replica1', 'replica1', 'default'),
+        ('default', 'default', 'default'),
+        ('default', 'default', 'default'),
+    ]
+    assert router.db_for_read(Title) == 'default'
 
 @pytest.mark.django_db
-def test_title_list_view_get(client, setup_books):
+def test_performance_middleware(client, settings, setup_books):
     """
-    Test the GET request for the title list view.
+    Test the request instrumentation.
 
-    Ensures that the view returns a 200 status code and that all books
-    and their authors are present in the response content.
+    Ensures that responses carry a `Server-Timing` header with the query count and
+    cache figures of the request, and that the metrics endpoint reports per URL name
+    histograms only to clients sending the metrics token or connecting from an
+    allowed address, none being allowed by default, not even loopback.
 
     Args:
         client: Django's test client.
+        settings: pytest-django fixture for overriding settings.
         setup_books: Fixture that provides test book data.
     """
-    url = reverse('title_list')
-    response = client.get(url)
+    registry.clear()
+    url = reverse('title_detail', args=[setup_books[0].id])
+    timing = client.get(url)['Server-Timing']
+    assert 'desc="4 queries"' in timing
+    assert 'desc="0 hits, 1 misses"' in timing
+    timing = client.get(url)['Server-Timing']
+    assert 'desc="1 queries"' in timing
+    assert 'desc="1 hits, 0 misses"' in timing
+    assert 'tpl;dur=0.00' in timing
 
-    assert response.status_code == 200
+    assert client.get(reverse('metrics')).status_code == 403
+    assert client.get(reverse('database_stats')).status_code == 403
+    settings.METRICS_TOKEN = 'secret'
+    bearer = {'Authorization': 'Bearer secret'}
+    views = client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1', headers=bearer).json()['views']
+    assert views['title_detail']['count'] == 2
+    assert views['title_detail']['queries_mean'] == 2.5
+    assert views['title_detail']['cache_hits'] == 1
+    assert views['title_detail']['latency_ms']['p50'] <= views['title_detail']['latency_ms']['p99']
+    assert client.get(reverse('database_stats'), headers=bearer).status_code == 200
+    assert client.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get(reverse('metrics')).status_code == 403
+    settings.METRICS_ALLOWED_IPS = ['10.0.0.1']
+    assert client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code == 200
+    assert client.get(reverse('database_stats'), REMOTE_ADDR='10.0.0.2').status_code == 403
 
-    for book in setup_books:
-        assert book.name in response.content.decode()
-        assert book.author.name in response.content.decode()
+def test_latency_histogram():
+    """
+    Test the percentile estimates of the fixed-bucket histogram.
+    """
+    histogram = Histogram()
+    assert histogram.percentile(50) == 0
+    for value in range(1, 101):
+        histogram.add(value)
+    assert 50 <= histogram.percentile(50) <= 50 * 1.25
+    assert 95 <= histogram.percentile(95) <= 100
+    assert histogram.percentile(99) == 100
 
 @pytest.mark.django_db
-def test_title_detail_view_get(client, setup_books):
+def test_catalogue_stats_maintained(client, setup_books):
     """
-    Test the GET request for the title detail view.
+    Test that the title counters of authors and genres follow every kind of change.
 
-    Ensures that the view returns a 200 status code and displays
-    the book's name, author, and genres in the response content.
+    Ensures that the counters stay consistent through the add, edit and delete views
+    and through genre changes made from either side of the relation, that a save
+    locks the title row while it reads the previous author, and that the
+    statistics endpoint reports them.
 
     Args:
         client: Django's test client.
         setup_books: Fixture that provides test book data.
     """
-    book = setup_books[0]
-    url = reverse('title_detail', args=[book.id])
-    response = client.get(url)
+    fantasy, adventure = Genre.objects.get(name='Fantasy'), Genre.objects.get(name='Adventure')
+    rowling = Author.objects.get(name='J.K. Rowling')
+    assert (Author.objects.get(pk=rowling.pk).title_count, Genre.objects.get(pk=fantasy.pk).title_count) == (2, 2)
 
-    assert response.status_code == 200
-    assert book.name in response.content.decode()
-    assert book.author.name in response.content.decode()
-    for genre in book.genre.all():
-        assert genre.name in response.content.decode()
+    client.post(reverse('add_title'), {'name': 'Dune', 'author': 'Frank Herbert', 'genre': [adventure.pk]})
+    dune = Title.objects.get(name='Dune')
+    client.post(reverse('edit_title', args=[dune.pk]), {
+        'name': 'Dune', 'author': 'J.K. Rowling', 'genre': [fantasy.pk],
+    })
+    assert check_stats() == []
+    assert Author.objects.get(pk=rowling.pk).title_count == 3
+    dune = Title.objects.get(pk=dune.pk)
+    with CaptureQueriesContext(connection) as captured:
+        dune.save()
+    assert 'FOR NO KEY UPDATE' in captured.captured_queries[0]['sql']
+
+    dune.genre.remove(adventure)
+    dune.genre.add(adventure)
+    adventure.titles.remove(setup_books[0], setup_books[1])
+    fantasy.titles.add(dune)
+    assert check_stats() == []
+    setup_books[0].genre.clear()
+    fantasy.titles.clear()
+    adventure.titles.add(setup_books[1], dune)
+    assert check_stats() == []
+
+    client.post(reverse('delete_title', args=[dune.pk]))
+    Author.objects.filter(name='Frank Herbert').delete()
+    assert check_stats() == []
+
+    response = client.get(reverse('api_catalogue_stats'), {'limit': 1})
+    assert response.json() == {
+        'authors': [{'id': rowling.pk, 'name': 'J.K. Rowling', 'title_count': 2}],
+        'genres': [{'id': adventure.pk, 'name': 'Adventure', 'title_count': 1}],
+    }
+    assert client.get(reverse('api_catalogue_stats'), {'limit': 0}).status_code == 400
+
+@pytest.mark.django_db
+def test_rebuild_stats_command(setup_books):
+    """
+    Test that the statistics command detects and repairs wrong counters.
+
+    Args:
+        setup_books: Fixture that provides test book data.
+    """
+    Author.objects.update(title_count=7)
+    Genre.objects.filter(name='Fantasy').update(title_count=0)
+
+    output = StringIO()
+    with pytest.raises(CommandError):
+        call_command('rebuild_stats', check=True, stdout=output)
+    assert 'title_count is 7, should be 2' in output.getvalue()
+
+    call_command('rebuild_stats', stdout=StringIO())
+    assert check_stats() == []
+    call_command('rebuild_stats', check=True, stdout=StringIO())
+
+def read_feed(client, **params):
+    """
+    Reads every change log entry available after a cursor, one entry per request.
+    """
+    entries, has_more = [], True
+    while has_more:
+        data = client.get(reverse('api_title_changes'), {'limit': 1, **params}).json()
+        entries += data['results']
+        params['after'], has_more = data['next'], data['has_more']
+    return entries, params.get('after')
+
+@pytest.mark.django_db(transaction=True)
+def test_title_change_feed(client, setup_books):
+    """
+    Test that the change feed reports creations, changes and deletions in order.
+
+    Ensures that changes made through the views and genre changes are recorded,
+    that entries carry the current state of their title or a tombstone, and that
+    a client resuming from its cursor only receives newer entries.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    entries, cursor = read_feed(client)
+    assert [(entry['title_id'], entry['action']) for entry in entries] == [
+        (setup_books[0].pk, 'created'), (setup_books[0].pk, 'updated'),
+        (setup_books[1].pk, 'created'), (setup_books[1].pk, 'updated'),
+    ]
+    assert client.get(reverse('api_title_changes'), {'head': ''}).json()['next'] == cursor
+
+    adventure = Genre.objects.get(name='Adventure')
+    client.post(reverse('add_title'), {'name': 'Dune', 'author': 'Frank Herbert', 'genre': [adventure.pk]})
+    dune = Title.objects.get(name='Dune')
+    fantasy = Genre.objects.get(name='Fantasy')
+    client.post(reverse('edit_title', args=[dune.pk]), {
+        'name': 'Dune Messiah', 'author': 'Frank Herbert', 'genre': [fantasy.pk],
+    })
+    adventure.titles.add(setup_books[1])
+    client.post(reverse('delete_title', args=[setup_books[0].pk]))
+
+    entries, cursor = read_feed(client, after=cursor, fields='id,name,genres')
+    assert [(entry['title_id'], entry['action']) for entry in entries] == [
+        (dune.pk, 'created'), *[(dune.pk, 'updated')] * 4,
+        (setup_books[1].pk, 'updated'), (setup_books[0].pk, 'deleted'),
+    ]
+    assert entries[0]['title'] == {'id': dune.pk, 'name': 'Dune Messiah', 'genres': ['Fantasy']}
+    assert entries[-1]['title'] is None
+    assert client.get(reverse('api_title_changes'), {'after': cursor}).json() == {
+        'results': [], 'next': cursor, 'has_more': False,
+    }
+    assert client.get(reverse('api_title_changes'), {'after': 'bogus'}).status_code == 400
+    assert client.get(reverse('api_title_changes'), {'limit': 0}).status_code == 400
+
+@pytest.mark.django_db(transaction=True)
+def test_title_change_log_pruning(client, setup_books):
+    """
+    Test that compaction keeps the latest entry per title and that purged cursors expire.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    _, cursor = read_feed(client)
+    Title.objects.filter(pk=setup_books[1].pk).delete()
+    later = timezone.now() + timedelta(seconds=1)
+
+    assert compact_changes(later) == 3
+    assert sorted(TitleChange.objects.values_list('title_id', 'action')) == [
+        (setup_books[0].pk, 'updated'), (setup_books[1].pk, 'deleted'),
+    ]
+    assert read_feed(client, after=cursor)[0][0]['action'] == 'deleted'
+
+    assert purge_changes(later) == 2
+    response = client.get(reverse('api_title_changes'), {'after': cursor})
+    assert response.status_code == 410
+    assert client.get(reverse('api_title_changes')).json()['results'] == []
+
+    call_command('prune_title_changes', stdout=StringIO())
+
+@pytest.mark.django_db(transaction=True)
+def test_title_changes_command(tmp_path, setup_books):
+    """
+    Test that the change log command writes JSON Lines and resumes from its cursor file.
+
+    Args:
+        tmp_path: Pytest's temporary directory.
+        setup_books: Fixture that provides test book data.
+    """
+    cursor_file, output = tmp_path / 'sync.cursor', tmp_path / 'changes.jsonl'
+    call_command('title_changes', cursor_file=str(cursor_file), output=str(output), batch_size=3, stdout=StringIO())
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [line['action'] for line in lines] == ['created', 'updated', 'created', 'updated']
+    assert lines[0]['title']['name'] == setup_books[0].name
+
+    head = StringIO()
+    call_command('title_changes', head=True, stdout=head)
+    assert cursor_file.read_text() == head.getvalue().strip()
+
+    pk = setup_books[0].pk
+    setup_books[0].delete()
+    call_command('title_changes', cursor_file=str(cursor_file), output=str(output), stdout=StringIO())
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(line['title_id'], line['action'], line['title']) for line in lines] == [(pk, 'deleted', None)]
+
+@pytest.mark.django_db
+def test_bulk_edit_view(client, setup_books):
+    """
+    Test the bulk deletion and bulk edit view.
+
+    Ensures that a GET request, or a POST request with `dry_run` set, only counts the
+    titles an operation would change, that a false or unknown `dry_run` is not taken
+    for a dry run, that each operation changes only the titles it applies to while keeping the
+    counters, search vectors and change log current, and that invalid requests and
+    selections above the limit change nothing.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+    """
+    url = reverse('bulk_edit_titles')
+    fantasy, adventure = Genre.objects.get(name='Fantasy'), Genre.objects.get(name='Adventure')
+    ids = ','.join(str(book.pk) for book in setup_books)
+
+    response = client.get(url, {'operation': 'delete', 'genre': adventure.pk})
+    assert response.json() == {'operation': 'delete', 'matched': 1, 'changed': 1, 'dry_run': True}
+    response = client.post(url, {'operation': 'delete', 'genre': adventure.pk, 'dry_run': 'True'})
+    assert response.json()['dry_run'] is True
+    assert client.post(url, {'operation': 'delete', 'genre': adventure.pk, 'dry_run': 'maybe'}).status_code == 400
+    assert Title.objects.count() == 2
+
+    tolkien = Author.objects.create(name='J.R.R. Tolkien')
+    response = client.post(url, {'operation': 'reassign_author', 'target': tolkien.pk, 'ids': ids, 'dry_run': 'false'})
+    assert response.json()['changed'] == 2
+    assert response.json()['dry_run'] is False
+    assert match_titles('Tolkien').count() == 2
+    assert client.post(url, {'operation': 'add_genre', 'target': adventure.pk, 'ids': ids}).json()['changed'] == 1
+    response = client.post(url, {'operation': 'remove_genre', 'target': fantasy.pk, 'author': tolkien.pk})
+    assert response.json()['changed'] == 2
+    assert check_stats() == []
+    assert list(adventure.titles.order_by('pk')) == setup_books
+    assert not fantasy.titles.exists()
+
+    with override_settings(BULK_EDIT_LIMIT=1):
+        response = client.post(url, {'operation': 'delete', 'genre': adventure.pk})
+    assert response.status_code == 400
+    assert response.json()['limit'] == 1
+    assert client.post(url, {'operation': 'delete'}).status_code == 400
+    assert client.post(url, {'operation': 'add_genre', 'target': 0, 'ids': ids}).status_code == 400
+    assert client.post(url, {'operation': 'rename', 'ids': ids}).status_code == 400
+    assert Title.objects.count() == 2
+
+    response = client.post(url, {'operation': 'delete', 'genre': adventure.pk})
+    assert response.json() == {'operation': 'delete', 'matched': 2, 'changed': 2, 'dry_run': False}
+    assert not Title.objects.exists()
+    assert not Title.genre.through.objects.exists()
+    assert check_stats() == []
+    assert TitleChange.objects.filter(action=TitleChange.DELETED).count() == 2
+
+@pytest.mark.django_db
+def test_bulk_edit_titles_command(tmp_path, setup_books):
+    """
+    Test that the bulk edit command selects titles from an id file and honours the limit.
+
+    Args:
+        tmp_path: Pytest's temporary directory.
+        setup_books: Fixture that provides test book data.
+    """
+    ids_file = tmp_path / 'imported.txt'
+    ids_file.write_text(''.join(f"{book.pk}\n" for book in setup_books))
+
+    output = StringIO()
+    call_command('bulk_edit_titles', 'delete', ids_file=str(ids_file), dry_run=True, stdout=output)
+    assert '2 titles selected, 2 would change' in output.getvalue()
+    with pytest.raises(CommandError, match='more than 1 titles'):
+        call_command('bulk_edit_titles', 'delete', ids_file=str(ids_file), limit=1, stdout=StringIO())
+    assert Title.objects.count() == 2
+
+    call_command('bulk_edit_titles', 'delete', ids_file=str(ids_file), stdout=StringIO())
+    assert not Title.objects.exists()
+    assert check_stats() == []
 
 @pytest.mark.django_db
 def test_add_title_view_get(client, setup_genres):
@@ -120,6 +1260,166 @@ def test_add_title_view_post(client, setup_genres):
     for genre in setup_genres:
         assert genre in book.genre.all()
 
+@pytest.mark.django_db
+def test_title_form_genre_choices_cached(client, setup_genres):
+    """
+    Test that the title forms serve genre choices from the cache.
+
+    Ensures that once the choices are cached, rendering the add form and validating
+    a submission query no genres, that unknown genre ids are rejected, and that
+    adding a genre shows up in the form immediately.
+
+    Args:
+        client: Django's test client.
+        setup_genres: Fixture that provides test genre data.
+    """
+    url = reverse('add_title')
+    client.get(url)
+
+    with CaptureQueriesContext(connection) as captured:
+        client.get(url)
+        response = client.post(url, {'name': 'X', 'author': 'Y', 'genre': [0]})
+    assert not any('biblioteka_genre' in query['sql'] for query in captured.captured_queries)
+    assert response.status_code == 200
+    assert 'genre' in response.context['form'].errors
+
+    Genre.objects.create(name='Horror')
+    assert 'Horror' in client.get(url).content.decode()
+
+@pytest.mark.django_db
+def test_genre_choices_other_process(setup_genres):
+    """
+    Test that genre changes reach a process whose cached choices were not invalidated.
+
+    Another worker process is simulated by restoring the local copy and the default
+    cache entries of this one as they were before a genre was added and one deleted,
+    as if the invalidation had run elsewhere. Once the local copy expires, the new
+    genre is accepted and the deleted one is gone.
+
+    Args:
+        setup_genres: Fixture that provides test genre data.
+    """
+    adventure, fantasy = setup_genres
+    before = [(adventure.pk, 'Adventure'), (fantasy.pk, 'Fantasy')]
+    assert get_genre_choices() == before
+    local, cached = dict(genres._local), dict(caches['default']._cache)
+
+    horror = Genre.objects.create(name='Horror')
+    adventure.delete()
+    genres._local.update(local)
+    caches['default']._cache.update(cached)
+    assert get_genre_choices() == before
+
+    genres._local['expires'] = 0.0
+    assert get_genre_choices() == [(fantasy.pk, 'Fantasy'), (horror.pk, 'Horror')]
+
+@pytest.mark.django_db
+def test_add_title_view_post_reuses_author(client, setup_books, author_cache,
+                                           django_capture_on_commit_callbacks):
+    """
+    Test that adding titles resolves authors without creating duplicates.
+
+    Ensures that an author name differing only in case and whitespace reuses the
+    existing author, and that once the author is cached a submission only checks
+    the cached id instead of upserting the author.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        author_cache: Fixture that provides an empty author cache.
+        django_capture_on_commit_callbacks: pytest-django fixture running on-commit callbacks.
+    """
+    url = reverse('add_title')
+    genre = setup_books[0].genre.first()
+    data = {'name': 'Harry Potter', 'description': '', 'author': '  j.k.   ROWLING ', 'genre': [genre.id]}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(url, data)
+
+    assert response.status_code == 302
+    assert Author.objects.count() == 1
+    assert Title.objects.get(name='Harry Potter').author == setup_books[0].author
+    assert author_cache.get('j.k. rowling') == (setup_books[0].author.id, 'J.K. Rowling')
+
+    with CaptureQueriesContext(connection) as captured:
+        client.post(url, dict(data, name='Harry Potter 2'))
+    author_queries = [
+        query['sql'] for query in captured.captured_queries
+        if 'INSERT INTO biblioteka_author' in query['sql'] or 'FROM biblioteka_author' in query['sql']
+        or '"biblioteka_author"."id"' in query['sql']
+    ]
+    assert author_queries == [LOCK_AUTHOR % setup_books[0].author.id]
+
+@pytest.mark.django_db
+def test_resolve_author_stale_cache(setup_books, author_cache):
+    """
+    Test that cached author ids made stale by another process are not used.
+
+    Ensures that a cached id whose author was deleted, or renamed, since it was
+    cached is dropped from the cache and the name resolved to a current author, and
+    that resolving an existing author does not write its row.
+
+    Args:
+        setup_books: Fixture that provides test book data.
+        author_cache: Fixture that provides an empty author cache.
+    """
+    rowling = setup_books[0].author
+    deleted_pk = Author.objects.create(name='Stanislaw Lem').pk
+    Author.objects.filter(pk=deleted_pk).delete()
+    author_cache.set('stanislaw lem', (deleted_pk, 'Stanislaw Lem'))
+    author_cache.set('robert galbraith', (rowling.pk, 'Robert Galbraith'))
+
+    lem = resolve_author('Stanislaw Lem')
+    assert lem.pk != deleted_pk
+    assert Author.objects.get(pk=lem.pk).name == 'Stanislaw Lem'
+    assert author_cache.get('stanislaw lem') is None
+    galbraith = resolve_author('Robert Galbraith')
+    assert galbraith.pk != rowling.pk
+    assert author_cache.get('robert galbraith') is None
+
+    def row_version():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT ctid::text FROM biblioteka_author WHERE id = %s", [rowling.pk])
+            return cursor.fetchone()[0]
+
+    version = row_version()
+    with CaptureQueriesContext(connection) as queries:
+        assert resolve_author('j.k. rowling').pk == rowling.pk
+    assert [query['sql'] for query in queries] == [INSERT_AUTHOR % "'j.k. rowling'", FIND_AUTHOR % "'j.k. rowling'"]
+    assert row_version() == version
+
+@pytest.mark.django_db
+def test_author_merge_migration():
+    """
+    Test that migration 0005 merges authors whose names differ only in case and whitespace.
+
+    The duplicates are created with the unique index dropped, as before the
+    migration, and the migration's statements are run on them. Ensures that names
+    are normalized, that the lowest id of each name is kept and that the titles of
+    the merged authors are moved to it.
+    """
+    migration = importlib.import_module('biblioteka.migrations.0005_author_name_unique')
+    with connection.cursor() as cursor:
+        cursor.execute('DROP INDEX author_name_lower_uniq')
+        cursor.execute(
+            "INSERT INTO biblioteka_author (name) VALUES "
+            "('J.K. Rowling'), ('  j.k.   ROWLING '), ('Andrzej  Sapkowski'), ('J.K. ROWLING') RETURNING id"
+        )
+        rowling, duplicate, sapkowski, other = [row[0] for row in cursor.fetchall()]
+    titles = [
+        Title.objects.create(name=name, author_id=author)
+        for name, author in (('Harry Plotter', rowling), ('Harry Drukarka', duplicate), ('Wiedzmin', sapkowski))
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(migration.NORMALIZE_AUTHOR_NAMES)
+        cursor.execute(migration.MERGE_DUPLICATE_AUTHORS)
+
+    assert list(Author.objects.order_by('pk').values_list('pk', 'name')) == [
+        (rowling, 'J.K. Rowling'), (sapkowski, 'Andrzej Sapkowski'),
+    ]
+    assert not Author.objects.filter(pk__in=[duplicate, other]).exists()
+    assert [Title.objects.get(pk=title.pk).author_id for title in titles] == [rowling, rowling, sapkowski]
+
 @pytest.mark.django_db
 def test_edit_title_view_get(client, setup_books):
     """
@@ -188,4 +1488,342 @@ def test_delete_title_view(client, setup_books):
     url = reverse('delete_title', args=[book.id])
     response = client.post(url)
     assert response.status_code == 302
-    assert not Title.objects.filter(id=book.id).exists()
\ No newline at end of file
+    assert not Title.objects.filter(id=book.id).exists()
+
+@pytest.mark.django_db
+def test_import_titles_command(tmp_path, setup_books):
+    """
+    Test the bulk import command with CSV input.
+
+    Ensures that titles are created with their genres and search vectors, that author
+    names are matched against existing authors regardless of case, that created
+    genres are offered by the title form at once, that invalid records are skipped,
+    and that dropped indexes are rebuilt.
+
+    Args:
+        tmp_path: pytest fixture providing a temporary directory.
+        setup_books: Fixture that provides test book data.
+    """
+    path = tmp_path / 'titles.csv'
+    path.write_text(
+        "name,description,author,genres\n"
+        "Hobbit,There and back again,J.R.R. Tolkien,Fantasy|Horror\n"
+        "Harry Potter,,j.k.  rowling,Fantasy\n"
+        ",No name,Nobody,\n",
+        encoding='utf-8',
+    )
+    assert 'Horror' not in [name for _, name in get_genre_choices()]
+    call_command('import_titles', str(path), batch_size=2, drop_indexes=True,
+                 stdout=StringIO(), stderr=StringIO())
+
+    hobbit = Title.objects.get(name='Hobbit')
+    assert hobbit.author.name == 'J.R.R. Tolkien'
+    assert sorted(genre.name for genre in hobbit.genre.all()) == ['Fantasy', 'Horror']
+    assert Title.objects.get(name='Harry Potter').author == setup_books[0].author
+    assert Genre.objects.filter(name='Fantasy').count() == 1
+    assert 'Horror' in [name for _, name in get_genre_choices()]
+    assert not Title.objects.filter(name='').exists()
+    assert Title.objects.filter(search_vector='tolkien').exists()
+
+    job = ImportJob.objects.get(name='titles.csv')
+    assert (job.records_done, job.titles_created, job.dropped_indexes) == (3, 2, [])
+    assert job.finished_at is not None
+    assert check_stats() == []
+
+@pytest.mark.django_db
+def test_import_titles_command_resumes(tmp_path):
+    """
+    Test that the bulk import command resumes an interrupted import.
+
+    Ensures that records processed by an earlier run of the same job are skipped.
+
+    Args:
+        tmp_path: pytest fixture providing a temporary directory.
+    """
+    path = tmp_path / 'titles.jsonl'
+    records = [
+        {'name': 'Dune', 'author': 'Frank Herbert', 'genres': ['Science Fiction']},
+        {'name': 'Emma', 'description': 'A novel', 'author': 'Jane Austen', 'genres': []},
+    ]
+    path.write_text("\n".join(json.dumps(record) for record in records), encoding='utf-8')
+    ImportJob.objects.create(name='catalogue', records_done=1)
+
+    call_command('import_titles', str(path), job='catalogue', stdout=StringIO())
+
+    assert list(Title.objects.values_list('name', flat=True)) == ['Emma']
+    assert ImportJob.objects.get(name='catalogue').records_done == 2
+
+@pytest.mark.django_db
+def test_export_titles_command_round_trip(tmp_path, setup_books):
+    """
+    Test that the export command's output can be imported back.
+
+    Args:
+        tmp_path: pytest fixture providing a temporary directory.
+        setup_books: Fixture that provides test book data.
+    """
+    path = tmp_path / 'titles.csv'
+    call_command('export_titles', output=str(path), chunk_size=1, stdout=StringIO())
+    Title.objects.all().delete()
+
+    call_command('import_titles', str(path), stdout=StringIO())
+
+    assert sorted(Title.objects.values_list('name', 'author__name')) == sorted(
+        (book.name, book.author.name) for book in setup_books
+    )
+    restored = Title.objects.get(name=setup_books[0].name)
+    assert sorted(genre.name for genre in restored.genre.all()) == ['Adventure', 'Fantasy']
+
+@pytest.mark.django_db
+def test_seed_catalogue_command():
+    """
+    Test that the seed command generates a reproducible, skewed catalogue.
+
+    Ensures that seeding in two runs gives the same titles as seeding in one, that
+    every title has between one and `--max-genres` genres and that the most prolific
+    author writes far more titles than an even split would give.
+    """
+    options = {'authors': 50, 'genres': 8, 'max_genres': 3, 'stdout': StringIO()}
+    call_command('seed_catalogue', titles=120, **options)
+    call_command('seed_catalogue', titles=80, **options)
+    incremental = list(Title.objects.order_by('pk').values_list('name', 'description', 'author__name'))
+
+    call_command('seed_catalogue', titles=200, clear=True, interactive=False, batch_size=64, **options)
+    assert list(Title.objects.order_by('pk').values_list('name', 'description', 'author__name')) == incremental
+
+    genre_counts = Title.objects.annotate(genre_count=Count('genre')).values_list('genre_count', flat=True)
+    assert min(genre_counts) >= 1 and max(genre_counts) <= 3
+    top_author = Author.objects.order_by('-title_count').first()
+    assert top_author.title_count > 4 * 200 / 50
+    assert Genre.objects.count() <= 8
+    assert not Title.objects.filter(search_vector__isnull=True).exists()
+    assert check_stats() == []
+
+@pytest.mark.django_db
+def test_clear_catalogue(client, setup_books, author_cache):
+    """
+    Test that clearing the catalogue drops the data cached under the reused ids.
+
+    Ensures that after the catalogue is cleared and generated again, a title reusing
+    the id of a deleted one shows its own detail page, author names resolve to the
+    new authors and the genre choices list the new genres.
+
+    Args:
+        client: Django's test client.
+        setup_books: Fixture that provides test book data.
+        author_cache: Fixture providing an empty author cache.
+    """
+    plotter = setup_books[0]
+    url = reverse('title_detail', args=[plotter.id])
+    assert plotter.name in client.get(url).content.decode()
+    author_cache.set('someone', (plotter.author_id, 'Someone'))
+    assert get_genre_choices()
+
+    clear_catalogue()
+    CatalogueGenerator(authors=3, genres=2, seed=0).load(0, plotter.id)
+
+    title = Title.objects.get(pk=plotter.id)
+    assert title.name in client.get(url).content.decode()
+    assert plotter.name not in client.get(url).content.decode()
+    assert len(author_cache) == 0
+    assert get_genre_choices() == list(Genre.objects.order_by('pk').values_list('pk', 'name'))
+
+@pytest.mark.django_db
+def test_backfill_excerpts_command(setup_books):
+    """
+    Test that the backfill command fills in missing excerpts and repairs stale ones with --all.
+
+    Args:
+        setup_books: Fixture that provides test book data.
+    """
+    author = setup_books[0].author
+    Title.objects.bulk_create(
+        Title(name=f"Saga {i}", description=f"Part {i} of the saga", author=author) for i in range(5)
+    )
+    Title.objects.update(excerpt='')
+
+    call_command('backfill_excerpts', batch_size=2, stdout=StringIO())
+    assert Title.objects.get(name='Saga 3').excerpt == 'Part 3 of the saga'
+    assert not Title.objects.exclude(description=None).filter(excerpt='').exists()
+
+    Title.objects.filter(name='Saga 1').update(excerpt='stale')
+    call_command('backfill_excerpts', stdout=StringIO())
+    assert Title.objects.get(name='Saga 1').excerpt == 'stale'
+    output = StringIO()
+    call_command('backfill_excerpts', all=True, stdout=output)
+    assert 'Wrote 1 excerpts' in output.getvalue()
+    assert Title.objects.get(name='Saga 1').excerpt == 'Part 1 of the saga'
+
+@pytest.mark.django_db
+def test_rebuild_similar_titles_command(setup_books):
+    """
+    Test that the rebuild and the incremental update compute the same neighbours.
+
+    Args:
+        setup_books: Fixture that provides test book data.
+    """
+    genres = list(Genre.objects.all()) + [Genre.objects.create(name=f'Genre {i}') for i in range(4)]
+    authors = [Author.objects.create(name=f'Author {i}') for i in range(5)]
+    for i in range(40):
+        title = Title.objects.create(name=f'Title {i}', author=authors[i % 5])
+        title.genre.set(genres[j] for j in range(len(genres)) if (i + 1) % (j + 2) == 0)
+
+    output = StringIO()
+    call_command('rebuild_similar_titles', limit=5, batch_size=3, stdout=output)
+    assert 'Indexed the similar titles of 42 titles' in output.getvalue()
+    rows = SimilarTitle.objects.order_by('title_id', '-score', 'similar_id')
+    rebuilt = [(row.title_id, row.similar_id, round(row.score, 9)) for row in rows]
+    assert rebuilt
+    assert max(Counter(title_id for title_id, _, _ in rebuilt).values()) == 5
+
+    update_similar_titles(Title.objects.values_list('pk', flat=True), limit=5)
+    assert [(row.title_id, row.similar_id, round(row.score, 9)) for row in rows] == rebuilt
+
+    with pytest.raises(CommandError):
+        call_command('rebuild_similar_titles', batch_size=0)
+
+@pytest.mark.django_db
+def test_catalogue_snapshot(tmp_path, settings, setup_books, author_cache):
+    """
+    Test that a current snapshot answers lookups without queries and a stale one is ignored.
+
+    Ensures that the snapshot maps ids to names, names to authors and titles to their
+    author and genres, that genre choices are then resolved without any query and
+    known authors with only the check of their id, and that saving a genre makes the
+    snapshot stale.
+
+    Args:
+        tmp_path: pytest fixture providing a temporary directory.
+        settings: pytest-django fixture for overriding settings.
+        setup_books: Fixture that provides test book data.
+        author_cache: Fixture that provides an empty author cache.
+    """
+    settings.CATALOGUE_SNAPSHOT_PATH = str(tmp_path / 'catalogue.snapshot')
+    assert get_snapshot() is None
+    book = setup_books[0]
+    author = book.author
+    fantasy, adventure = Genre.objects.get(name='Fantasy'), Genre.objects.get(name='Adventure')
+    call_command('build_catalogue_snapshot', stdout=StringIO())
+
+    snapshot = get_snapshot()
+    assert snapshot is not None
+    assert snapshot.author_name(author.pk) == 'J.K. Rowling'
+    assert snapshot.find_author('j.k. rowling') == (author.pk, 'J.K. Rowling')
+    assert snapshot.find_author('Nobody') is None
+    assert snapshot.genre_name(fantasy.pk) == 'Fantasy'
+    assert snapshot.title_author(book.pk) == author.pk
+    assert snapshot.title_genres(book.pk) == sorted([fantasy.pk, adventure.pk])
+    assert snapshot.title_genres(0) is None
+
+    with CaptureQueriesContext(connection) as queries:
+        assert get_genre_choices() == sorted([(fantasy.pk, 'Fantasy'), (adventure.pk, 'Adventure')])
+        assert resolve_author('  J.K.   ROWLING ').pk == author.pk
+    assert [query['sql'] for query in queries] == [LOCK_AUTHOR % author.pk]
+    assert len(author_cache) == 0
+
+    Genre.objects.create(name='Horror')
+    assert get_snapshot() is None
+    assert 'Horror' in [name for _, name in get_genre_choices()]
+
+@pytest.mark.django_db
+def test_build_catalogue_snapshot_command(tmp_path, setup_books):
+    """
+    Test that rebuilding the snapshot swaps the file without disturbing open readers.
+
+    Args:
+        tmp_path: pytest fixture providing a temporary directory.
+        setup_books: Fixture that provides test book data.
+    """
+    path = str(tmp_path / 'catalogue.snapshot')
+    output = StringIO()
+    call_command('build_catalogue_snapshot', path=path, stdout=output)
+    assert '2 titles' in output.getvalue()
+    old = open_snapshot(path)
+
+    output = StringIO()
+    call_command('build_catalogue_snapshot', path=path, if_stale=True, stdout=output)
+    assert output.getvalue() == ''
+
+    Title.objects.create(name='Harry Skaner', author=setup_books[0].author)
+    call_command('build_catalogue_snapshot', path=path, if_stale=True, stdout=output)
+    assert '3 titles' in output.getvalue()
+    assert len(old.title_ids) == 2
+    assert len(open_snapshot(path).title_ids) == 3
+    assert sorted(tmp_path.iterdir()) == [tmp_path / 'catalogue.snapshot']
+
+    (tmp_path / 'broken.snapshot').write_bytes(b'BIBSNAP1')
+    with pytest.raises(SnapshotError):
+        open_snapshot(str(tmp_path / 'broken.snapshot'))
+    with override_settings(CATALOGUE_SNAPSHOT_PATH=''), pytest.raises(CommandError):
+        call_command('build_catalogue_snapshot')
+
+@pytest.mark.django_db
+def test_benchmark_catalogue_command(tmp_path):
+    """
+    Test that the benchmark command measures every URL of the application.
+
+    Args:
+        tmp_path: pytest fixture providing a temporary directory.
+    """
+    output = tmp_path / 'results.json'
+    call_command(
+        'benchmark_catalogue', scales='20,40', iterations=2, authors=10, genres=5,
+        output=str(output), interactive=False, stdout=StringIO(),
+    )
+    results = json.loads(output.read_text())
+
+    assert list(results['scales']) == ['20', '40']
+    assert results['scales']['40']['catalogue']['titles'] == 40
+    measured = results['scales']['40']['requests']
+    assert {label.split(':')[0] for label in measured} == {pattern.name for pattern in urls.urlpatterns}
+    assert all(figures['p50_ms'] > 0 for figures in measured.values())
+    assert measured['title_detail']['queries'] >= 1
+
+    compared = StringIO()
+    call_command(
+        'benchmark_catalogue', scales='20', iterations=1, authors=10, genres=5,
+        output=str(tmp_path / 'again.json'), compare=str(output), interactive=False, stdout=compared,
+    )
+    assert 'title_list' in compared.getvalue()
+
+@pytest.mark.django_db
+def test_benchmark_templates_command():
+    """
+    Test that the template benchmark reports every variant.
+    """
+    output = StringIO()
+    call_command('benchmark_templates', rows=20, iterations=1, json=True, stdout=output)
+    results = json.loads(output.getvalue())['results']
+    assert set(results) == {'loader:uncached', 'loader:cached', 'rows:per-row-url', 'rows:cold', 'rows:warm'}
+
+@pytest.mark.django_db
+def test_view_query_plans():
+    """
+    Test that no view query scans a large table sequentially and every plan is as recorded.
+
+    Every URL is requested against the seeded plan catalogue, whose title and author
+    tables are both above the scan threshold, and each query it issues is explained;
+    only the scans of `ALLOWED_SEQ_SCANS` are accepted. The configured caches are
+    left untouched. The plans are compared with `biblioteka/query_plans.json` when it
+    was recorded on the same PostgreSQL major version; after an intended change of
+    plan, rewrite it with `python manage.py check_query_plans --update`.
+    """
+    assert min(PLAN_CATALOGUE['titles'], PLAN_CATALOGUE['authors']) > SEQ_SCAN_THRESHOLD
+    seed_plan_catalogue()
+    caches['pages'].set('kept', True)
+    report = explain_views(PlanSample(random.Random(PLAN_CATALOGUE['seed']), 1000))
+    assert caches['pages'].get('kept') is True
+
+    assert set(report) == {label for requests in REQUESTS.values() for label, _ in requests}
+    assert all(result['status'] < 400 for result in report.values())
+    assert any(query['sql'].startswith('SELECT') for query in report['title_export']['queries'])
+    scans = {
+        label: query['seq_scans'] for label, result in report.items()
+        for query in result['queries'] if query['seq_scans']
+    }
+    assert scans == {}
+
+    recorded = load_fingerprints()
+    assert recorded is not None
+    if recorded['postgresql'] == connection.pg_version // 10000:
+        assert changed_fingerprints(recorded, report) == []
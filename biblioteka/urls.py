@@ -10,18 +10,51 @@ URL Patterns:
     - 'add/': Maps to `AddTitleView`, which provides a form for adding a new title.
     - '<int:pk>/edit/': Maps to `EditTitleView`, which provides a form for editing an existing title.
     - '<int:pk>/delete/': Maps to `DeleteTitleView`, which handles the deletion of a title.
+    - 'search/': Maps to `TitleSearchView`, which returns full-text search results as JSON.
+    - 'authors/autocomplete/': Maps to `AuthorAutocompleteView`, which suggests author names as JSON.
+    - 'export/': Maps to `TitleExportView`, which streams the whole catalogue as CSV or JSON Lines.
+    - 'bulk/': Maps to `TitleBulkEditView`, which previews (GET) or runs (POST) bulk deletions and edits of titles.
+    - 'api/titles/': Maps to `TitleApiListView`, which returns a cursor-paginated page of titles as JSON.
+    - 'api/titles/<int:pk>/': Maps to `TitleApiDetailView`, which returns a single title as JSON.
+    - 'api/titles/<int:pk>/similar/': Maps to `TitleApiSimilarView`, which returns the titles most similar to a title as JSON.
+    - 'api/titles/batch/': Maps to `TitleApiBatchView`, which returns the titles with the given ids as JSON.
+    - 'api/changes/': Maps to `TitleChangesView`, which returns the catalogue change log after a cursor as JSON.
+    - 'api/stats/': Maps to `CatalogueStatsView`, which returns the authors and genres with the most titles as JSON.
+    - 'metrics/': Maps to `MetricsView`, which reports request latency histograms per URL name.
+    - 'metrics/db/': Maps to `DatabaseStatsView`, which reports database connection and pool usage.
+
+When the `ASYNC_VIEWS` setting is on, the title list, detail, search and JSON API
+patterns are served by the async variants from `async_views.py` instead.
 
 Modules Imported:
     - `path`: Django's utility for routing URLs.
-    - Views: TitleDetailView, TitleListView, AddTitleView, EditTitleView, DeleteTitleView from `views.py`.
+    - Views: TitleDetailView, TitleListView, AddTitleView, EditTitleView, DeleteTitleView,
+      TitleSearchView, TitleBulkEditView, AuthorAutocompleteView, TitleExportView, TitleApiListView,
+      TitleApiDetailView, TitleApiSimilarView, TitleApiBatchView, TitleChangesView, CatalogueStatsView,
+      MetricsView, DatabaseStatsView from `views.py`.
 
 Usage:
     Include these URL patterns in the project's root URL configuration to integrate
     the library app's functionalities.
 """
 
+from django.conf import settings
 from django.urls import path
-from .views import TitleDetailView, TitleListView, AddTitleView, EditTitleView, DeleteTitleView
+from .views import (
+    TitleDetailView, TitleListView, AddTitleView, EditTitleView, DeleteTitleView, TitleSearchView, TitleBulkEditView,
+    AuthorAutocompleteView, TitleExportView, TitleApiListView, TitleApiDetailView, TitleApiSimilarView,
+    TitleApiBatchView, TitleChangesView, CatalogueStatsView, MetricsView, DatabaseStatsView,
+)
+
+if settings.ASYNC_VIEWS:
+    from .async_views import (
+        AsyncTitleListView as TitleListView,
+        AsyncTitleDetailView as TitleDetailView,
+        AsyncTitleSearchView as TitleSearchView,
+        AsyncTitleApiListView as TitleApiListView,
+        AsyncTitleApiDetailView as TitleApiDetailView,
+        AsyncTitleApiBatchView as TitleApiBatchView,
+    )
 
 urlpatterns = [
     path('', TitleListView.as_view(), name='title_list'),
@@ -29,4 +62,16 @@ urlpatterns = [
     path('add/', AddTitleView.as_view(), name='add_title'),
     path('<int:pk>/edit/', EditTitleView.as_view(), name='edit_title'),
     path('<int:pk>/delete/', DeleteTitleView.as_view(), name='delete_title'),
+    path('bulk/', TitleBulkEditView.as_view(), name='bulk_edit_titles'),
+    path('search/', TitleSearchView.as_view(), name='title_search'),
+    path('authors/autocomplete/', AuthorAutocompleteView.as_view(), name='author_autocomplete'),
+    path('export/', TitleExportView.as_view(), name='title_export'),
+    path('api/titles/', TitleApiListView.as_view(), name='api_title_list'),
+    path('api/titles/<int:pk>/', TitleApiDetailView.as_view(), name='api_title_detail'),
+    path('api/titles/<int:pk>/similar/', TitleApiSimilarView.as_view(), name='api_title_similar'),
+    path('api/titles/batch/', TitleApiBatchView.as_view(), name='api_title_batch'),
+    path('api/changes/', TitleChangesView.as_view(), name='api_title_changes'),
+    path('api/stats/', CatalogueStatsView.as_view(), name='api_catalogue_stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('metrics/db/', DatabaseStatsView.as_view(), name='database_stats'),
 ]
\ No newline at end of file
@@ -1,51 +1,866 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models import Prefetch
+from django.core.exceptions import BadRequest, PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.views.generic import View
 from django.views.generic.edit import DeleteView
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
-from .models import Author, Title
+from .models import Author, Genre, Title
 from .forms import TitleForm
+from .bulk_edit import BulkLimitExceeded, run_bulk_operation, select_titles_from_params
+from .api import json_response, parse_fields, parse_limit, serialize_titles, title_values
+from .changes import ChangeCursorExpired, head_cursor, read_changes
+from .database import connection_stats
+from .metrics import metrics_allowed, registry
+from .export import FORMATS, export_rows, gzip_chunks, serialize
+from .facets import (
+    MATCH_ALL, MATCH_ANY, GenreFilter, facet_links, filter_query, filter_url, get_genre_facets,
+)
+from .pagecache import detail_page_cache
+from .pagination import KeysetPaginator
+from .search import autocomplete_authors, highlight_snippet, search_titles
+from .similar import annotate_neighbour_state, similar_titles
+from .versions import conditional_response, get_catalogue_version, set_validators
 
 class TitleListView(View):
     """
-    Handles the display of a list of all titles.
+    Handles the display of a paginated list of titles.
+
+    Titles are ordered by name and paginated with opaque keyset cursors passed in
+    the `after` and `before` query parameters, so every page costs the same no
+    matter how far into the catalogue it is. Authors are joined into the same
+    query and only the columns shown by the template are loaded.
+
+    When a `q` query parameter is given, the view shows the best full-text search
+    matches instead, ranked by relevance and with highlighted snippets.
+
+    Titles can be filtered by genre with `genre` query parameters, requiring every
+    selected genre or, with `match=any`, one of them. A sidebar shows the genre
+    counts of the current result set, computed by `biblioteka.facets` in one
+    grouped query.
+
+    Responses carry an `ETag` derived from the title collection version and the
+    query string, so a client whose copy is current gets a 304 response without
+    any title being loaded.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
 
     Methods:
-        get(request): Retrieves all Title objects and renders the title list template.
+        get(request): Retrieves one page of Title objects and renders the title list template.
+        get_queryset(): Returns the titles to list, with the columns the template needs.
+        get_facet_context(request, counts, genre_filter): Returns the template context of the facets.
+        get_etag(request, version): Returns the entity tag of the page at a catalogue version.
     """
+    query_budget = 3
+    template_name = 'biblioteka/title_list.html'
+
     def get(self, request):
         """
-        Retrieves all titles and renders the title list view.
+        Retrieves a page of titles and renders the title list view.
+
+        The page size is taken from the `TITLE_LIST_PAGE_SIZE` setting, and the
+        number of search results from `SEARCH_RESULTS_LIMIT`.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry an `after` or
+                `before` cursor, a `q` search query and `genre` and `match` filters
+                in its query string.
+
+        Returns:
+            HttpResponse: The rendered template with the page of titles, or a 304
+                response if the client's copy is current.
+
+        Raises:
+            BadRequest: If the cursor or the genre filter is malformed (rendered as
+                a 400 response).
+        """
+        version, updated_at = get_catalogue_version()
+        etag = self.get_etag(request, version)
+        response = conditional_response(request, etag, updated_at)
+        if response is not None:
+            return response
+
+        genre_filter = GenreFilter.from_request(request)
+        titles = genre_filter.apply(self.get_queryset())
+        query = request.GET.get('q', '').strip()
+        if query:
+            results = list(search_titles(query, titles)[:settings.SEARCH_RESULTS_LIMIT])
+            context = {'titles': results, 'query': query}
+        else:
+            paginator = KeysetPaginator(titles, settings.TITLE_LIST_PAGE_SIZE)
+            page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+            context = {'titles': page, 'page': page}
+        counts = get_genre_facets(version, genre_filter, query)
+        context.update(self.get_facet_context(request, counts, genre_filter))
+        return set_validators(render(request, self.template_name, context), etag, updated_at)
+
+    def get_queryset(self):
+        """
+        Returns the titles to list, joined with their authors.
+
+        The stored description excerpt is loaded instead of the description, which
+        can be many times longer, and `updated_at` keys the cached rows (see
+        `biblioteka.fragments`).
+
+        Returns:
+            QuerySet: The titles, loading only the columns shown by the template.
+        """
+        return Title.objects.select_related('author').only('name', 'excerpt', 'updated_at', 'author__name')
+
+    def get_facet_context(self, request, counts, genre_filter):
+        """
+        Returns the template context of the genre sidebar and the filtered links.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            counts (list): The `(genre id, genre name, count)` tuples of the result set.
+            genre_filter (GenreFilter): The selected genres.
+
+        Returns:
+            dict: The `facets`, the `genre_filter`, the `filter_query` to keep in
+                pagination links, and the links clearing the filter and switching
+                its match mode.
+        """
+        other_match = MATCH_ANY if genre_filter.match == MATCH_ALL else MATCH_ALL
+        return {
+            'facets': facet_links(request, counts, genre_filter),
+            'genre_filter': genre_filter,
+            'filter_query': filter_query(request),
+            'clear_filter_url': filter_url(request, GenreFilter()),
+            'match_url': filter_url(request, GenreFilter(genre_filter.genre_ids, other_match)),
+        }
+
+    def get_etag(self, request, version):
+        """
+        Returns the entity tag of the requested page at a given catalogue version.
 
         Args:
             request (HttpRequest): The HTTP request object.
+            version (int): The version of the title collection.
 
         Returns:
-            HttpResponse: The rendered template with the list of titles.
+            str: The strong entity tag, quotes included.
+        """
+        variant = f'{settings.TITLE_LIST_PAGE_SIZE}?{request.GET.urlencode()}'
+        return f'"titles-{version}-{hashlib.md5(variant.encode()).hexdigest()}"'
+
+class TitleSearchView(View):
+    """
+    Handles full-text search requests returning JSON.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Searches titles for the `q` query parameter and returns ranked results.
+        get_queryset(): Returns the titles to search.
+        serialize(title): Returns a search result as a dictionary.
+    """
+    query_budget = 1
+
+    def get(self, request):
         """
-        titles = Title.objects.all()
-        return render(request, 'biblioteka/title_list.html', {'titles': titles})
+        Searches the catalogue and returns the best matches as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object with the search text in `q`.
+
+        Returns:
+            JsonResponse: An object with a `results` list. Each result holds the title's
+                `id`, `name`, `author`, `rank` and an HTML `snippet` with `<mark>` tags.
+                The list is empty when `q` is missing or blank.
+        """
+        query = request.GET.get('q', '').strip()
+        results = []
+        if query:
+            titles = search_titles(query, self.get_queryset())[:settings.SEARCH_RESULTS_LIMIT]
+            results = [self.serialize(title) for title in titles]
+        return JsonResponse({'results': results})
+
+    def get_queryset(self):
+        """
+        Returns the titles to search, joined with their authors.
+
+        Returns:
+            QuerySet: The titles, loading only the columns of a search result.
+        """
+        return Title.objects.select_related('author').only('name', 'author__name')
+
+    def serialize(self, title):
+        """
+        Returns a search result as a dictionary.
+
+        Args:
+            title (Title): A title annotated by `search_titles`.
+
+        Returns:
+            dict: The title's `id`, `name`, `author`, `rank` and highlighted `snippet`.
+        """
+        return {
+            'id': title.pk,
+            'name': title.name,
+            'author': title.author.name,
+            'rank': title.rank,
+            'snippet': highlight_snippet(title.snippet),
+        }
 
 class TitleDetailView(View):
     """
     Handles the display of detailed information about a specific title.
 
+    The rendered page is cached per title by `detail_page_cache` and served without
+    touching the database until the title, its author or its genres change. On a
+    cache miss, the author is joined into the title query, the genres are fetched
+    in one additional query and the similar titles panel is read from the similar
+    titles index (see `biblioteka.similar`) in another.
+
+    Responses carry an `ETag` and `Last-Modified` derived from the title's
+    `updated_at` and the state of its stored neighbours, which are read first in
+    one query, so a client whose copy is current gets a 304 response without the
+    page being rendered or fetched from the cache.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
     Methods:
-        get(request, pk): Retrieves a single Title object by primary key and renders the detail view.
+        get(request, pk): Returns the cached or freshly rendered detail page of a title.
+        render_page(request, pk): Retrieves a single Title object by primary key and renders it.
+        get_queryset(): Returns the titles with the related data the template shows.
+        get_state_queryset(pk): Returns what the validators of a title's page are derived from.
+        get_validators(pk, updated_at, neighbours_updated_at, neighbours_digest): Returns
+            the entity tag and modification time of a title's page.
     """
+    query_budget = 4
+    template_name = 'biblioteka/title_detail.html'
 
     def get(self, request, pk):
         """
-        Retrieves a specific title and renders the detail view.
+        Returns the detail page of a specific title, from the cache when possible.
 
         Args:
             request (HttpRequest): The HTTP request object.
             pk (int): The primary key of the Title to retrieve.
 
         Returns:
-            HttpResponse: The rendered template with the title details.
+            HttpResponse: The page with the title details, or a 304 response if the
+                client's copy is current.
+
+        Raises:
+            Http404: If no Title with the given primary key exists.
+        """
+        state = self.get_state_queryset(pk).first()
+        if state is None:
+            raise Http404("No Title matches the given query.")
+        etag, last_modified = self.get_validators(pk, *state)
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        content = detail_page_cache.get_or_render(pk, lambda: self.render_page(request, pk))
+        return set_validators(HttpResponse(content), etag, last_modified)
+
+    def render_page(self, request, pk):
+        """
+        Retrieves a specific title and renders the detail template.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            pk (int): The primary key of the Title to retrieve.
+
+        Returns:
+            str: The rendered template with the title details.
+
+        Raises:
+            Http404: If no Title with the given primary key exists.
+        """
+        title = get_object_or_404(self.get_queryset(), pk=pk)
+        similar = list(similar_titles(pk))
+        return render_to_string(self.template_name, {'title': title, 'similar_titles': similar}, request)
+
+    def get_queryset(self):
+        """
+        Returns the titles joined with their authors and with their genres prefetched.
+
+        The rendered page is cached until the title changes again, so it is always
+        read from the primary: a lagging replica could otherwise leave a stale page
+        cached under the new version.
+
+        Returns:
+            QuerySet: The titles.
+        """
+        return Title.objects.using(DEFAULT_DB_ALIAS).select_related('author').prefetch_related(
+            Prefetch('genre', queryset=Genre.objects.only('name'))
+        )
+
+    def get_state_queryset(self, pk):
+        """
+        Returns what the validators of a title's page are derived from.
+
+        Args:
+            pk (int): The primary key of the title.
+
+        Returns:
+            QuerySet: Tuples of the title's `updated_at` and the
+                `neighbours_updated_at` and `neighbours_digest` of its stored neighbours
+                (see `annotate_neighbour_state`), empty if the title does not exist.
+        """
+        return annotate_neighbour_state(Title.objects.filter(pk=pk)).values_list(
+            'updated_at', 'neighbours_updated_at', 'neighbours_digest',
+        )
+
+    def get_validators(self, pk, updated_at, neighbours_updated_at, neighbours_digest):
+        """
+        Returns the entity tag and modification time of a title's detail page.
+
+        The page shows the title and its similar titles, so both change when either
+        the title or one of its neighbours changes, or when the neighbours do.
+
+        Args:
+            pk (int): The primary key of the title.
+            updated_at (datetime): When the title last changed.
+            neighbours_updated_at (datetime or None): When a neighbour last changed.
+            neighbours_digest (str or None): The hash of the title's neighbour list.
+
+        Returns:
+            tuple: The strong entity tag, quotes included, and the modification time.
+        """
+        last_modified = max(updated_at, neighbours_updated_at or updated_at)
+        etag = f'title-{pk}-{int(updated_at.timestamp() * 1_000_000)}'
+        if neighbours_digest:
+            etag = f'{etag}-{neighbours_digest[:16]}'
+        return f'"{etag}"', last_modified
+
+
+class TitleExportView(View):
+    """
+    Handles streaming exports of the whole catalogue.
+
+    Methods:
+        get(request): Streams every title with its author and genre names.
+    """
+
+    def get(self, request):
+        """
+        Streams the catalogue as CSV or JSON Lines.
+
+        Rows are read through a server-side cursor and written as they are serialized,
+        so the response size does not affect memory use.
+
+        Args:
+            request (HttpRequest): The HTTP request object. The `format` query parameter
+                selects `csv` (default), `jsonl` or `ndjson`; `gzip=1` compresses the output.
+
+        Returns:
+            StreamingHttpResponse: The export as a file attachment.
+
+        Raises:
+            BadRequest: If the format is not supported.
+        """
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in FORMATS:
+            raise BadRequest(f"Unsupported export format: {fmt}")
+        content_type, extension = FORMATS[fmt]
+        filename = f'titles.{extension}'
+        # The rows are read after this method returns, so pick the database now.
+        chunks = serialize(export_rows(using=router.db_for_read(Title)), fmt)
+        if request.GET.get('gzip') == '1':
+            chunks = gzip_chunks(chunks)
+            content_type = 'application/gzip'
+            filename += '.gz'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TitleApiListView(View):
+    """
+    Handles the JSON API list of titles.
+
+    Titles are ordered by name and paginated with the same keyset cursors as the
+    title list page. Rows are read with a single `values()` query that also collects
+    author and genre names.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Returns one page of titles as JSON.
+        get_paginator(request, fields): Returns the paginator for the requested page size.
+    """
+    query_budget = 1
+
+    def get(self, request):
+        """
+        Returns a page of titles as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry an `after` or
+                `before` cursor, a `limit` on the page size (at most `API_MAX_BATCH_SIZE`,
+                `API_PAGE_SIZE` by default) and a `fields` list.
+
+        Returns:
+            HttpResponse: An object with a `results` list and `next`/`previous` cursors,
+                which are null at either end of the catalogue.
+
+        Raises:
+            BadRequest: If the cursor, the limit or a field is invalid.
+        """
+        fields = parse_fields(request)
+        paginator = self.get_paginator(request, fields)
+        page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+        return json_response({
+            'results': serialize_titles(page, fields),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+    def get_paginator(self, request, fields):
+        """
+        Returns a paginator over the requested fields of all titles.
+
+        Args:
+            request (HttpRequest): The HTTP request object, possibly with a `limit`.
+            fields (list): The API fields to select.
+
+        Returns:
+            KeysetPaginator: The paginator.
+
+        Raises:
+            BadRequest: If the limit is not an integer within bounds.
+        """
+        limit = parse_limit(request, settings.API_PAGE_SIZE, settings.API_MAX_BATCH_SIZE)
+        return KeysetPaginator(title_values(Title.objects.all(), fields, ['id', 'name']), limit)
+
+class TitleApiDetailView(View):
+    """
+    Handles the JSON API representation of a single title.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request, pk): Returns one title as JSON.
+    """
+    query_budget = 1
+
+    def get(self, request, pk):
+        """
+        Returns a specific title as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry a `fields` list.
+            pk (int): The primary key of the Title to retrieve.
+
+        Returns:
+            HttpResponse: The title object.
+
+        Raises:
+            Http404: If no Title with the given primary key exists.
+            BadRequest: If an unknown field is requested.
+        """
+        fields = parse_fields(request)
+        rows = serialize_titles(title_values(Title.objects.filter(pk=pk), fields), fields)
+        if not rows:
+            raise Http404("No Title matches the given query.")
+        return json_response(rows[0])
+
+class TitleApiSimilarView(View):
+    """
+    Handles the JSON API of the titles most similar to a title.
+
+    The neighbours are read from the similar titles index (see `biblioteka.similar`)
+    with one indexed query; nothing is compared while the request runs.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request, pk): Returns the similar titles of one title as JSON.
+    """
+    query_budget = 2
+
+    def get(self, request, pk):
+        """
+        Returns the titles most similar to a specific title as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry a `limit` on the
+                number of titles (at most `SIMILAR_TITLES_COUNT`, the default).
+            pk (int): The primary key of the Title.
+
+        Returns:
+            HttpResponse: An object with the `title` id and a `results` list of `id`,
+                `name`, `author` and `score`, most similar first.
+
+        Raises:
+            Http404: If no Title with the given primary key exists.
+            BadRequest: If the limit is not an integer within bounds.
+        """
+        limit = parse_limit(request, settings.SIMILAR_TITLES_COUNT, settings.SIMILAR_TITLES_COUNT)
+        rows = list(similar_titles(pk, limit, using=router.db_for_read(Title)))
+        if not rows and not Title.objects.filter(pk=pk).exists():
+            raise Http404("No Title matches the given query.")
+        return json_response({
+            'title': pk,
+            'results': [
+                {'id': row.similar_id, 'name': row.similar.name, 'author': row.similar.author.name,
+                 'score': round(row.score, 6)}
+                for row in rows
+            ],
+        })
+
+
+class TitleApiBatchView(View):
+    """
+    Handles fetching many titles by id in one JSON API request.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Returns the titles listed in the `ids` query parameter.
+        get_ids(request): Parses the `ids` query parameter.
+        build_response(ids, rows, fields): Returns the found titles in the requested order.
+    """
+    query_budget = 1
+
+    def get(self, request):
+        """
+        Returns the requested titles as JSON, in the order of their ids.
+
+        Args:
+            request (HttpRequest): The HTTP request object with comma-separated ids in
+                `ids` (at most `API_MAX_BATCH_SIZE` of them), and optionally a `fields` list.
+
+        Returns:
+            HttpResponse: An object with a `results` list in the requested order and a
+                `missing` list of ids that do not exist.
+
+        Raises:
+            BadRequest: If the ids are malformed or too many, or a field is unknown.
+        """
+        fields = parse_fields(request)
+        ids = self.get_ids(request)
+        rows = []
+        if ids:
+            rows = title_values(Title.objects.filter(pk__in=ids), fields, ['id'])
+        return self.build_response(ids, rows, fields)
+
+    def get_ids(self, request):
+        """
+        Parses the requested ids, dropping duplicates.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            list: The ids, in the requested order.
+
+        Raises:
+            BadRequest: If the ids are malformed or too many.
+        """
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in request.GET.get('ids', '').split(',') if pk))
+        except ValueError:
+            raise BadRequest("ids must be comma-separated integers")
+        if len(ids) > settings.API_MAX_BATCH_SIZE:
+            raise BadRequest(f"At most {settings.API_MAX_BATCH_SIZE} ids can be requested at once")
+        return ids
+
+    def build_response(self, ids, rows, fields):
+        """
+        Returns the fetched titles in the requested order, with the ids not found.
+
+        Args:
+            ids (list): The requested ids.
+            rows (iterable): The `title_values` rows fetched for these ids.
+            fields (list): The API fields to return.
+
+        Returns:
+            HttpResponse: An object with `results` and `missing` lists.
+        """
+        rows = {row['id']: row for row in rows}
+        return json_response({
+            'results': serialize_titles((rows[pk] for pk in ids if pk in rows), fields),
+            'missing': [pk for pk in ids if pk not in rows],
+        })
+
+
+class TitleChangesView(View):
+    """
+    Handles the change feed of the JSON API, read by sync clients.
+
+    Clients pass the `next` cursor of each response as `after` to the following
+    request and apply the entries in order: `created` and `updated` entries carry
+    the current state of the title, `deleted` entries are tombstones. See
+    `biblioteka.changes` for how entries are written, ordered and pruned.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Returns the change log entries after a cursor.
+    """
+    query_budget = 3
+
+    def get(self, request):
+        """
+        Returns the change log entries after a cursor as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry an `after`
+                cursor, a `limit` on the number of entries (at most `API_MAX_BATCH_SIZE`,
+                `API_PAGE_SIZE` by default) and a `fields` list for the title states.
+                With `head`, only the cursor of the newest entry is returned, for
+                clients starting to sync after a full export.
+
+        Returns:
+            HttpResponse: An object with a `results` list of entries, the `next`
+                cursor and whether more entries can be read now (`has_more`), or a
+                410 response if the cursor has expired and the client must resync.
+
+        Raises:
+            BadRequest: If the cursor, the limit or a field is invalid.
+        """
+        if 'head' in request.GET:
+            return json_response({'results': [], 'next': head_cursor(), 'has_more': False})
+        fields = parse_fields(request)
+        limit = parse_limit(request, settings.API_PAGE_SIZE, settings.API_MAX_BATCH_SIZE)
+        try:
+            results, cursor, has_more = read_changes(request.GET.get('after'), limit, fields)
+        except ChangeCursorExpired:
+            return json_response({'error': "The cursor has expired; resynchronize the catalogue."}, status=410)
+        return json_response({'results': results, 'next': cursor, 'has_more': has_more})
+
+
+class CatalogueStatsView(View):
+    """
+    Handles the JSON API of catalogue statistics for dashboards.
+
+    The counts are read from the `title_count` counters of authors and genres
+    maintained by `biblioteka.stats`, so no titles are counted per request.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Returns the authors and genres with the most titles.
+    """
+    query_budget = 2
+
+    def get(self, request):
+        """
+        Returns the authors and genres with the most titles as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object. May carry a `limit` on the
+                number of authors and genres (at most `API_PAGE_SIZE`, 20 by default).
+
+        Returns:
+            HttpResponse: An object with `authors` and `genres` lists of `id`, `name`
+                and `title_count`, largest count first.
+
+        Raises:
+            BadRequest: If the limit is not an integer within bounds.
+        """
+        limit = parse_limit(request, 20, settings.API_PAGE_SIZE)
+        return json_response({
+            key: list(
+                model.objects
+                .order_by('-title_count', 'name')
+                .values('id', 'name', 'title_count')[:limit]
+            )
+            for key, model in (('authors', Author), ('genres', Genre))
+        })
+
+
+class DatabaseStatsView(View):
+    """
+    Reports the database connection settings and pool usage of the answering worker.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Returns the connection statistics as JSON.
+    """
+    query_budget = 0
+
+    def get(self, request):
+        """
+        Returns the connection statistics of this worker process.
+
+        Each worker has its own pool, so repeated requests may be answered by different
+        processes; the `pid` field tells them apart.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            JsonResponse: The figures returned by `connection_stats`.
+
+        Raises:
+            PermissionDenied: If the client is not allowed by `metrics_allowed`.
+        """
+        if not metrics_allowed(request):
+            raise PermissionDenied
+        return JsonResponse(connection_stats())
+
+
+class MetricsView(View):
+    """
+    Reports the request latency histograms of the answering worker.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Returns the per URL name figures as JSON.
+    """
+    query_budget = 0
+
+    def get(self, request):
+        """
+        Returns the request figures recorded by `PerformanceMiddleware` in this process.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+
+        Returns:
+            JsonResponse: The process `pid` and, in `views`, the figures of each URL name.
+
+        Raises:
+            PermissionDenied: If the client is not allowed by `metrics_allowed`.
+        """
+        if not metrics_allowed(request):
+            raise PermissionDenied
+        return JsonResponse({'pid': os.getpid(), 'views': registry.snapshot()})
+
+
+class TitleBulkEditView(View):
+    """
+    Handles bulk deletion and bulk editing of titles.
+
+    A GET request previews an operation: it counts the titles the operation would
+    change without changing anything. A POST request runs it, in one transaction.
+    See `biblioteka.bulk_edit` for the operations and how titles are selected.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+        DRY_RUN_VALUES (dict): The accepted values of the `dry_run` form field, in
+            lower case, and whether each asks for a dry run.
+
+    Methods:
+        get(request): Counts the titles an operation would change.
+        post(request): Runs an operation, or counts with `dry_run`.
+        run(params, dry_run): Runs or counts the operation described by the parameters.
+    """
+    query_budget = 10
+    DRY_RUN_VALUES = {
+        '1': True, 'true': True, 'on': True, 'yes': True,
+        '': False, '0': False, 'false': False, 'off': False, 'no': False,
+    }
+
+    def get(self, request):
+        """
+        Counts the titles an operation would change, as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object, with the parameters
+                described in `run` in the query string.
+
+        Returns:
+            HttpResponse: The dry-run result.
+        """
+        return self.run(request.GET, dry_run=True)
+
+    def post(self, request):
+        """
+        Runs an operation, as JSON.
+
+        Args:
+            request (HttpRequest): The HTTP request object, with the parameters
+                described in `run` in the form data, and optionally `dry_run`: one of
+                `1`, `true`, `on` and `yes` to only count, or `0`, `false`, `off`,
+                `no` or an empty value to run the operation.
+
+        Returns:
+            HttpResponse: The result of the operation.
+
+        Raises:
+            BadRequest: If `dry_run` has another value, or the parameters described
+                in `run` are invalid.
+        """
+        dry_run = request.POST.get('dry_run', '').lower()
+        if dry_run not in self.DRY_RUN_VALUES:
+            raise BadRequest("dry_run must be one of 1, true, on, yes, 0, false, off or no")
+        return self.run(request.POST, dry_run=self.DRY_RUN_VALUES[dry_run])
+
+    def run(self, params, dry_run):
+        """
+        Runs or counts the operation described by request parameters.
+
+        Args:
+            params (QueryDict): The `operation`, its `target` author or genre id, and
+                the selection: `ids`, `genre` and `match`, `q` and `author`, as for
+                `select_titles_from_params`.
+            dry_run (bool): Only count the titles that would change.
+
+        Returns:
+            HttpResponse: An object with the `operation`, the number of `matched` and
+                `changed` titles and `dry_run`, or a 400 response with an `error` if
+                more than `BULK_EDIT_LIMIT` titles are selected.
+
+        Raises:
+            BadRequest: If the operation, its target or the selection is invalid.
+        """
+        titles = select_titles_from_params(params)
+        target = params.get('target') or None
+        if target is not None:
+            try:
+                target = int(target)
+            except ValueError:
+                raise BadRequest("target must be an integer")
+        try:
+            result = run_bulk_operation(params.get('operation', ''), titles, target, dry_run)
+        except BulkLimitExceeded as exc:
+            return json_response({'error': str(exc), 'limit': exc.limit}, status=400)
+        return json_response(result)
+
+
+class AuthorAutocompleteView(View):
+    """
+    Handles author name suggestions for the title forms.
+
+    Attributes:
+        query_budget (int): The maximum number of queries a request may issue.
+
+    Methods:
+        get(request): Returns authors matching the `q` query parameter.
+    """
+    query_budget = 2
+
+    def get(self, request):
+        """
+        Suggests authors for a partially typed name.
+
+        The number of suggestions is taken from the `AUTHOR_AUTOCOMPLETE_LIMIT` setting.
+
+        Args:
+            request (HttpRequest): The HTTP request object with the typed text in `q`.
+
+        Returns:
+            JsonResponse: An object with a `results` list of `id`/`name` pairs.
         """
-        title = get_object_or_404(Title, pk=pk)
-        return render(request, 'biblioteka/title_detail.html', {'title': title})
+        results = autocomplete_authors(request.GET.get('q', ''), settings.AUTHOR_AUTOCOMPLETE_LIMIT)
+        return JsonResponse({'results': results})
 
 
 class AddTitleView(View):
@@ -82,14 +897,14 @@ class AddTitleView(View):
                           or the rendered form with errors on failure.
         """
         form = TitleForm(request.POST)
-        if form.is_valid():
-            author_name = form.cleaned_data.pop('author')
-            author, created = Author.objects.get_or_create(name=author_name)
-            title = form.save(commit=False)
-            title.author = author
-            title.save()
-            form.save_m2m()
-            return redirect('title_list')
+        # Validation resolves the author, which must happen in the saving transaction.
+        with transaction.atomic():
+            if form.is_valid():
+                title = form.save(commit=False)
+                title.author = form.cleaned_data['author']
+                title.save()
+                form.save_m2m()
+                return redirect('title_list')
         return render(request, 'biblioteka/add_title.html', {'form': form})
 
 class EditTitleView(View):
@@ -130,12 +945,14 @@ class EditTitleView(View):
         """
         book = get_object_or_404(Title, pk=pk)
         form = TitleForm(request.POST, instance=book)
-        if form.is_valid():
-            title = form.save(commit=False)
-            title.author = form.cleaned_data['author']
-            title.save()
-            form.save_m2m()
-            return redirect('title_list')
+        # Validation resolves the author, which must happen in the saving transaction.
+        with transaction.atomic():
+            if form.is_valid():
+                title = form.save(commit=False)
+                title.author = form.cleaned_data['author']
+                title.save()
+                form.save_m2m()
+                return redirect('title_list')
         return render(request, 'biblioteka/edit_title.html', {'form': form, 'book': book})
 
 class DeleteTitleView(DeleteView):